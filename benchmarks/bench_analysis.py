@@ -0,0 +1,50 @@
+"""Benchmarks of the year comparison and the vehicle CO2 analysis."""
+
+import json
+
+import numpy as np
+import pytest
+from conftest import kommun_variables, recorded
+
+import ifk_analyses.objects.personal_vehicle_lca as pvl
+from ifk_analyses.objects.emissions_kommun import (
+    compare_years_and_sort_chg,
+    decode_emissions,
+)
+
+VEHICLE = pvl.Vehicle(
+    name="Stor elbil",
+    weight=2200,
+    battery_capacity=125,
+    consumption_per_km=0.25,
+    co2_build_cost_per_kg=8,
+    co2_battery_build_cost_per_kWh=77,
+    co2_cost_per_consumption=0.45,
+    vehicle_life_km=300000,
+)
+
+
+def test_compare_years(size, measure):
+    """Compare first and last year of greenhouse gas emissions by kommun."""
+    request_output = json.loads(recorded("kommun", size))
+    request_output["data"] = [
+        row for row in request_output["data"] if row["key"][1] == "GHG"
+    ]
+    data_df = decode_emissions(request_output, kommun_variables(n_years=1))
+    years = data_df["year"].unique()
+    compared = measure(
+        compare_years_and_sort_chg,
+        data_df,
+        int(years.min()),
+        int(years.max()),
+        cells=len(data_df),
+    )
+    assert len(compared) == 290
+
+
+@pytest.mark.parametrize("n_distances", [10**4, 10**6, 10**7])
+def test_co2analysis(measure, n_distances):
+    """Accumulated CO2 over a distance array."""
+    driven_distance = np.linspace(0, 300000, n_distances)
+    _, co2 = measure(pvl.co2analysis, VEHICLE, driven_distance, 1, cells=n_distances)
+    assert len(co2) == n_distances
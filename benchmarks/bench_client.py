@@ -0,0 +1,27 @@
+"""Benchmarks of fetching and decoding recorded responses from a local stub."""
+
+from conftest import KOMMUN_PATH, SIZES, TRANSPORT_PATH, recorded
+
+from ifk_analyses.objects.passenger_transport import FetchScbData, RequestInput
+from ifk_analyses.scb_api import ScbClient, TokenBucket
+
+
+def test_fetch_transport(size, measure, replay_scb):
+    """Post query and decode passenger transport emissions."""
+    replay_scb.responses["/".join(TRANSPORT_PATH)] = recorded("transport", size)
+    client = ScbClient(replay_scb.url, TokenBucket(10**6, 1.0))
+    request_input = RequestInput()
+
+    def fetch() -> object:
+        return FetchScbData(client, request_input).data
+
+    data_df = measure(fetch, cells=SIZES[size])
+    assert len(data_df) == SIZES[size]
+
+
+def test_post_kommun(size, measure, replay_scb):
+    """Post query for emissions by kommun and parse the response."""
+    replay_scb.responses["/".join(KOMMUN_PATH)] = recorded("kommun", size)
+    client = ScbClient(replay_scb.url, TokenBucket(10**6, 1.0))
+    response = measure(client.post, KOMMUN_PATH, {"query": []}, cells=SIZES[size])
+    assert len(response["data"]) == SIZES[size]
@@ -0,0 +1,60 @@
+"""Benchmarks of decoding scb json responses to DataFrames.
+
+The previous per column decoder is kept as a baseline for the vectorized
+`decode_response`, which both `FetchData.dict_to_dataframe` and
+`FetchScbData.transform_json_to_df` use.
+"""
+
+import json
+
+import pandas as pd
+from conftest import SIZES, kommun_variables, recorded
+
+from ifk_analyses.objects.emissions_kommun import decode_emissions
+from ifk_analyses.objects.passenger_transport import FetchScbData
+
+# Peak memory per decoded cell, including the parsed json.
+MAX_BYTES_PER_CELL = 2_000
+
+
+def per_column(request_output: dict, region_names: dict) -> pd.DataFrame:
+    """Previous decoder, one list comprehension per column."""
+    n_data = len(request_output["data"])
+    reg_ids = [request_output["data"][i]["key"][0] for i in range(n_data)]
+    data_dict = {
+        "region": [region_names[id] for id in reg_ids],
+        "year": [int(request_output["data"][i]["key"][2]) for i in range(n_data)],
+        "chg value": [
+            float(request_output["data"][i]["values"][0].replace("..", "nan"))
+            for i in range(n_data)
+        ],
+    }
+    return pd.DataFrame.from_dict(data_dict)
+
+
+def test_decode_emissions(size, measure, benchmark):
+    """Decode emissions by kommun from raw bytes."""
+    body = recorded("kommun", size)
+    variables = kommun_variables(n_years=10_000)
+    data_df = measure(
+        lambda: decode_emissions(json.loads(body), variables), cells=SIZES[size]
+    )
+    assert len(data_df) == SIZES[size]
+    assert benchmark.extra_info["peak_memory"] < MAX_BYTES_PER_CELL * SIZES[size]
+
+
+def test_transform_json_to_df(size, measure, benchmark):
+    """Decode passenger transport emissions from raw bytes."""
+    body = recorded("transport", size)
+    data_df = measure(FetchScbData.transform_json_to_df, body, cells=SIZES[size])
+    assert len(data_df) == SIZES[size]
+    assert benchmark.extra_info["peak_memory"] < MAX_BYTES_PER_CELL * SIZES[size]
+
+
+def test_per_column_baseline(size, measure):
+    """Previous decoder of emissions by kommun, at the sizes of `decode_response`."""
+    request_output = json.loads(recorded("kommun", size))
+    variables = kommun_variables(n_years=1)
+    region_names = dict(zip(variables[0]["values"], variables[0]["valueTexts"]))
+    data_df = measure(per_column, request_output, region_names, cells=SIZES[size])
+    assert len(data_df) == SIZES[size]
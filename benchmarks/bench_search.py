@@ -0,0 +1,44 @@
+"""Benchmarks of searching the scb search tree."""
+
+import os
+import shutil
+
+import pytest
+
+from ifk_analyses.search_scb import ScbSearch
+
+RECORDED_TREE = os.path.join(os.path.dirname(__file__), "..", "data", "search_tree.txt")
+
+
+@pytest.fixture(scope="module", params=[1, 20], ids=["recorded", "20x"])
+def search(request, tmp_path_factory):
+    """Search over the recorded tree, or the tree repeated under new top ids."""
+    tmp_path = tmp_path_factory.mktemp("search")
+    path = tmp_path / "search_tree.txt"
+    if request.param == 1:
+        shutil.copy(RECORDED_TREE, path)
+    else:
+        with open(RECORDED_TREE, encoding="utf-8") as f:
+            lines = [line for line in f if line.startswith("[")]
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(request.param):
+                f.writelines(line.replace("['", f"['X{i}', '", 1) for line in lines)
+    s = ScbSearch()
+    s.search_tree_file_path = str(path)
+    s.compact_tree_file_path = str(tmp_path / "search_tree.bin")
+    s.search_index_path = str(tmp_path / "index")
+    s.read_search_tree()
+    s.search_index()
+    return s
+
+
+def test_search_substring(measure, search):
+    """Substring search on all tables."""
+    result = measure(search.search_substring, "utsläpp", "kommun")
+    assert result
+
+
+def test_search(measure, search):
+    """Ranked search in the search index."""
+    result = measure(search.search, "utsläpp till luft")
+    assert result
@@ -0,0 +1,219 @@
+"""Fixtures of the benchmark suite.
+
+SCB responses of several sizes are synthesized once and recorded as raw json
+bytes, with the byte order mark scb sends, in `data/benchmarks`. The recorded
+responses are served by a local stub of the scb api.
+"""
+
+import http.server
+import importlib.util
+import json
+import os
+import threading
+import tracemalloc
+from typing import Callable, Iterator
+
+import pytest
+
+RESPONSE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "benchmarks")
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+REGIONS = [f"{i:04d}" for i in range(290)]
+SUBSTANCES = ["GHG", "CO2", "CH4", "N2O"]
+SECTORS = ["0.2", "0.4", "8.0", "5.0"]
+KOMMUN_PATH = ["MI", "MI1301", "MI1301B", "UtslappKommun"]
+TRANSPORT_PATH = ["START", "MI", "MI0107", "TotaltUtslappN"]
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Option limiting the response sizes."""
+    parser.addoption(
+        "--max-cells",
+        type=int,
+        default=max(SIZES.values()),
+        help="skip benchmarks of responses with more cells",
+    )
+
+
+if importlib.util.find_spec("pytest_benchmark") is None:
+
+    @pytest.fixture
+    def benchmark() -> None:
+        """Skip benchmarks without pytest-benchmark, from the bench extra."""
+        pytest.skip("pytest-benchmark is not installed")
+
+
+def years(n: int) -> list:
+    """Year codes, beyond the real table when many are needed."""
+    return [str(1990 + i) for i in range(n)]
+
+
+def kommun_variables(n_years: int) -> list:
+    """Variables of the emissions by kommun table."""
+    return [
+        {
+            "code": "Region",
+            "text": "region",
+            "values": REGIONS,
+            "valueTexts": [f"Kommun {code}" for code in REGIONS],
+        },
+        {
+            "code": "Amne",
+            "text": "ämne",
+            "values": SUBSTANCES,
+            "valueTexts": [f"ämne {code}" for code in SUBSTANCES],
+        },
+        {
+            "code": "ContentsCode",
+            "text": "tabellinnehåll",
+            "values": ["000001"],
+            "valueTexts": ["Utsläpp"],
+        },
+        {
+            "code": "Tid",
+            "text": "år",
+            "values": years(n_years),
+            "valueTexts": years(n_years),
+            "time": True,
+        },
+    ]
+
+
+def kommun_response(n_cells: int) -> dict:
+    """Emissions by region, substance and year, with some missing values."""
+    n_years = -(-n_cells // (len(REGIONS) * len(SUBSTANCES)))
+    data = [
+        {
+            "key": [region, substance, year],
+            "values": [".." if i % 97 == 0 else f"{i % 1000 / 7:.3f}"],
+        }
+        for i, (year, substance, region) in enumerate(
+            (y, s, r) for y in years(n_years) for s in SUBSTANCES for r in REGIONS
+        )
+        if i < n_cells
+    ]
+    return {"columns": [], "comments": [], "data": data}
+
+
+def transport_response(n_cells: int) -> dict:
+    """Greenhouse gases by sector and year."""
+    n_years = -(-n_cells // len(SECTORS))
+    data = [
+        {"key": ["CO2-ekv.", sector, year], "values": [f"{i % 5000 / 3:.1f}"]}
+        for i, (year, sector) in enumerate(
+            (y, s) for y in years(n_years) for s in SECTORS
+        )
+        if i < n_cells
+    ]
+    return {"columns": [], "comments": [], "data": data}
+
+
+RESPONSES = {"kommun": kommun_response, "transport": transport_response}
+
+
+def recorded(kind: str, size: str) -> bytes:
+    """Recorded response, synthesized and written on first use.
+
+    Args:
+        kind: `kommun` or `transport`
+        size: key of `SIZES`
+
+    Returns:
+        bytes: raw response body
+    """
+    file_path = os.path.join(RESPONSE_DIR, f"{kind}-{size}.json")
+    if not os.path.exists(file_path):
+        os.makedirs(RESPONSE_DIR, exist_ok=True)
+        body = json.dumps(RESPONSES[kind](SIZES[size])).encode("utf-8")
+        with open(f"{file_path}.tmp", "wb") as f:
+            f.write(b"\xef\xbb\xbf" + body)
+        os.replace(f"{file_path}.tmp", file_path)
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture(params=list(SIZES))
+def size(request: pytest.FixtureRequest) -> str:
+    """Response size, limited by `--max-cells`."""
+    if SIZES[request.param] > request.config.getoption("--max-cells"):
+        pytest.skip(f"{request.param} cells above --max-cells")
+    return request.param
+
+
+class ReplayScb:
+    """Local stub of the scb api replaying recorded responses."""
+
+    def __init__(self) -> None:
+        """Start server on a free port."""
+        self.responses: dict[str, bytes] = {}
+        responses = self.responses
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                body = responses.get(self.path.strip("/"))
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:  # noqa: N802
+                self._respond()
+
+            def do_POST(self) -> None:  # noqa: N802
+                self._respond()
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        """Stop server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(scope="session")
+def replay_scb() -> Iterator[ReplayScb]:
+    """Stub of the scb api, shared by all benchmarks."""
+    stub = ReplayScb()
+    yield stub
+    stub.close()
+
+
+@pytest.fixture
+def measure(benchmark) -> Callable:
+    """Benchmark a function and record its peak memory and throughput.
+
+    The function is first run once under tracemalloc, and the peak memory is
+    saved with the timings as `peak_memory` in bytes. Pass `cells` to save the
+    number of processed cells, from which throughput is derived.
+    """
+
+    def run(func: Callable, *args, cells: int = 0, **kwargs):
+        tracemalloc.start()
+        try:
+            func(*args, **kwargs)
+            benchmark.extra_info["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        if cells:
+            benchmark.extra_info["cells"] = cells
+        result = benchmark(func, *args, **kwargs)
+        if cells and benchmark.stats is not None:
+            benchmark.extra_info["cells_per_second"] = cells / benchmark.stats["mean"]
+        return result
+
+    return run
@@ -9,17 +9,18 @@
 # %%
 # %matplotlib inline
 import ifk_analyses.objects.passenger_transport as passenger_transport
+from ifk_analyses.store import TableStore
 
 # %% [markdown]
-# Start a request session and fetch data from scb, based on the query defined in ifk_scb_compilations.queries.passenger_transport.Request_input.query.
+# Read data from the local store in data/store. The first time, it is fetched from scb, based on the query defined in ifk_scb_compilations.queries.passenger_transport.Request_input.query.
 
 # %%
-scb_data = passenger_transport.FetchScbData()
+data = passenger_transport.load_data(TableStore())
 
 # %% [markdown]
 # Create an instance of passenger_transport.Analysis and execute the analysis, compiliation or whatever you want to do with the data.
 
 # %%
-passenger_analysis = passenger_transport.Analysis(scb_data.data)
+passenger_analysis = passenger_transport.Analysis(data)
 passenger_analysis.plot_co2_transports()
 passenger_analysis.plot_co2_national_international()
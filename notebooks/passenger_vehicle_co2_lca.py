@@ -32,7 +32,10 @@
 import matplotlib.pyplot as plt
 import numpy as np
 
+import ifk_analyses.objects.break_even as break_even_solver
+import ifk_analyses.objects.fleet as fleet_simulation
 import ifk_analyses.objects.personal_vehicle_lca as pvl
+from ifk_analyses.objects.vehicle_catalog import VehicleCatalog
 
 # ## Grundläggande antaganden
 # Grundläggande antaganden kommer från Volvo Cars LCA-rapporter, som återfinns här:
@@ -64,58 +67,60 @@ vehicle_life = 300000  # 300 000 km defined as the average life of a vehicle (fr
 # |Elcykel | 15 |0.5 | 20 | 0.005 kWh/km |100%|
 #
 
-vehicles = {
-    pvl.Vehicle(
-        name="Liten bensinbil",
-        weight=1500,
-        battery_capacity=0,
-        consumption_per_km=0.05,
-        co2_build_cost_per_kg=vehicle_manufacturing_cost,
-        co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
-        co2_cost_per_consumption=kgCO2_per_litre,
-        vehicle_life_km=vehicle_life,
-    ),
-    pvl.Vehicle(
-        name="Stor elbil",
-        weight=2200,
-        battery_capacity=125,
-        consumption_per_km=0.25,
-        co2_build_cost_per_kg=vehicle_manufacturing_cost,
-        co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
-        co2_cost_per_consumption=kgCO2_per_kWh,
-        vehicle_life_km=vehicle_life,
-    ),
-    pvl.Vehicle(
-        name="Liten elbil",
-        weight=1500,
-        battery_capacity=50,
-        consumption_per_km=0.15,
-        co2_build_cost_per_kg=vehicle_manufacturing_cost,
-        co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
-        co2_cost_per_consumption=kgCO2_per_kWh,
-        vehicle_life_km=vehicle_life,
-    ),
-    pvl.Vehicle(
-        name="Cykel",
-        weight=10,
-        battery_capacity=0,
-        consumption_per_km=0,
-        co2_build_cost_per_kg=vehicle_manufacturing_cost,
-        co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
-        co2_cost_per_consumption=kgCO2_per_kWh,
-        vehicle_life_km=vehicle_life,
-    ),
-    pvl.Vehicle(
-        name="Elcykel",
-        weight=15,
-        battery_capacity=0.5,
-        consumption_per_km=0.005,
-        co2_build_cost_per_kg=vehicle_manufacturing_cost,
-        co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
-        co2_cost_per_consumption=kgCO2_per_kWh,
-        vehicle_life_km=vehicle_life,
-    ),
-}
+vehicles = VehicleCatalog(
+    [
+        pvl.Vehicle(
+            name="Liten bensinbil",
+            weight=1500,
+            battery_capacity=0,
+            consumption_per_km=0.05,
+            co2_build_cost_per_kg=vehicle_manufacturing_cost,
+            co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
+            co2_cost_per_consumption=kgCO2_per_litre,
+            vehicle_life_km=vehicle_life,
+        ),
+        pvl.Vehicle(
+            name="Stor elbil",
+            weight=2200,
+            battery_capacity=125,
+            consumption_per_km=0.25,
+            co2_build_cost_per_kg=vehicle_manufacturing_cost,
+            co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
+            co2_cost_per_consumption=kgCO2_per_kWh,
+            vehicle_life_km=vehicle_life,
+        ),
+        pvl.Vehicle(
+            name="Liten elbil",
+            weight=1500,
+            battery_capacity=50,
+            consumption_per_km=0.15,
+            co2_build_cost_per_kg=vehicle_manufacturing_cost,
+            co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
+            co2_cost_per_consumption=kgCO2_per_kWh,
+            vehicle_life_km=vehicle_life,
+        ),
+        pvl.Vehicle(
+            name="Cykel",
+            weight=10,
+            battery_capacity=0,
+            consumption_per_km=0,
+            co2_build_cost_per_kg=vehicle_manufacturing_cost,
+            co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
+            co2_cost_per_consumption=kgCO2_per_kWh,
+            vehicle_life_km=vehicle_life,
+        ),
+        pvl.Vehicle(
+            name="Elcykel",
+            weight=15,
+            battery_capacity=0.5,
+            consumption_per_km=0.005,
+            co2_build_cost_per_kg=vehicle_manufacturing_cost,
+            co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
+            co2_cost_per_consumption=kgCO2_per_kWh,
+            vehicle_life_km=vehicle_life,
+        ),
+    ]
+)
 
 driven_distance = np.linspace(0, vehicle_life, 200)
 legend = []
@@ -151,96 +156,68 @@ kilometers_at_change = (
 fraction_bike_rides = 0.1  # 10% biking
 
 # Define support variables for readability
-driven_to_split = np.linspace(0, kilometers_at_change, 100)
-driven_from_split = np.linspace(kilometers_at_change, vehicle_life, 100)
-small_gas_car = next(
-    (vehicle for vehicle in vehicles if vehicle.name == "Liten bensinbil"), "None"
-)
-small_electric_car = next(
-    (vehicle for vehicle in vehicles if vehicle.name == "Liten elbil"), "None"
-)
-large_electric_car = next(
-    (vehicle for vehicle in vehicles if vehicle.name == "Stor elbil"), "None"
-)
-bike = next((vehicle for vehicle in vehicles if vehicle.name == "Cykel"), "None")
-electric_bike = next(
-    (vehicle for vehicle in vehicles if vehicle.name == "Cykel"), "None"
-)
-
+small_gas_car = vehicles["Liten bensinbil"]
+large_electric_car = vehicles["Stor elbil"]
 
 # And define additional vehicle combinations
-large_electric_and_bike = pvl.Vehicle(
-    name="Stor elbil och cykel",
-    weight=large_electric_car.weight + bike.weight,
-    battery_capacity=large_electric_car.battery_capacity + bike.battery_capacity,
-    consumption_per_km=large_electric_car.consumption_per_km * (1 - fraction_bike_rides)
-    + bike.consumption_per_km * fraction_bike_rides,
-    co2_build_cost_per_kg=vehicle_manufacturing_cost,
-    co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
-    co2_cost_per_consumption=kgCO2_per_kWh,
-    vehicle_life_km=vehicle_life,
+vehicles.blend(
+    "Stor elbil och cykel",
+    {"Stor elbil": 1 - fraction_bike_rides, "Cykel": fraction_bike_rides},
 )
-small_electric_and_bike = pvl.Vehicle(
-    name="Liten elbil och cykel",
-    weight=small_electric_car.weight + bike.weight,
-    battery_capacity=small_electric_car.battery_capacity + bike.battery_capacity,
-    consumption_per_km=small_electric_car.consumption_per_km * (1 - fraction_bike_rides)
-    + bike.consumption_per_km * fraction_bike_rides,
-    co2_build_cost_per_kg=vehicle_manufacturing_cost,
-    co2_battery_build_cost_per_kWh=battery_manufacturing_cost,
-    co2_cost_per_consumption=kgCO2_per_kWh,
-    vehicle_life_km=vehicle_life,
+vehicles.blend(
+    "Liten elbil och cykel",
+    {"Liten elbil": 1 - fraction_bike_rides, "Cykel": fraction_bike_rides},
 )
 
-# Define the scenarios as described above
+# Define the scenarios as described above, as the vehicle index in the catalog
+# and the distance at which each vehicle is taken into use
+gas_car = vehicles.index("Liten bensinbil")
 scenarios = {
-    "Kör vidare liten bensinbil": {0: [small_gas_car, driven_distance]},
-    "Köpa stor elbil": {
-        0: [small_gas_car, driven_to_split],
-        1: [large_electric_car, driven_from_split],
-    },
-    "Köpa liten elbil": {
-        0: [small_gas_car, driven_to_split],
-        1: [small_electric_car, driven_from_split],
-    },
-    "Köpa stor elbil och cykel": {
-        0: [small_gas_car, driven_to_split],
-        1: [large_electric_and_bike, driven_from_split],
-    },
-    "Köpa liten elbil och cykel": {
-        0: [small_gas_car, driven_to_split],
-        1: [small_electric_and_bike, driven_from_split],
-    },
-    "Köpa elcykel": {
-        0: [small_gas_car, driven_to_split],
-        1: [electric_bike, driven_from_split],
-    },
-    "Aldrig skaffa bil": {0: [bike, driven_distance]},
+    "Kör vidare liten bensinbil": [(gas_car, 0)],
+    "Köpa stor elbil": [
+        (gas_car, 0),
+        (vehicles.index("Stor elbil"), kilometers_at_change),
+    ],
+    "Köpa liten elbil": [
+        (gas_car, 0),
+        (vehicles.index("Liten elbil"), kilometers_at_change),
+    ],
+    "Köpa stor elbil och cykel": [
+        (gas_car, 0),
+        (vehicles.index("Stor elbil och cykel"), kilometers_at_change),
+    ],
+    "Köpa liten elbil och cykel": [
+        (gas_car, 0),
+        (vehicles.index("Liten elbil och cykel"), kilometers_at_change),
+    ],
+    "Köpa elcykel": [(gas_car, 0), (vehicles.index("Elcykel"), kilometers_at_change)],
+    "Aldrig skaffa bil": [(vehicles.index("Cykel"), 0)],
 }
 
-
-vehicle_data = []
-for scenario, data in scenarios.items():
-    co2debt = 0
-    scenario_driven_distance = []
-    scenario_CO2data = []
-    for _, vehicleanddistance in data.items():
-        a, b = pvl.co2analysis(vehicleanddistance[0], vehicleanddistance[1], co2debt)
-        scenario_driven_distance = np.append(scenario_driven_distance, a)
-        scenario_CO2data = np.append(scenario_CO2data, b)
-        co2debt = scenario_CO2data[-1]
-    vehicle_data.append([scenario, scenario_driven_distance, scenario_CO2data])
+# All scenarios are evaluated at once, as a scenario x distance array
+scenario_CO2data = pvl.co2_scenarios(
+    vehicles.table,
+    pvl.Scenarios.from_segments(list(scenarios.values())),
+    driven_distance,
+)
 
 plt.figure(figsize=(10, 6), dpi=100)
-leg = []
-for value in vehicle_data:
-    plt.plot(value[1], value[2] / 1000)
-    leg.append(value[0])
-plt.legend(leg)
+for CO2data in scenario_CO2data:
+    plt.plot(driven_distance, CO2data / 1000)
+plt.legend(list(scenarios))
 plt.xlabel("kördistans [km]")
 plt.ylabel("CO2 [metric tonnes]")
 plt.show()
 
+# Eftersom kurvorna är styckvis linjära kan brytpunkten mot att köra vidare
+# med bensinbilen räknas ut exakt, utan att läsa av kurvorna.
+
+break_even = break_even_solver.scenario_break_even(
+    vehicles.table, pvl.Scenarios.from_segments(list(scenarios.values()))
+)
+for scenario, distance in zip(scenarios, break_even[0]):
+    print("{}: {:.0f} km".format(scenario, distance))
+
 # ## Från det personliga planet till världens fordonsflotta
 # Genom att tillgripa en naivistisk analys (vi ger inte någon rabatt då en bil
 # säljs, vilket innebär att inköp av begagnad bil skulle ge en initial-CO2-kostnad
@@ -314,7 +291,7 @@ print("{:3.0f} Gton CO2".format(remaining_CO2_output_from_current_fleet))
 # öka mängden C02-utsläpp till totalt resta 3000000km med:
 
 increase_from_current_fleet_if_electrified = (
-    vehicle_data[1][2][-1] / vehicle_data[0][2][-1]
+    scenario_CO2data[1, -1] / scenario_CO2data[0, -1]
 )
 print("{:3.0f} percent".format((increase_from_current_fleet_if_electrified - 1) * 100))
 
@@ -322,8 +299,8 @@ print("{:3.0f} percent".format((increase_from_current_fleet_if_electrified - 1)
 # Vilket ger de totala utsläppen från fordonsflottan istället till:
 
 remaining_CO2_output_from_current_fleet_if_electrified = (
-    vehicle_data[1][2][-1]
-    / vehicle_data[0][2][-1]
+    scenario_CO2data[1, -1]
+    / scenario_CO2data[0, -1]
     * remaining_CO2_output_from_current_fleet
 )
 print("The expected CO2-output from the lifetime of the current world car fleet,")
@@ -331,6 +308,27 @@ print("when everyone changes to an electric car now, would be approximately")
 print("{:3.0f} Gton CO2".format(remaining_CO2_output_from_current_fleet_if_electrified))
 
 
+# Med en kohortmodell kan vi i stället följa fordonsflottan år för år. Vi antar
+# att dagens bilar är jämnt fördelade på åldrarna 0-19 år, att bilarna skrotas
+# efter i genomsnitt 18 år och ersätts med nya bilar, och jämför att alla nya
+# bilar är bensinbilar med att alla nya bilar är stora elbilar, under 30 år.
+
+# +
+max_age = 40
+fleet_stock = np.zeros((2, max_age + 1))
+fleet_stock[0, :20] = total_number_of_cars / 20
+for name, share in {"Bensinbilar": [1.0, 0.0], "Stora elbilar": [0.0, 1.0]}.items():
+    projection = fleet_simulation.simulate_fleet(
+        pvl.vehicle_table([small_gas_car, large_electric_car]),
+        fleet_stock,
+        np.tile(share, (30, 1)),
+        km_per_year=vehicle_life / 18,
+        scrap_rate=fleet_simulation.scrappage_rates(max_age, mean_life=18),
+    )
+    total = projection["driving"].sum() + projection["manufacturing"].sum()
+    print("{}: {:3.0f} Gton CO2 på 30 år".format(name, total / 1e12))
+# -
+
 # De nya elbilarna, i egenskap av nya, skulle därtill fortsätta släppa ut CO2
 # så länge inte all elektricitet kommer från fossilfria alternativ i ytterligare
 # nästan 170000km.
@@ -0,0 +1,50 @@
+"""Lazy imports of heavy modules."""
+
+import importlib.util
+import sys
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Import module on first attribute access.
+
+    Use together with a `TYPE_CHECKING` import for type annotations:
+
+        if TYPE_CHECKING:
+            import pandas as pd
+        else:
+            pd = lazy_import("pandas")
+
+    Args:
+        name: absolute module name
+
+    Returns:
+        ModuleType: module, loaded when an attribute is first accessed
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def is_loaded(name: str) -> bool:
+    """Check if module is imported and not waiting for a lazy load.
+
+    Args:
+        name: absolute module name
+
+    Returns:
+        bool: true if the module has been executed
+    """
+    module = sys.modules.get(name)
+    return module is not None and not isinstance(
+        module,
+        importlib.util._LazyModule,  # type: ignore[attr-defined]
+    )
@@ -0,0 +1,65 @@
+"""Write DataFrame batches to Parquet or Arrow IPC files.
+
+Requires pyarrow, install with the `arrow` extra.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Iterable, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ifk_analyses._lazy import lazy_import
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+PARQUET_SUFFIXES = (".parquet", ".pq")
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+
+def write_batches(batches: Iterable[pd.DataFrame], file_path: str) -> int:
+    """Append DataFrame batches to a file as they arrive.
+
+    Each batch becomes a row group in Parquet files or a record batch in Arrow
+    IPC files, so only one batch is held in memory at a time. The format is
+    chosen by the file suffix. The schema of the first batch is used for all
+    batches.
+
+    Args:
+        batches: DataFrames with the same columns
+        file_path: output file, `.parquet` or `.arrow`
+
+    Returns:
+        int: number of rows written
+
+    Raises:
+        ValueError: if the file suffix is not recognized
+    """
+    suffix = os.path.splitext(file_path)[1]
+    if suffix not in PARQUET_SUFFIXES + ARROW_SUFFIXES:
+        raise ValueError(f"Unknown file format {suffix}.")
+
+    writer: Union[pq.ParquetWriter, pa.ipc.RecordBatchFileWriter, None] = None
+    schema = None
+    n_rows = 0
+    try:
+        for batch in batches:
+            table = pa.Table.from_pandas(batch, schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                if suffix in PARQUET_SUFFIXES:
+                    writer = pq.ParquetWriter(file_path, schema)
+                else:
+                    writer = pa.ipc.new_file(file_path, schema)
+            writer.write_table(table)
+            n_rows += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return n_rows
@@ -0,0 +1,287 @@
+"""Local on-disk cache of scb api responses."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Sequence
+
+from ifk_analyses import instrumentation
+from ifk_analyses.metadata_catalog import table_path
+
+DEFAULT_CACHE_DIR = "data/cache"
+DEFAULT_TTL = 24 * 3600.0
+DEFAULT_MAX_BYTES = 1024**3
+
+
+class CacheMiss(LookupError):
+    """Response not in cache while offline."""
+
+
+def cache_key(path: Sequence[str], query: Optional[dict] = None) -> str:
+    """Content address of a request.
+
+    The query is normalized by sorting keys and the query items by variable code,
+    so equivalent queries share the same cache entry.
+
+    Args:
+        path: list of scb ids
+        query: scb query, None for metadata requests
+
+    Returns:
+        str: sha256 hex digest
+    """
+    if query is not None:
+        query = dict(
+            query, query=sorted(query.get("query", []), key=lambda q: q["code"])
+        )
+    request = json.dumps(
+        {"path": table_path(path), "query": query},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Content addressed cache of raw response bodies.
+
+    Bodies are stored as files named by the request key. An sqlite index keeps
+    track of creation and access times and sizes, which are used for expiry and
+    least recently used eviction.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_CACHE_DIR,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        stale_while_revalidate: bool = False,
+        offline: bool = False,
+    ) -> None:
+        """Initialization.
+
+        Args:
+            directory: cache directory
+            ttl: seconds until an entry is stale
+            max_bytes: total size of the cache before evicting entries
+            stale_while_revalidate: return stale entries immediately and refresh
+                them in the background
+            offline: never send requests, only serve cached entries
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stale_while_revalidate = stale_while_revalidate
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.refreshing: set[str] = set()
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, path TEXT, created REAL, accessed REAL, size INT)"
+        )
+        self.db.commit()
+
+    def _file(self, key: str) -> str:
+        """Path to cached body."""
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[tuple[bytes, bool]]:
+        """Get cached body.
+
+        Args:
+            key: request key
+
+        Returns:
+            Optional[tuple]: body and whether it is fresh, None if not cached
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            try:
+                with open(self._file(key), "rb") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.db.commit()
+                return None
+            now = time.time()
+            self.db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.db.commit()
+        return content, now - row[0] < self.ttl
+
+    def put(self, key: str, path: Sequence[str], content: bytes) -> None:
+        """Store body and evict least recently used entries above the size limit.
+
+        Args:
+            key: request key
+            path: list of scb ids, stored for inspection
+            content: response body
+        """
+        file_path = self._file(key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, file_path)
+
+        with self.lock:
+            now = time.time()
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, table_path(path), now, now, len(content)),
+            )
+            self._evict()
+            self.db.commit()
+
+    def invalidate(self, path: Sequence[str]) -> int:
+        """Remove all entries of a node, e.g. when its table was updated.
+
+        Args:
+            path: list of scb ids, with or without the leading START
+
+        Returns:
+            int: number of removed entries
+        """
+        with self.lock:
+            keys = [
+                key
+                for (key,) in self.db.execute(
+                    # entries stored before paths were normalized kept START
+                    "SELECT key FROM entries WHERE path IN (?, ?)",
+                    (table_path(path), f"START/{table_path(path)}"),
+                ).fetchall()
+            ]
+            for key in keys:
+                self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                if os.path.exists(self._file(key)):
+                    os.remove(self._file(key))
+            self.db.commit()
+        return len(keys)
+
+    def _evict(self) -> None:
+        """Remove least recently used entries until below the size limit."""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        excess = total[0] - self.max_bytes
+        if excess <= 0:
+            return
+        rows = self.db.execute("SELECT key, size FROM entries ORDER BY accessed")
+        evicted = []
+        for key, size in rows.fetchall():
+            if excess <= 0:
+                break
+            evicted.append(key)
+            excess -= size
+        for key in evicted:
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            if os.path.exists(self._file(key)):
+                os.remove(self._file(key))
+
+    def claim_refresh(self, key: str) -> bool:
+        """Claim the background refresh of an entry, once per key at a time.
+
+        Args:
+            key: request key
+
+        Returns:
+            bool: True if claimed, release it with `release_refresh`
+        """
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def release_refresh(self, key: str) -> None:
+        """Release a refresh claimed with `claim_refresh`.
+
+        Args:
+            key: request key
+        """
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def _refresh(
+        self, key: str, path: Sequence[str], load: Callable[[], bytes]
+    ) -> None:
+        """Refresh entry in a background thread, once per key at a time."""
+        if not self.claim_refresh(key):
+            return
+
+        def run() -> None:
+            try:
+                self.put(key, path, load())
+            finally:
+                self.release_refresh(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def lookup(
+        self, path: Sequence[str], query: Optional[dict]
+    ) -> tuple[str, Optional[bytes], bool]:
+        """Look up request, counting cache hits, stale entries and misses.
+
+        Args:
+            path: list of scb ids
+            query: scb query, None for metadata requests
+
+        Returns:
+            tuple: request key, body to serve or None, and whether the body must
+                be loaded, in the background if a stale body is served
+
+        Raises:
+            CacheMiss: if offline and the request is not cached
+        """
+        key = cache_key(path, query)
+        cached = self.get(key)
+        if cached is not None:
+            content, fresh = cached
+            if fresh or self.offline:
+                instrumentation.count("cache.hit")
+                return key, content, False
+            instrumentation.count("cache.stale")
+            if self.stale_while_revalidate:
+                return key, content, True
+        elif self.offline:
+            raise CacheMiss(f"{'/'.join(path)} not in cache.")
+        else:
+            instrumentation.count("cache.miss")
+        return key, None, True
+
+    def fetch(
+        self,
+        path: Sequence[str],
+        query: Optional[dict],
+        load: Callable[[], bytes],
+    ) -> bytes:
+        """Get body from cache, loading it on a miss or when stale.
+
+        Args:
+            path: list of scb ids
+            query: scb query, None for metadata requests
+            load: function sending the request and returning the body
+
+        Returns:
+            bytes: response body
+
+        Raises:
+            CacheMiss: if offline and the request is not cached
+        """
+        key, content, stale = self.lookup(path, query)
+        if content is not None:
+            if stale:
+                self._refresh(key, path, load)
+            return content
+
+        content = load()
+        self.put(key, path, content)
+        return content
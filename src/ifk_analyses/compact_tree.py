@@ -0,0 +1,242 @@
+"""Compact binary format for the scb search tree.
+
+All nodes, folders as well as tables, are stored in depth first preorder, so the
+subtree of a node is the contiguous range from the node to its `subtree_end`.
+Tables are the leaves of the tree.
+
+File layout, little endian, each array aligned to 8 bytes:
+
+- magic `IFKTREE1`
+- header: number of nodes, names, name bytes and title bytes as int64
+- `name_offsets`: int64, start of each interned node id in `names`
+- `names`: utf-8 blob with unique node ids
+- `node_name`: int32, index of the node id of each node
+- `parent`: int32, parent of each node, -1 for the root
+- `subtree_end`: int32, end of the subtree of each node
+- `title_offsets`: int64, start of each title in `titles`, empty for folders
+- `titles`: utf-8 blob with table titles
+
+The file is about as large as the search tree text file. It is not meant to
+save space but to load fast: it is memory-mapped and read without parsing.
+"""
+
+import mmap
+from typing import Iterator
+
+import numpy as np
+
+from ifk_analyses.search_checkpoint import atomic_write
+
+MAGIC = b"IFKTREE1"
+HEADER = np.dtype("<i8")
+
+
+def _align(n: int) -> int:
+    """Round up to multiple of 8."""
+    return (n + 7) // 8 * 8
+
+
+def write_compact_tree(tables: list, file_path: str) -> None:
+    """Write tables in compact binary format.
+
+    Args:
+        tables: elements are tuple with search path and title for each table
+        file_path: binary file path
+    """
+    trie: dict = {}
+    table_titles: dict[tuple, str] = {}
+    for path, title in tables:
+        node = trie
+        for node_id in path:
+            node = node.setdefault(node_id, {})
+        table_titles[tuple(path)] = title
+
+    name_index: dict[str, int] = {}
+    node_name: list[int] = [name_index.setdefault("", 0)]
+    parent = [-1]
+    subtree_end = [0]
+    titles = [b""]
+
+    def add(children: dict, path: tuple, parent_index: int) -> None:
+        for node_id, grandchildren in children.items():
+            index = len(node_name)
+            node_name.append(name_index.setdefault(node_id, len(name_index)))
+            parent.append(parent_index)
+            subtree_end.append(0)
+            titles.append(table_titles.get(path + (node_id,), "").encode("utf-8"))
+            add(grandchildren, path + (node_id,), index)
+            subtree_end[index] = len(node_name)
+
+    add(trie, (), 0)
+    subtree_end[0] = len(node_name)
+
+    names = [name.encode("utf-8") for name in name_index]
+    name_offsets = np.zeros(len(names) + 1, dtype="<i8")
+    np.cumsum([len(n) for n in names], out=name_offsets[1:])
+    title_offsets = np.zeros(len(titles) + 1, dtype="<i8")
+    np.cumsum([len(t) for t in titles], out=title_offsets[1:])
+    header = np.array(
+        [len(node_name), len(names), name_offsets[-1], title_offsets[-1]], dtype=HEADER
+    )
+
+    chunks = [
+        MAGIC,
+        header.tobytes(),
+        name_offsets.tobytes(),
+        b"".join(names),
+        np.array(node_name, dtype="<i4").tobytes(),
+        np.array(parent, dtype="<i4").tobytes(),
+        np.array(subtree_end, dtype="<i4").tobytes(),
+        title_offsets.tobytes(),
+        b"".join(titles),
+    ]
+    blob = b"".join(
+        chunk + b"\0" * (_align(len(chunk)) - len(chunk)) for chunk in chunks
+    )
+    atomic_write(file_path, blob)
+
+
+class CompactTree:
+    """Memory-mapped scb search tree in compact binary format."""
+
+    def __init__(self, file_path: str) -> None:
+        """Load tree without copying.
+
+        Args:
+            file_path: binary file path
+
+        Raises:
+            ValueError: if the file is not a compact search tree
+        """
+        with open(file_path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buffer[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{file_path} is not a compact search tree.")
+
+        offset = len(MAGIC)
+
+        def take(dtype: str, count: int) -> np.ndarray:
+            nonlocal offset
+            array = np.frombuffer(self.buffer, dtype=dtype, count=count, offset=offset)
+            offset += _align(array.nbytes)
+            return array
+
+        n_nodes, n_names, name_bytes, title_bytes = (int(n) for n in take("<i8", 4))
+        self.name_offsets = take("<i8", n_names + 1)
+        self.names = take("u1", name_bytes)
+        self.node_name = take("<i4", n_nodes)
+        self.parent = take("<i4", n_nodes)
+        self.subtree_end = take("<i4", n_nodes)
+        self.title_offsets = take("<i8", n_nodes + 1)
+        self.titles = take("u1", title_bytes)
+
+    def __len__(self) -> int:
+        """Number of nodes, including the root."""
+        return len(self.parent)
+
+    def name(self, node: int) -> str:
+        """Scb id of node.
+
+        Args:
+            node: node index
+
+        Returns:
+            str: scb id
+        """
+        i = self.node_name[node]
+        start, end = self.name_offsets[i], self.name_offsets[i + 1]
+        return bytes(self.names[start:end]).decode("utf-8")
+
+    def title(self, node: int) -> str:
+        """Title of table, empty for folders.
+
+        Args:
+            node: node index
+
+        Returns:
+            str: title
+        """
+        start, end = self.title_offsets[node], self.title_offsets[node + 1]
+        return bytes(self.titles[start:end]).decode("utf-8")
+
+    def is_table(self, node: int) -> bool:
+        """Check if node is a table, i.e. a leaf.
+
+        Args:
+            node: node index
+
+        Returns:
+            bool: true for tables
+        """
+        return node > 0 and self.subtree_end[node] == node + 1
+
+    def path(self, node: int) -> list:
+        """Search path of node, reconstructed by following parents.
+
+        Args:
+            node: node index
+
+        Returns:
+            list: scb ids from the top of the tree down to the node
+        """
+        path = []
+        while node > 0:
+            path.append(self.name(node))
+            node = self.parent[node]
+        return path[::-1]
+
+    def children(self, node: int) -> Iterator[int]:
+        """Iterate over children of node.
+
+        Args:
+            node: node index
+
+        Yields:
+            int: child node index
+        """
+        child = node + 1
+        while child < self.subtree_end[node]:
+            yield child
+            child = self.subtree_end[child]
+
+    def find(self, path: list) -> int:
+        """Find node by search path.
+
+        Args:
+            path: list of scb ids
+
+        Returns:
+            int: node index
+
+        Raises:
+            KeyError: if the path is not in the tree
+        """
+        node = 0
+        for node_id in path:
+            node = next((c for c in self.children(node) if self.name(c) == node_id), -1)
+            if node < 0:
+                raise KeyError(f"{path} not in search tree.")
+        return node
+
+    def subtree_tables(self, node: int = 0) -> np.ndarray:
+        """Tables in subtree of node.
+
+        Args:
+            node: node index, defaults to the root
+
+        Returns:
+            np.ndarray: node indices of tables in depth first order
+        """
+        nodes = np.arange(node, self.subtree_end[node])
+        return nodes[(self.subtree_end[nodes] == nodes + 1) & (nodes > 0)]
+
+    def tables(self, node: int = 0) -> list:
+        """Search paths and titles of tables in subtree of node.
+
+        Args:
+            node: node index, defaults to the root
+
+        Returns:
+            list: elements are tuple with search path and title for each table
+        """
+        return [(self.path(t), self.title(t)) for t in self.subtree_tables(node)]
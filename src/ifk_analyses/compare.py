@@ -0,0 +1,138 @@
+"""Vectorized comparison of values between years.
+
+The data is pivoted once into a dense region x year matrix, so values of
+different years are aligned by region rather than by row position. Regions
+missing in a year are NaN. All year pairs are then compared in a single
+broadcast over the matrix columns.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Sequence, cast
+
+import numpy as np
+
+from ifk_analyses._lazy import lazy_import
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+
+class YearComparison:
+    """Region x year matrix with comparisons between pairs of years."""
+
+    def __init__(
+        self,
+        data_df: pd.DataFrame,
+        value_column: str = "chg value",
+        region_column: str = "region",
+        year_column: str = "year",
+    ) -> None:
+        """Pivot data to a region x year matrix.
+
+        Args:
+            data_df: long format data with one row per region and year, if a
+                region and year occur several times the last row is used
+            value_column: column with values to compare
+            region_column: column with region keys
+            year_column: column with years
+        """
+        regions = data_df[region_column]
+        if isinstance(regions.dtype, pd.CategoricalDtype):
+            region_codes = regions.cat.codes.to_numpy()
+            self.regions = pd.Index(regions.cat.categories)
+        else:
+            region_codes, uniques = pd.Series(regions).factorize()
+            self.regions = pd.Index(uniques)
+        self.years, year_codes = np.unique(
+            data_df[year_column].to_numpy(), return_inverse=True
+        )
+
+        self.matrix = np.full((len(self.regions), len(self.years)), np.nan)
+        keep = region_codes >= 0
+        self.matrix[region_codes[keep], year_codes[keep]] = data_df[
+            value_column
+        ].to_numpy(dtype=np.float64)[keep]
+        self.ranks = (
+            pd.DataFrame(self.matrix).rank(ascending=False, method="min").to_numpy()
+        )
+
+    def pair_indices(
+        self, pairs: Optional[Sequence[tuple]] = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Column indices of year pairs.
+
+        Args:
+            pairs: lower and upper year of each pair, None for all pairs of years
+                with the lower year first
+
+        Returns:
+            tuple: column indices of lower and upper years
+
+        Raises:
+            KeyError: if a year is not in the data
+        """
+        if pairs is None:
+            lower, upper = np.triu_indices(len(self.years), k=1)
+            return lower, upper
+        pair_years = np.asarray(pairs).reshape(-1, 2)
+        indices = np.searchsorted(self.years, pair_years)
+        found = indices < len(self.years)
+        found[found] = self.years[indices[found]] == pair_years[found]
+        if not found.all():
+            raise KeyError(f"{pair_years[~found].tolist()} not in data.")
+        return indices[:, 0], indices[:, 1]
+
+    def arrays(self, pairs: Optional[Sequence[tuple]] = None) -> dict:
+        """Compare year pairs as region x pair arrays.
+
+        Args:
+            pairs: lower and upper year of each pair, None for all pairs of years
+                with the lower year first
+
+        Returns:
+            dict: region x pair arrays `lower`, `upper` with the values, `delta`,
+                `ratio`, `cagr` and `rank change`, where a positive rank change
+                means moving towards rank 1, the largest value
+        """
+        lower, upper = self.pair_indices(pairs)
+        lower_values = self.matrix[:, lower]
+        upper_values = self.matrix[:, upper]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = upper_values / lower_values
+            cagr = ratio ** (1 / (self.years[upper] - self.years[lower])) - 1
+        return {
+            "lower": lower_values,
+            "upper": upper_values,
+            "delta": upper_values - lower_values,
+            "ratio": ratio,
+            "cagr": cagr,
+            "rank change": self.ranks[:, lower] - self.ranks[:, upper],
+        }
+
+    def compare(self, pairs: Optional[Sequence[tuple]] = None) -> pd.DataFrame:
+        """Compare year pairs.
+
+        Args:
+            pairs: lower and upper year of each pair, None for all pairs of years
+                with the lower year first
+
+        Returns:
+            pd.DataFrame: one row per region and pair with columns `region`,
+                `lower year`, `upper year` and the arrays of `arrays`
+        """
+        lower, upper = self.pair_indices(pairs)
+        arrays = self.arrays(pairs)
+        n_regions, n_pairs = len(self.regions), len(lower)
+        columns = {
+            "region": pd.Categorical.from_codes(
+                cast(Sequence[int], np.repeat(np.arange(n_regions), n_pairs)),
+                categories=self.regions,
+            ),
+            "lower year": np.tile(self.years[lower], n_regions),
+            "upper year": np.tile(self.years[upper], n_regions),
+        }
+        columns.update({name: array.ravel() for name, array in arrays.items()})
+        return pd.DataFrame(columns)
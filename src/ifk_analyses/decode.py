@@ -0,0 +1,104 @@
+"""Decode scb json responses to DataFrames."""
+
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Optional, Sequence, Union, cast
+
+import numpy as np
+
+from ifk_analyses import instrumentation
+from ifk_analyses._lazy import lazy_import
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+MISSING_VALUES = ("..", "-", ".", "")
+
+
+def decode_response(
+    request_output: Union[dict, bytes, str],
+    key_columns: Sequence[Optional[str]],
+    value_columns: Sequence[Optional[str]],
+    key_dtypes: Optional[dict] = None,
+    key_labels: Optional[dict] = None,
+) -> pd.DataFrame:
+    """Decode scb json response to DataFrame.
+
+    Keys and values of all rows are flattened in a single pass each and decoded
+    in bulk. Key columns become categoricals, which are factorized once so labels
+    and dtype conversions only touch the unique values. Value columns become
+    float64 with scb missing value markers (`..`, `-`, `.`) as NaN.
+
+    Args:
+        request_output: scb response, decoded or raw bytes
+        key_columns: column name of each key in the response, None to skip
+        value_columns: column name of each value in the response, None to skip
+        key_dtypes: dtype of key columns that should not be categorical, e.g. int
+            for years
+        key_labels: mapping from code to label of key columns, e.g. region id to
+            region name
+
+    Returns:
+        pd.DataFrame: decoded data
+    """
+    with instrumentation.span("decode") as attrs:
+        data_df = _decode(
+            request_output, key_columns, value_columns, key_dtypes, key_labels
+        )
+        attrs["rows"] = len(data_df)
+    instrumentation.count("decode.rows", len(data_df))
+    return data_df
+
+
+def _decode(
+    request_output: Union[dict, bytes, str],
+    key_columns: Sequence[Optional[str]],
+    value_columns: Sequence[Optional[str]],
+    key_dtypes: Optional[dict],
+    key_labels: Optional[dict],
+) -> pd.DataFrame:
+    """Decode scb json response to DataFrame, see `decode_response`."""
+    if isinstance(request_output, dict):
+        data = request_output["data"]
+    else:
+        data = json.loads(request_output)["data"]
+    key_dtypes = key_dtypes or {}
+    key_labels = key_labels or {}
+    n_rows = len(data)
+
+    keys = np.array([k for row in data for k in row["key"]], dtype=object).reshape(
+        n_rows, len(key_columns)
+    )
+    values = np.array([v for row in data for v in row["values"]], dtype=object).reshape(
+        n_rows, len(value_columns)
+    )
+
+    columns: dict = {}
+    for i, name in enumerate(key_columns):
+        if name is None:
+            continue
+        codes, uniques = pd.Series(keys[:, i], copy=False).factorize()
+        categories = pd.Index(uniques)
+        if name in key_labels:
+            categories = pd.Index([key_labels[name][u] for u in categories])
+        if name in key_dtypes:
+            columns[name] = categories.astype(key_dtypes[name]).to_numpy()[codes]
+        else:
+            columns[name] = pd.Categorical.from_codes(
+                cast(Sequence[int], codes), categories=categories
+            )
+
+    for i, name in enumerate(value_columns):
+        if name is None:
+            continue
+        column = values[:, i]
+        missing = pd.Series(column).isin(MISSING_VALUES).to_numpy()
+        if missing.any():
+            column = column.copy()
+            column[missing] = np.nan
+        columns[name] = column.astype(np.float64)
+
+    return pd.DataFrame(columns)
@@ -0,0 +1,247 @@
+"""Timing spans, counters and profiling hooks.
+
+Instrumented code reports events, spans with a duration in seconds, counters
+and gauges, to the registered sinks. `Registry` aggregates events in process,
+e.g. for tests, and `JsonLogSink` writes one json object per event to a
+logger. Without sinks, spans and counters only check the list of sinks.
+
+Events reported by the package:
+
+- `scb.request`: span per http request, with method, path and status
+- `scb.bytes`: bytes received
+- `scb.retries`: retried requests, `scb.backoff` spans are the waits between
+- `scb.rate_limit_wait`: span per wait for the rate limiter
+- `cache.hit`, `cache.miss`, `cache.stale`: response cache lookups
+- `crawl.fetched`, `crawl.reused`: nodes of the search tree crawl
+- `decode`: span per decoded response, `decode.rows` rows decoded
+- `pipeline.stage`: span per computed pipeline stage
+- `memory.peak`: gauge of traced peak memory in bytes, see `profile`
+"""
+
+import contextlib
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Iterator, Optional, Protocol, Union
+
+METRICS_LOGGER = "ifk_analyses.metrics"
+
+
+class Sink(Protocol):
+    """Receiver of instrumentation events."""
+
+    def record(self, event: dict) -> None:
+        """Record event with type, name, value, time and attributes."""
+        ...
+
+
+class Registry:
+    """In-process sink aggregating events by name."""
+
+    def __init__(self) -> None:
+        """Initialization."""
+        self.lock = threading.Lock()
+        self.spans: dict[str, list[float]] = {}
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, float] = {}
+        self.events: list[dict] = []
+
+    def record(self, event: dict) -> None:
+        """Aggregate event.
+
+        Args:
+            event: event with type, name, value, time and attributes
+        """
+        name, value = event["name"], event["value"]
+        with self.lock:
+            self.events.append(event)
+            if event["type"] == "span":
+                self.spans.setdefault(name, []).append(value)
+            elif event["type"] == "count":
+                self.counters[name] = self.counters.get(name, 0) + value
+            else:
+                self.gauges[name] = value
+
+    def summary(self) -> dict:
+        """Aggregated events.
+
+        Returns:
+            dict: count, total and max seconds of each span, counters and gauges
+        """
+        with self.lock:
+            spans = {
+                name: {
+                    "count": len(durations),
+                    "total": sum(durations),
+                    "max": max(durations),
+                }
+                for name, durations in self.spans.items()
+            }
+            return {
+                "spans": spans,
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+
+
+class JsonLogSink:
+    """Sink writing one json object per event to a logger."""
+
+    def __init__(
+        self,
+        logger: Union[str, logging.Logger] = METRICS_LOGGER,
+        level: int = logging.INFO,
+    ) -> None:
+        """Initialization.
+
+        Args:
+            logger: logger or logger name
+            level: log level of the events
+        """
+        if isinstance(logger, str):
+            logger = logging.getLogger(logger)
+        self.logger = logger
+        self.level = level
+
+    def record(self, event: dict) -> None:
+        """Log event as json.
+
+        Args:
+            event: event with type, name, value, time and attributes
+        """
+        self.logger.log(self.level, json.dumps(event, default=str))
+
+
+_sinks: list[Sink] = []
+
+
+def add_sink(sink: Sink) -> Sink:
+    """Register sink.
+
+    Args:
+        sink: sink receiving all following events
+
+    Returns:
+        Sink: the registered sink
+    """
+    _sinks.append(sink)
+    return sink
+
+
+def remove_sink(sink: Sink) -> None:
+    """Unregister sink.
+
+    Args:
+        sink: registered sink
+    """
+    _sinks.remove(sink)
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[Registry]:
+    """Collect events of a block in a registry.
+
+    Yields:
+        Registry: registry receiving the events of the block
+    """
+    registry = Registry()
+    add_sink(registry)
+    try:
+        yield registry
+    finally:
+        remove_sink(registry)
+
+
+def _emit(event_type: str, name: str, value: float, attrs: dict) -> None:
+    """Send event to all sinks."""
+    event = {"type": event_type, "name": name, "value": value, "time": time.time()}
+    event.update(attrs)
+    for sink in list(_sinks):
+        sink.record(event)
+
+
+def count(name: str, value: float = 1, **attrs: Any) -> None:
+    """Increment counter.
+
+    Args:
+        name: counter name
+        value: increment
+        attrs: event attributes
+    """
+    if _sinks:
+        _emit("count", name, value, attrs)
+
+
+def gauge(name: str, value: float, **attrs: Any) -> None:
+    """Set gauge.
+
+    Args:
+        name: gauge name
+        value: current value
+        attrs: event attributes
+    """
+    if _sinks:
+        _emit("gauge", name, value, attrs)
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs: Any) -> Iterator[dict]:
+    """Time a block.
+
+    Args:
+        name: span name
+        attrs: event attributes
+
+    Yields:
+        dict: attributes, which the block can add to, e.g. a response status
+    """
+    if not _sinks:
+        yield attrs
+        return
+    start = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        _emit("span", name, time.perf_counter() - start, attrs)
+
+
+@contextlib.contextmanager
+def profile(
+    name: str, directory: Optional[str] = None, memory: bool = False
+) -> Iterator[None]:
+    """Profile a block with cProfile and tracemalloc, both opt-in.
+
+    cProfile only sees the calling thread, and from Python 3.12 only one
+    profiler can be active in the process, so profiled blocks must not overlap.
+
+    Args:
+        name: profile name, the cProfile stats are written to `<name>.prof`,
+            with "/" in the name replaced by "__"
+        directory: directory of cProfile stats, None to not run cProfile
+        memory: trace memory allocations and report the peak as the
+            `memory.peak` gauge
+    """
+    profiler = cProfile.Profile() if directory is not None else None
+    start_tracing = memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    if memory:
+        tracemalloc.reset_peak()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None and directory is not None:
+            profiler.disable()
+            os.makedirs(directory, exist_ok=True)
+            file_name = name.replace("/", "__").replace(os.sep, "__")
+            profiler.dump_stats(os.path.join(directory, f"{file_name}.prof"))
+        if memory:
+            gauge("memory.peak", tracemalloc.get_traced_memory()[1], profile=name)
+        if start_tracing:
+            tracemalloc.stop()
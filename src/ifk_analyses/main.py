@@ -1,6 +1,55 @@
 """Main function."""
 
+import argparse
+import logging
+from typing import Optional, Sequence
 
-def main() -> None:
-    """No implementation yet."""
-    pass
+from ifk_analyses import instrumentation
+from ifk_analyses.pipeline import DEFAULT_PIPELINE_CACHE_DIR, Pipeline
+from ifk_analyses.pipelines import PIPELINES
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Command line interface, `ifk-analyses run <pipeline>`.
+
+    Args:
+        argv: command line arguments, defaults to `sys.argv`
+    """
+    parser = argparse.ArgumentParser(prog="ifk-analyses")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("list", help="list pipelines")
+    run = commands.add_parser("run", help="run pipeline")
+    run.add_argument("pipeline", choices=sorted(PIPELINES))
+    run.add_argument("--force", action="store_true", help="ignore cached stages")
+    run.add_argument("--cache-dir", default=DEFAULT_PIPELINE_CACHE_DIR)
+    run.add_argument("--workers", type=int, default=4, help="concurrent stages")
+    run.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="profile stages one at a time with cProfile and trace peak memory",
+    )
+    run.add_argument(
+        "--metrics-log", metavar="FILE", help="append instrumentation events as json"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        print("\n".join(sorted(PIPELINES)))
+    elif args.command == "run":
+        if args.metrics_log:
+            logger = logging.getLogger(instrumentation.METRICS_LOGGER)
+            logger.addHandler(logging.FileHandler(args.metrics_log))
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            instrumentation.add_sink(instrumentation.JsonLogSink(logger))
+        pipeline = Pipeline(
+            PIPELINES[args.pipeline](),
+            args.cache_dir,
+            max_workers=args.workers,
+            profile_dir=args.profile,
+            trace_memory=args.profile is not None,
+        )
+        for name, output in pipeline.run(force=args.force).items():
+            print(f"# {name}\n{output}")
+    else:
+        parser.print_help()
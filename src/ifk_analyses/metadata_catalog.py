@@ -0,0 +1,337 @@
+"""Local catalog of scb table metadata.
+
+The variables, value codes and value texts of every table are stored in an
+sqlite database, indexed by table path, variable and code or text, and read
+through a memory map. It is filled while crawling the search tree and when a
+table is first used, so code to label lookups, resolving variables by name and
+validating queries need no api call.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Sequence
+
+DEFAULT_METADATA_CATALOG_PATH = "data/metadata.sqlite"
+MMAP_SIZE = 256 * 1024**2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tables (
+    path TEXT PRIMARY KEY, title TEXT, updated TEXT, checked REAL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS variables (
+    path TEXT, position INT, code TEXT, text TEXT, time INT, elimination INT,
+    PRIMARY KEY (path, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS vals (
+    path TEXT, variable INT, position INT, code TEXT, text TEXT,
+    PRIMARY KEY (path, variable, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS vals_code ON vals (path, variable, code);
+CREATE INDEX IF NOT EXISTS vals_text ON vals (path, variable, text);
+"""
+
+
+def table_path(path: Sequence[str]) -> str:
+    """Key of table in the catalog.
+
+    Args:
+        path: list of scb ids, with or without the leading START
+
+    Returns:
+        str: ids joined by slashes
+    """
+    return "/".join(p for p in path if p != "START")
+
+
+def _normalize_name(name: str) -> str:
+    """Casefold and remove spaces."""
+    return name.replace(" ", "").casefold()
+
+
+def find_variable(variables: list, name: str) -> dict:
+    """Find variable by code or text.
+
+    Args:
+        variables: variables from the table metadata
+        name: variable code or text, ignoring case and spaces
+
+    Returns:
+        dict: variable
+
+    Raises:
+        KeyError: if no variable has the code or text
+    """
+    name = _normalize_name(name)
+    for variable in variables:
+        if name in (
+            _normalize_name(variable["code"]),
+            _normalize_name(variable["text"]),
+        ):
+            return variable
+    raise KeyError(f"No variable {name}.")
+
+
+class MetadataCatalog:
+    """Sqlite catalog of table titles, variables and values."""
+
+    def __init__(self, file_path: str = DEFAULT_METADATA_CATALOG_PATH) -> None:
+        """Open catalog, creating it if missing.
+
+        Args:
+            file_path: sqlite database path
+        """
+        self.file_path = file_path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(file_path, check_same_thread=False)
+        self.db.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        self.db.executescript(SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(tables)")}
+        if "checked" not in columns:
+            # catalogs written before entries were checked for updates
+            self.db.execute("ALTER TABLE tables ADD COLUMN checked REAL")
+        self.db.commit()
+
+    def __contains__(self, path: object) -> bool:
+        """Check if a table, as list of scb ids, is in the catalog."""
+        if not isinstance(path, (list, tuple)):
+            return False
+        with self.lock:
+            row = self.db.execute(
+                "SELECT 1 FROM tables WHERE path = ?", (table_path(path),)
+            ).fetchone()
+        return row is not None
+
+    def put(
+        self, path: Sequence[str], info: dict, updated: Optional[str] = None
+    ) -> None:
+        """Store table metadata, replacing any previous entry.
+
+        Args:
+            path: list of scb ids
+            info: table metadata from scb, with title and variables
+            updated: timestamp of the table from the parent listing
+        """
+        key = table_path(path)
+        variables = info.get("variables", [])
+        with self.lock:
+            self.db.execute("DELETE FROM vals WHERE path = ?", (key,))
+            self.db.execute("DELETE FROM variables WHERE path = ?", (key,))
+            self.db.execute(
+                "INSERT OR REPLACE INTO tables VALUES (?, ?, ?, ?)",
+                (key, info.get("title", ""), updated, time.time()),
+            )
+            self.db.executemany(
+                "INSERT INTO variables VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (
+                        key,
+                        i,
+                        variable["code"],
+                        variable["text"],
+                        bool(variable.get("time")),
+                        bool(variable.get("elimination")),
+                    )
+                    for i, variable in enumerate(variables)
+                ),
+            )
+            self.db.executemany(
+                "INSERT INTO vals VALUES (?, ?, ?, ?, ?)",
+                (
+                    (key, i, j, code, text)
+                    for i, variable in enumerate(variables)
+                    for j, (code, text) in enumerate(
+                        zip(variable["values"], variable["valueTexts"])
+                    )
+                ),
+            )
+            self.db.commit()
+
+    def tables(self) -> list:
+        """Tables in the catalog.
+
+        Returns:
+            list: elements are tuple with search path and title for each table
+        """
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT path, title FROM tables ORDER BY path"
+            ).fetchall()
+        return [(path.split("/"), title) for path, title in rows]
+
+    def updated(self, path: Sequence[str]) -> Optional[str]:
+        """Timestamp of table from the parent listing when it was stored.
+
+        Args:
+            path: list of scb ids
+
+        Returns:
+            Optional[str]: timestamp, None if unknown
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT updated FROM tables WHERE path = ?", (table_path(path),)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def checked(self, path: Sequence[str]) -> Optional[float]:
+        """Time when the table was last stored or checked for updates.
+
+        Args:
+            path: list of scb ids
+
+        Returns:
+            Optional[float]: seconds since the epoch, None if unknown
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT checked FROM tables WHERE path = ?", (table_path(path),)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def touch(self, path: Sequence[str], updated: Optional[str] = None) -> None:
+        """Record that the stored table was checked and is up to date.
+
+        Args:
+            path: list of scb ids
+            updated: timestamp of the table from the parent listing, to record
+                if the stored one is unknown
+        """
+        with self.lock:
+            self.db.execute(
+                "UPDATE tables SET checked = ?, updated = COALESCE(updated, ?) "
+                "WHERE path = ?",
+                (time.time(), updated, table_path(path)),
+            )
+            self.db.commit()
+
+    def variables(self, path: Sequence[str]) -> list:
+        """Variables of table, in the format of the scb metadata.
+
+        Args:
+            path: list of scb ids
+
+        Returns:
+            list: variables with code, text, values and valueTexts
+
+        Raises:
+            KeyError: if the table is not in the catalog
+        """
+        key = table_path(path)
+        if path not in self:
+            raise KeyError(f"{key} not in metadata catalog.")
+        with self.lock:
+            variable_rows = self.db.execute(
+                "SELECT code, text, time, elimination FROM variables "
+                "WHERE path = ? ORDER BY position",
+                (key,),
+            ).fetchall()
+            value_rows = self.db.execute(
+                "SELECT variable, code, text FROM vals "
+                "WHERE path = ? ORDER BY variable, position",
+                (key,),
+            ).fetchall()
+        variables: list[dict] = []
+        for code, text, is_time, elimination in variable_rows:
+            variable = {"code": code, "text": text, "values": [], "valueTexts": []}
+            if elimination:
+                variable["elimination"] = True
+            if is_time:
+                variable["time"] = True
+            variables.append(variable)
+        for i, code, text in value_rows:
+            variables[i]["values"].append(code)
+            variables[i]["valueTexts"].append(text)
+        return variables
+
+    def info(self, path: Sequence[str]) -> dict:
+        """Table metadata, as returned by scb.
+
+        Args:
+            path: list of scb ids
+
+        Returns:
+            dict: title and variables
+
+        Raises:
+            KeyError: if the table is not in the catalog
+        """
+        variables = self.variables(path)
+        with self.lock:
+            (title,) = self.db.execute(
+                "SELECT title FROM tables WHERE path = ?", (table_path(path),)
+            ).fetchone()
+        return {"title": title, "variables": variables}
+
+    def variable(self, path: Sequence[str], name: str) -> dict:
+        """Variable of table by code or text.
+
+        Args:
+            path: list of scb ids
+            name: variable code or text, ignoring case and spaces
+
+        Returns:
+            dict: variable
+
+        Raises:
+            KeyError: if the table or variable is not in the catalog
+        """
+        return find_variable(self.variables(path), name)
+
+    def labels(self, path: Sequence[str], name: str) -> dict:
+        """Value texts of a variable.
+
+        Args:
+            path: list of scb ids
+            name: variable code or text
+
+        Returns:
+            dict: value text keyed by value code
+        """
+        variable = self.variable(path, name)
+        return dict(zip(variable["values"], variable["valueTexts"]))
+
+    def codes(self, path: Sequence[str], name: str, texts: Sequence[str]) -> list:
+        """Value codes of value texts.
+
+        Args:
+            path: list of scb ids
+            name: variable code or text
+            texts: value texts
+
+        Returns:
+            list: value codes in the order of `texts`
+
+        Raises:
+            KeyError: if a text is not a value of the variable
+        """
+        variable = self.variable(path, name)
+        codes = dict(zip(variable["valueTexts"], variable["values"]))
+        missing = [text for text in texts if text not in codes]
+        if missing:
+            raise KeyError(f"{missing} not values of {variable['code']}.")
+        return [codes[text] for text in texts]
+
+    def validate(self, path: Sequence[str], query: dict) -> None:
+        """Check that a query only selects existing variables and values.
+
+        Args:
+            path: list of scb ids
+            query: scb query with item selections
+
+        Raises:
+            KeyError: if the table is not in the catalog
+            ValueError: if a variable or value code is unknown
+        """
+        variables = {v["code"]: set(v["values"]) for v in self.variables(path)}
+        for item in query.get("query", []):
+            code = item["code"]
+            if code not in variables:
+                raise ValueError(f"Unknown variable {code} in {table_path(path)}.")
+            if item["selection"].get("filter") != "item":
+                continue
+            unknown = set(item["selection"]["values"]) - variables[code]
+            if unknown:
+                raise ValueError(f"Unknown values {sorted(unknown)} of {code}.")
@@ -0,0 +1,89 @@
+"""Exact break-even distances of vehicles and scenarios.
+
+Cumulative CO2 curves are piecewise linear in the driven distance: each segment
+adds the build cost of its vehicle as a jump at its start and the consumption
+cost as the slope. Break-even distances are therefore solved analytically
+instead of read off curves sampled on a distance axis.
+"""
+
+import numpy as np
+
+from ifk_analyses.objects.personal_vehicle_lca import Scenarios, co2_costs
+
+
+def vehicle_break_even(vehicles: np.ndarray) -> np.ndarray:
+    """Break-even distance of every pair of vehicles bought new at the same time.
+
+    Args:
+        vehicles: structured array from `vehicle_table`
+
+    Returns:
+        np.ndarray: vehicle x vehicle array with the driven distance where the
+            cumulative CO2 of the two vehicles is equal, NaN if the curves do not
+            cross at a positive distance
+    """
+    build_cost, cost_per_km = co2_costs(vehicles)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        distance = (build_cost[None, :] - build_cost[:, None]) / (
+            cost_per_km[:, None] - cost_per_km[None, :]
+        )
+    return np.where(distance > 0, distance, np.nan)
+
+
+def scenario_break_even(vehicles: np.ndarray, scenarios: Scenarios) -> np.ndarray:
+    """Break-even distance of every pair of scenarios.
+
+    The start distances of all segments split the distance axis in intervals
+    where all curves are linear. For each pair of scenarios, crossings are solved
+    in closed form within each interval, and at the interval starts where a jump
+    changes which scenario has emitted the most.
+
+    Args:
+        vehicles: structured array from `vehicle_table`
+        scenarios: segments of each scenario
+
+    Returns:
+        np.ndarray: scenario x scenario array with the first driven distance
+            after the earliest segment start where one scenario overtakes the
+            other, NaN if they never cross
+    """
+    build_cost, cost_per_km = co2_costs(vehicles)
+    starts = np.unique(scenarios.start[np.isfinite(scenarios.start)])
+
+    # Active segment of each scenario on each interval, -1 before its first.
+    started = scenarios.start[:, :, None] <= starts[None, None, :]
+    active = started.sum(axis=1) - 1
+    index = np.take_along_axis(scenarios.vehicle, np.maximum(active, 0), axis=1)
+    used = (active >= 0) & (index >= 0)
+    slope = np.where(used, cost_per_km[index], 0)
+
+    # Cumulative CO2 at the start of each interval, before and after its jumps.
+    jumps = np.zeros((len(scenarios.vehicle), len(starts)))
+    for k in range(scenarios.vehicle.shape[1]):
+        index = scenarios.vehicle[:, k]
+        at = np.searchsorted(starts, scenarios.start[:, k])
+        valid = (index >= 0) & np.isfinite(scenarios.start[:, k])
+        np.add.at(jumps, (np.nonzero(valid)[0], at[valid]), build_cost[index[valid]])
+    length = np.diff(starts)
+    before = np.zeros_like(jumps)
+    before[:, 1:] = np.cumsum(jumps[:, :-1] + slope[:, :-1] * length, axis=1)
+    after = before + jumps
+
+    diff_before = before[:, None, :] - before[None, :, :]
+    diff_after = after[:, None, :] - after[None, :, :]
+    diff_slope = slope[:, None, :] - slope[None, :, :]
+
+    jump_crossing = (diff_before * diff_after < 0) | (
+        (diff_after == 0) & (diff_before != 0)
+    )
+    jump_crossing[:, :, 0] = False
+    with np.errstate(divide="ignore", invalid="ignore"):
+        offset = -diff_after / diff_slope
+    interval_length = np.append(length, np.inf)
+    interval_crossing = (diff_after != 0) & (offset > 0) & (offset < interval_length)
+
+    candidates = np.full(diff_after.shape, np.inf)
+    candidates = np.where(interval_crossing, starts + offset, candidates)
+    candidates = np.where(jump_crossing, starts, candidates)
+    first = candidates.min(axis=2)
+    return np.where(np.isfinite(first), first, np.nan)
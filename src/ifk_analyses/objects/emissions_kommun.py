@@ -16,41 +16,294 @@ Mer information om beräkningsmetodiken och underlagsdata som används för
 residensjusteringen redovisas i statistikens Kvalitetsdeklarationen.
 """
 
-import pandas as pd
-from pyscbwrapper import SCB
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING, Iterator, Optional
+
+import requests
+
+from ifk_analyses._lazy import lazy_import
+from ifk_analyses.cache import CacheMiss
+from ifk_analyses.compare import YearComparison
+from ifk_analyses.decode import decode_response
+from ifk_analyses.metadata_catalog import MetadataCatalog, find_variable
+from ifk_analyses.query_planner import (
+    SCB_MAX_CELLS,
+    build_query,
+    fetch_chunks,
+    iter_chunks,
+    plan_chunks,
+)
+from ifk_analyses.regions import fetch_population
+from ifk_analyses.scb_api import ScbClient
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from ifk_analyses import scb_wrapper
+    from ifk_analyses.store import TableStore
+else:
+    pd = lazy_import("pandas")
+    scb_wrapper = lazy_import("ifk_analyses.scb_wrapper")
+
+METADATA_MAX_AGE = 24 * 3600.0
 
 
 class FetchData:
     """Class for emissions by kommun and year."""
 
     def __init__(
-        self, emission_type: str = "växthusgaser, kiloton koldioxidekvivalenter"
+        self,
+        emission_type: str = "växthusgaser, kiloton koldioxidekvivalenter",
+        client: Optional[ScbClient] = None,
+        catalog: Optional[MetadataCatalog] = None,
+        metadata_max_age: Optional[float] = METADATA_MAX_AGE,
     ):
         """Initialize.
 
+        The table variables are read from the metadata catalog. They are fetched
+        from scb, and stored in the catalog, if the table is missing there, and
+        refreshed with `refresh_metadata` if they were last checked more than
+        `metadata_max_age` seconds ago.
+
         Args:
             emission_type: emission type to fetch
+            client: scb client, defaults to a client with a local response cache
+            catalog: metadata catalog, defaults to the local catalog
+            metadata_max_age: maximum age in seconds of the table variables,
+                None for no limit
         """
         self.emission_type = emission_type
         self.query = ["MI", "MI1301", "MI1301B", "UtslappKommun"]
-        self.scb = SCB("sv")
+        self.scb = scb_wrapper.CachedSCB("sv", client=client)
         self.scb.go_down(*self.query)
-        self.region_id = self.scb.info()["variables"][0]["values"]
-        self.regioner = self.scb.info()["variables"][0]["valueTexts"]
-        self.years = self.scb.info()["variables"][3]["values"]
+        self.catalog = catalog if catalog is not None else MetadataCatalog()
+        if self.query not in self.catalog:
+            self.catalog.put(self.query, self.scb.info())
+        self._read_variables()
+        checked = self.catalog.checked(self.query)
+        if metadata_max_age is not None and (
+            checked is None or time.time() - checked > metadata_max_age
+        ):
+            self.refresh_metadata()
+
+    def refresh_metadata(self) -> bool:
+        """Refresh the table variables if the table was updated at scb.
+
+        The `updated` timestamp of the table is read from its parent listing. If
+        it differs from the catalog, the variables are fetched and stored in the
+        catalog, and cached responses of the table are dropped. If the catalog
+        has no timestamp yet, it is only recorded.
 
-    def get(self) -> dict:
+        Nothing is refreshed if the cache is offline or the listing cannot be
+        read, and the catalog entry is kept.
+
+        Returns:
+            bool: True if the variables were refreshed
+        """
+        client = self.scb.client
+        if client.cache is not None and client.cache.offline:
+            return False
+        try:
+            updated = client.updated(self.query)
+        except (CacheMiss, requests.RequestException):
+            return False
+        previous = self.catalog.updated(self.query)
+        if previous is None or (updated is not None and updated == previous):
+            self.catalog.touch(self.query, updated)
+            return False
+        info, _ = client.get_with_etag(self.query)
+        self.catalog.put(self.query, info, updated)
+        self._read_variables()
+        if client.cache is not None:
+            client.cache.invalidate(self.query)
+        return True
+
+    def _read_variables(self) -> None:
+        """Read the table variables from the metadata catalog."""
+        self.variables = self.catalog.variables(self.query)
+        regions = find_variable(self.variables, "Region")
+        self.region_id = regions["values"]
+        self.regioner = regions["valueTexts"]
+        substances = find_variable(self.variables, "Amne")
+        self.substance_id = substances["values"]
+        self.substances = substances["valueTexts"]
+        self.years = find_variable(self.variables, "Tid")["values"]
+
+    def chunks(
+        self,
+        max_cells: int = SCB_MAX_CELLS,
+        substances: Optional[list] = None,
+        years: Optional[list] = None,
+    ) -> list:
+        """Plan query for all regions and years in chunks.
+
+        Args:
+            max_cells: maximum number of cells per request
+            substances: emission types to include, defaults to `emission_type`
+            years: year codes to include, defaults to all years
+
+        Returns:
+            list: selections of at most `max_cells` cells each
+
+        Raises:
+            KeyError: if an emission type is not a value of the table
+            ValueError: if a year is not a value of the table
+        """
+        selection = {
+            "Region": self.catalog.codes(self.query, "Region", self.regioner),
+            "Amne": self.catalog.codes(
+                self.query, "Amne", substances or [self.emission_type]
+            ),
+            "Tid": list(self.years if years is None else years),
+        }
+        self.catalog.validate(self.query, build_query(selection))
+        return plan_chunks(selection, max_cells)
+
+    def get(self, max_workers: int = 4) -> dict:
         """Get data from scb.
 
+        Queries above the scb cell limit are split in chunks, which are fetched
+        concurrently and merged.
+
+        Args:
+            max_workers: number of concurrent requests
+
         Returns:
             dict: data from scb
         """
-        self.scb.set_query(
-            region=self.regioner, ämne=[self.emission_type], år=self.years
+        return fetch_chunks(self.scb.client, self.query, self.chunks(), max_workers)
+
+    @property
+    def table_id(self) -> str:
+        """Id of the fetched table in a `TableStore`."""
+        return "/".join(self.query + [self.emission_type])
+
+    def load(
+        self,
+        store: "TableStore",
+        max_age: Optional[float] = None,
+        filters: Optional[dict] = None,
+    ) -> pd.DataFrame:
+        """Read data from the local store, fetching it from scb if missing.
+
+        Args:
+            store: local table store
+            max_age: maximum age in seconds of the stored data, None for no limit
+            filters: allowed value or list of values keyed by column, e.g.
+                `{"year": [2016, 2021]}`
+
+        Returns:
+            pd.DataFrame: scb data as DataFrame
+        """
+        return store.read_or_fetch(
+            self.table_id,
+            lambda: self.dict_to_dataframe(self.get()),
+            max_age=max_age,
+            filters=filters,
         )
 
-        self.scb.get_query()
-        return self.scb.get_data()
+    def sync(
+        self,
+        store: "TableStore",
+        revised: int = 2,
+        filters: Optional[dict] = None,
+        max_workers: int = 4,
+    ) -> pd.DataFrame:
+        """Read data from the local store after fetching new and revised years.
+
+        The table variables and years are first refreshed with
+        `refresh_metadata`. Only years missing in the store, and the latest
+        `revised` stored years when the table was updated, are then fetched and
+        merged into the store.
+
+        Args:
+            store: local table store
+            revised: number of latest stored years to fetch again on updates
+            filters: allowed value or list of values keyed by column
+            max_workers: number of concurrent requests
+
+        Returns:
+            pd.DataFrame: scb data as DataFrame
+        """
+        client = self.scb.client
+        self.refresh_metadata()
+        updated = self.catalog.updated(self.query)
+
+        def fetch(years: list) -> pd.DataFrame:
+            chunks = self.chunks(years=years)
+            return self.dict_to_dataframe(
+                fetch_chunks(client, self.query, chunks, max_workers)
+            )
+
+        return store.sync(
+            self.table_id,
+            fetch,
+            self.years,
+            updated,
+            keys=["region code", "year"],
+            revised=revised,
+            filters=filters,
+        )
+
+    def get_substances(
+        self, substances: Optional[list] = None, max_workers: int = 4
+    ) -> pd.DataFrame:
+        """Get data for several emission types at once.
+
+        All emission types are selected in one query, which is split in as few
+        chunks as the scb cell limit allows. The session and table metadata of
+        this instance are reused.
+
+        Args:
+            substances: emission types to fetch, as listed by
+                `print_emission_labels`, defaults to all
+            max_workers: number of concurrent requests
+
+        Returns:
+            pd.DataFrame: scb data in long format with a substance column
+        """
+        chunks = self.chunks(substances=substances or self.substances)
+        response = fetch_chunks(self.scb.client, self.query, chunks, max_workers)
+        data_df = decode_response(
+            response,
+            key_columns=["region", "substance", "year"],
+            value_columns=["chg value"],
+            key_dtypes={"year": int},
+            key_labels={
+                "region": dict(zip(self.region_id, self.regioner)),
+                "substance": dict(zip(self.substance_id, self.substances)),
+            },
+        )
+        data_df["region"] = data_df["region"].cat.set_categories(self.regioner)
+        data_df["region code"] = data_df["region"].cat.rename_categories(self.region_id)
+        data_df["substance"] = data_df["substance"].cat.set_categories(
+            substances or self.substances
+        )
+        return data_df
+
+    def iter_batches(
+        self, max_cells: int = SCB_MAX_CELLS, max_workers: int = 4
+    ) -> Iterator[pd.DataFrame]:
+        """Get data from scb as DataFrame batches.
+
+        Each batch is decoded as soon as its response arrives and the response is
+        dropped, so memory use is bounded by the batch size instead of the table
+        size. Write the batches to disk with `arrow_io.write_batches`.
+
+        Args:
+            max_cells: maximum number of cells per batch
+            max_workers: number of concurrent requests
+
+        Yields:
+            pd.DataFrame: scb data as DataFrame, in the same format as
+                `dict_to_dataframe`
+        """
+        for response in iter_chunks(
+            self.scb.client, self.query, self.chunks(max_cells), max_workers
+        ):
+            yield self.dict_to_dataframe(response)
 
     def dict_to_dataframe(self, request_output: dict) -> pd.DataFrame:
         """Output dict to dataframe.
@@ -61,38 +314,60 @@ class FetchData:
         Returns:
             pd.DataFrame: scb data as DataFrame
         """
-        n_data = len(request_output["data"])
-
-        def map_id_to_name() -> list:
-            """Map kommun id to kommun."""
-            map_id_to_name_dict = dict(zip(self.region_id, self.regioner))
-            reg_ids = [request_output["data"][i]["key"][0] for i in range(n_data)]
-            region_names = [map_id_to_name_dict[id] for id in reg_ids]
-            return region_names
-
-        data_dict = {
-            "region": map_id_to_name(),
-            "year": [int(request_output["data"][i]["key"][2]) for i in range(n_data)],
-            # 'substance': [request_output['data'][i]['key'][1] for i in range(n_data)],
-            "chg value": [
-                float(request_output["data"][i]["values"][0]) for i in range(n_data)
-            ],
-        }
+        return decode_emissions(request_output, self.variables)
+
+    def population(
+        self, years: Optional[list] = None, max_workers: int = 4
+    ) -> pd.DataFrame:
+        """Get population of the regions of the table, for per capita values.
+
+        Args:
+            years: year codes, defaults to the years of the table
+            max_workers: number of concurrent requests
 
-        return pd.DataFrame.from_dict(data_dict)
+        Returns:
+            pd.DataFrame: region code, year and population
+        """
+        return fetch_population(
+            self.scb.client, self.region_id, years or self.years, max_workers
+        )
 
     def print_emission_labels(self) -> None:
         """Print all availible emissions."""
-        availible_emissions = self.scb.get_variables()["ämne"]
-        print("\n".join(availible_emissions))
+        print("\n".join(self.substances))
         pass
 
 
+def decode_emissions(request_output: dict, variables: list) -> pd.DataFrame:
+    """Decode emissions of one emission type to DataFrame.
+
+    Args:
+        request_output: scb raw output data
+        variables: variables from the table metadata
+
+    Returns:
+        pd.DataFrame: scb data as DataFrame
+    """
+    regions = find_variable(variables, "Region")
+    data_df = decode_response(
+        request_output,
+        key_columns=["region", None, "year"],
+        value_columns=["chg value"],
+        key_dtypes={"year": int},
+        key_labels={"region": dict(zip(regions["values"], regions["valueTexts"]))},
+    )
+    data_df["region"] = data_df["region"].cat.set_categories(regions["valueTexts"])
+    data_df["region code"] = data_df["region"].cat.rename_categories(regions["values"])
+    return data_df
+
+
 def compare_years_and_sort_chg(
     data_df: pd.DataFrame, lower_year: int, upper_year: int
 ) -> pd.DataFrame:
     """Compare CHG between two years.
 
+    Years are aligned by region, regions missing in one of the years get NaN.
+
     Args:
         data_df: scb output data
         lower_year: lower year to comapare
@@ -101,27 +376,27 @@ def compare_years_and_sort_chg(
     Returns:
         pd.DataFrame: compiled data for lower and upper year
     """
-    data_lower_reg = data_df[data_df["year"] == lower_year].sort_values(by=["region"])
-    data_upper_reg = data_df[data_df["year"] == upper_year].sort_values(by=["region"])
-    diff = (
-        data_upper_reg["chg value"].to_numpy() / data_lower_reg["chg value"].to_numpy()
+    comparison = YearComparison(data_df).compare([(lower_year, upper_year)])
+    data_compiled = pd.DataFrame(
+        {
+            "region": comparison["region"],
+            "year": upper_year,
+            f"chg {upper_year}": comparison["upper"],
+            f"chg {lower_year}": comparison["lower"],
+            f"diff {lower_year}": comparison["ratio"],
+        }
     )
-
-    data_upper_reg["chg " + str(lower_year)] = data_lower_reg["chg value"].to_numpy()
-    data_upper_reg["diff " + str(lower_year)] = diff
-    data_upper_reg.rename(columns={"chg value": "chg 2021"}, inplace=True)
-
-    data_compiled = data_upper_reg.sort_values(by=["chg 2021"], ascending=False)
-
-    return data_compiled
+    return data_compiled.sort_values(by=[f"chg {upper_year}"], ascending=False)
 
 
 if __name__ == "__main__":
+    from ifk_analyses.store import TableStore
+
     fData = FetchData()
     # fData.print_emission_labels()
-    data_df = fData.dict_to_dataframe(fData.get())
-
     year0 = 2016
     year1 = 2021
+    data_df = fData.load(TableStore(), filters={"year": [year0, year1]})
+
     pd.set_option("display.max_rows", None)
     print(compare_years_and_sort_chg(data_df, year0, year1))
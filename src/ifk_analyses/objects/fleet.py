@@ -0,0 +1,130 @@
+"""Cohort simulation of vehicle fleets.
+
+The fleet is a vehicle type x age array with the number of vehicles of each
+cohort. Each year all vehicles drive, a share of each cohort is scrapped and
+replaced by new vehicles split over the vehicle types by the sales shares of
+the scenario. Vehicle types are rows of a structured array from
+`personal_vehicle_lca.vehicle_table`, e.g. one per fuel type.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Sequence, Union
+
+import numpy as np
+
+from ifk_analyses._lazy import lazy_import
+from ifk_analyses.objects.personal_vehicle_lca import co2_costs
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+
+def scrappage_rates(max_age: int, mean_life: float, shape: float = 4.0) -> np.ndarray:
+    """Yearly scrappage rate by age from a Weibull distributed vehicle life.
+
+    Args:
+        max_age: oldest age, which also holds all older vehicles
+        mean_life: mean vehicle life in years
+        shape: Weibull shape, larger for less spread in vehicle life
+
+    Returns:
+        np.ndarray: share of the vehicles of each age scrapped during a year
+    """
+    scale = mean_life / math.gamma(1 + 1 / shape)
+    ages = np.arange(max_age + 1)
+    survival = np.exp(-((ages / scale) ** shape))
+    next_survival = np.exp(-(((ages + 1) / scale) ** shape))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(survival > 0, 1 - next_survival / survival, 1.0)
+    return rates
+
+
+def stock_from_frame(
+    data_df: pd.DataFrame,
+    types: Sequence,
+    max_age: int,
+    type_column: str = "fuel",
+    age_column: str = "age",
+    value_column: str = "value",
+) -> np.ndarray:
+    """Fleet array from a long table of vehicle stock, e.g. from scb or Trafa.
+
+    Args:
+        data_df: vehicle stock with one row per vehicle type and age
+        types: vehicle types in the order of the vehicle table, rows with other
+            types are ignored
+        max_age: oldest age, older vehicles are added to it
+        type_column: column with vehicle types
+        age_column: column with ages in years
+        value_column: column with the number of vehicles
+
+    Returns:
+        np.ndarray: vehicle type x age array with the number of vehicles
+    """
+    type_index = pd.Index(types).get_indexer(data_df[type_column])
+    ages = np.minimum(data_df[age_column].to_numpy(dtype=int), max_age)
+    keep = type_index >= 0
+    stock = np.zeros((len(types), max_age + 1))
+    np.add.at(
+        stock,
+        (type_index[keep], ages[keep]),
+        data_df[value_column].to_numpy(dtype=np.float64)[keep],
+    )
+    return stock
+
+
+def simulate_fleet(
+    vehicles: np.ndarray,
+    stock: np.ndarray,
+    sales_share: np.ndarray,
+    km_per_year: Union[float, np.ndarray],
+    scrap_rate: np.ndarray,
+    growth: float = 0.0,
+) -> dict:
+    """Project fleet and emissions year by year.
+
+    Args:
+        vehicles: structured array from `vehicle_table`, one row per type
+        stock: vehicle type x age array with the current number of vehicles
+        sales_share: year x vehicle type array with the share of new vehicles of
+            each type, the number of rows is the number of simulated years
+        km_per_year: driven distance per vehicle and year, scalar or by type
+        scrap_rate: share of vehicles scrapped each year by age, e.g. from
+            `scrappage_rates`
+        growth: yearly relative growth of the fleet
+
+    Returns:
+        dict: year x type x age array `stock` at the start of each year and year
+            x type arrays with the number of `new` vehicles, CO2 from `driving`
+            and from `manufacturing`
+    """
+    build_cost, cost_per_km = co2_costs(vehicles)
+    km_per_year = np.broadcast_to(
+        np.asarray(km_per_year, dtype=np.float64), (len(vehicles),)
+    )
+    n_years = len(sales_share)
+
+    history = np.empty((n_years,) + stock.shape)
+    new = np.empty((n_years, len(vehicles)))
+    current = stock.astype(np.float64, copy=True)
+    scrapped = np.empty_like(current)
+    for year in range(n_years):
+        history[year] = current
+        np.multiply(current, scrap_rate, out=scrapped)
+        current -= scrapped
+        total_new = scrapped.sum() + growth * history[year].sum()
+        current[:, -1] += current[:, -2]
+        current[:, 1:-1] = current[:, :-2]
+        current[:, 0] = total_new * sales_share[year]
+        new[year] = current[:, 0]
+
+    return {
+        "stock": history,
+        "new": new,
+        "driving": history.sum(axis=2) * km_per_year * cost_per_km,
+        "manufacturing": new * build_cost,
+    }
@@ -0,0 +1,267 @@
+"""Parameter sweeps and sensitivity analysis of the vehicle LCA.
+
+Samples are dicts of equally long arrays keyed by parameter name. A model maps
+samples to a dict of output arrays and is evaluated vectorized, in chunks that
+can be spread over a process pool. `switch_model` is the comparison from the
+passenger vehicle notebook: keep driving a petrol car or switch to an electric
+car, optionally combined with biking.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable, Optional, Sequence
+
+import numpy as np
+
+from ifk_analyses._lazy import lazy_import
+from ifk_analyses.objects.personal_vehicle_lca import Vehicle
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+Model = Callable[[dict], dict]
+
+
+def grid(**values: Sequence[float]) -> dict:
+    """Cartesian grid of parameter values.
+
+    Args:
+        values: values of each parameter
+
+    Returns:
+        dict: samples with one element per combination
+    """
+    mesh = np.meshgrid(*(np.asarray(v, dtype=np.float64) for v in values.values()))
+    return {name: m.ravel() for name, m in zip(values, mesh)}
+
+
+def monte_carlo(bounds: dict, n: int, seed: Optional[int] = None) -> dict:
+    """Uniform random samples.
+
+    Args:
+        bounds: lower and upper bound of each parameter
+        n: number of samples
+        seed: random seed
+
+    Returns:
+        dict: samples
+    """
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(lo, hi, n) for name, (lo, hi) in bounds.items()}
+
+
+def latin_hypercube(bounds: dict, n: int, seed: Optional[int] = None) -> dict:
+    """Latin hypercube samples.
+
+    Each parameter range is split in `n` equally wide strata with exactly one
+    sample in each, paired randomly between parameters.
+
+    Args:
+        bounds: lower and upper bound of each parameter
+        n: number of samples
+        seed: random seed
+
+    Returns:
+        dict: samples
+    """
+    rng = np.random.default_rng(seed)
+    samples = {}
+    for name, (lo, hi) in bounds.items():
+        unit = (rng.permutation(n) + rng.uniform(size=n)) / n
+        samples[name] = lo + (hi - lo) * unit
+    return samples
+
+
+def _evaluate(model: Model, samples: dict) -> dict:
+    """Evaluate model, module level so it can be sent to a process pool."""
+    return model(samples)
+
+
+def sweep(
+    model: Model,
+    samples: dict,
+    chunk_size: int = 100_000,
+    processes: Optional[int] = 1,
+) -> dict:
+    """Evaluate model on samples in chunks.
+
+    Args:
+        model: vectorized model, must be picklable for processes other than 1,
+            e.g. a module level function or a `functools.partial` of one
+        samples: parameter samples
+        chunk_size: number of samples per chunk
+        processes: number of processes, None for one per core, 1 to evaluate in
+            this process
+
+    Returns:
+        dict: model outputs for all samples, in sample order
+    """
+    n = len(next(iter(samples.values())))
+    chunks = [
+        {name: values[i : i + chunk_size] for name, values in samples.items()}
+        for i in range(0, n, chunk_size)
+    ]
+    if processes == 1 or len(chunks) == 1:
+        results = [_evaluate(model, chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_evaluate, [model] * len(chunks), chunks))
+    return {name: np.concatenate([r[name] for r in results]) for name in results[0]}
+
+
+def switch_model(
+    samples: dict, car: Vehicle, electric_car: Vehicle, bike: Optional[Vehicle] = None
+) -> dict:
+    """Compare keeping a car with switching to an electric car.
+
+    Parameters not in `samples` take the values of the vehicles:
+
+    - `battery_manufacturing_cost`: kg CO2/kWh battery of the new vehicles
+    - `kgCO2_per_kWh`: kg CO2/kWh electricity of the new vehicles
+    - `vehicle_life`: total driven distance
+    - `kilometers_at_change`: driven distance when switching, defaults to 0
+    - `fraction_bike_rides`: fraction of the distance biked after switching,
+      defaults to 0, requires `bike`
+
+    Args:
+        samples: parameter samples
+        car: vehicle driven from the start
+        electric_car: vehicle switched to
+        bike: bike bought together with the electric car
+
+    Returns:
+        dict: total CO2 when keeping the car, `stay`, and when switching,
+            `switch`, the `saving` of switching and the `break_even` driven
+            distance where switching starts paying off, inf if never
+
+    Raises:
+        ValueError: if `fraction_bike_rides` is sampled without `bike`
+    """
+    if bike is None and "fraction_bike_rides" in samples:
+        raise ValueError("fraction_bike_rides requires a bike.")
+    n = len(next(iter(samples.values())))
+
+    def parameter(name: str, default: float) -> np.ndarray:
+        value = np.asarray(samples.get(name, default), dtype=np.float64)
+        return np.broadcast_to(value, (n,))
+
+    battery_cost = parameter(
+        "battery_manufacturing_cost", electric_car.co2_battery_build_cost_per_kWh
+    )
+    per_kwh = parameter("kgCO2_per_kWh", electric_car.co2_cost_per_consumption)
+    life = parameter("vehicle_life", electric_car.vehicle_life_km)
+    change = parameter("kilometers_at_change", 0)
+    fraction = parameter("fraction_bike_rides", 0)
+
+    new_vehicles = [electric_car] + ([bike] if bike is not None else [])
+    new_build = sum(
+        v.co2_build_cost_per_kg * v.weight + battery_cost * v.battery_capacity
+        for v in new_vehicles
+    )
+    bike_consumption = bike.consumption_per_km if bike is not None else 0
+    new_per_km = per_kwh * (
+        (1 - fraction) * electric_car.consumption_per_km + fraction * bike_consumption
+    )
+    car_build = (
+        car.co2_build_cost_per_kg * car.weight
+        + car.co2_battery_build_cost_per_kWh * car.battery_capacity
+    )
+    car_per_km = car.co2_cost_per_consumption * car.consumption_per_km
+
+    stay = car_build + car_per_km * life
+    switch = car_build + car_per_km * change + new_build + new_per_km * (life - change)
+    saved_per_km = car_per_km - new_per_km
+    with np.errstate(divide="ignore", invalid="ignore"):
+        break_even = np.where(
+            saved_per_km > 0, change + new_build / saved_per_km, np.inf
+        )
+    return {
+        "stay": stay,
+        "switch": switch,
+        "saving": stay - switch,
+        "break_even": break_even,
+    }
+
+
+def tornado(model: Model, output: str, base: dict, bounds: dict) -> pd.DataFrame:
+    """One at a time sensitivity of an output.
+
+    Each parameter is set to its lower and upper bound while the others keep
+    their base values. All evaluations are done in one vectorized call.
+
+    Args:
+        model: vectorized model
+        output: name of model output
+        base: base value of each parameter, the middle of its bounds if missing
+        bounds: lower and upper bound of the parameters to vary
+
+    Returns:
+        pd.DataFrame: output at the lower and upper bound of each parameter and
+            the swing between them, sorted by decreasing swing
+    """
+    names = list(bounds)
+    n = 2 * len(names) + 1
+    samples = {
+        name: np.full(n, value, dtype=np.float64) for name, value in base.items()
+    }
+    for i, name in enumerate(names):
+        samples.setdefault(name, np.full(n, np.mean(bounds[name])))
+        samples[name][2 * i + 1 : 2 * i + 3] = bounds[name]
+    result = model(samples)[output]
+    table = pd.DataFrame(
+        {
+            "parameter": names,
+            "low": result[1::2],
+            "high": result[2::2],
+        }
+    )
+    table["base"] = result[0]
+    table["swing"] = (table["high"] - table["low"]).abs()
+    return table.sort_values("swing", ascending=False, ignore_index=True)
+
+
+def sobol_indices(
+    model: Model,
+    output: str,
+    bounds: dict,
+    n: int = 10_000,
+    seed: Optional[int] = None,
+    **sweep_kwargs,
+) -> pd.DataFrame:
+    """Sobol sensitivity indices of an output.
+
+    Uses the Saltelli sampling scheme with the Saltelli (2010) first order and
+    Jansen total order estimators, in total `n * (len(bounds) + 2)` model
+    evaluations done in one sweep.
+
+    Args:
+        model: vectorized model
+        output: name of model output
+        bounds: lower and upper bound of each parameter, sampled uniformly
+        n: number of base samples
+        seed: random seed
+        sweep_kwargs: passed to `sweep`
+
+    Returns:
+        pd.DataFrame: first order `S1` and total order `ST` index of each
+            parameter
+    """
+    names = list(bounds)
+    a = monte_carlo(bounds, n, seed)
+    b = monte_carlo(bounds, n, None if seed is None else seed + 1)
+    blocks = [a, b] + [dict(a, **{name: b[name]}) for name in names]
+    samples = {name: np.concatenate([s[name] for s in blocks]) for name in names}
+    result = sweep(model, samples, **sweep_kwargs)[output].reshape(len(blocks), n)
+
+    f_a, f_b, f_ab = result[0], result[1], result[2:]
+    variance = np.var(result[:2])
+    return pd.DataFrame(
+        {
+            "parameter": names,
+            "S1": np.mean(f_b * (f_ab - f_a), axis=1) / variance,
+            "ST": 0.5 * np.mean((f_a - f_ab) ** 2, axis=1) / variance,
+        }
+    )
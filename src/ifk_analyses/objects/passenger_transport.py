@@ -1,47 +1,99 @@
 """Inputs for request, and analysis."""
 
-import json
-from dataclasses import dataclass
+from __future__ import annotations
 
-import matplotlib.pyplot as plt
-import pandas as pd
-import requests
+import copy
+from dataclasses import dataclass, field
+from functools import cached_property, partial
+from typing import TYPE_CHECKING, Callable, Mapping, Optional, Sequence
+
+from ifk_analyses._lazy import lazy_import
+from ifk_analyses.cache import ResponseCache
+from ifk_analyses.decode import decode_response
+from ifk_analyses.metadata_catalog import find_variable
+from ifk_analyses.objects import passenger_transport_plots
+from ifk_analyses.scb_api import ScbClient
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from ifk_analyses.scb_async import AsyncScbClient
+    from ifk_analyses.store import TableStore
+else:
+    pd = lazy_import("pandas")
+
+
+PASSENGER_TRANSPORT_QUERY = {
+    "query": [
+        {
+            "code": "Vaxthusgaser",
+            "selection": {"filter": "item", "values": ["CO2-ekv."]},
+        },
+        {
+            "code": "Sektor",
+            "selection": {"filter": "item", "values": ["0.2", "0.4", "8.0", "5.0"]},
+        },
+    ],
+    "response": {"format": "json"},
+}
+
+
+def passenger_transport_query() -> dict:
+    """Query for greenhouse gases of national and international transports."""
+    return copy.deepcopy(PASSENGER_TRANSPORT_QUERY)
 
 
 @dataclass
 class RequestInput:
-    """Dataclass for passenger transport query.
+    """Dataclass for scb query, defaults to the passenger transport query.
 
     Query info can be found at url.
     """
 
-    url = "https://api.scb.se/OV0104/v1/doris/sv/ssd/START/MI/MI0107/TotaltUtslappN"
-    query = {
-        "query": [
-            {
-                "code": "Vaxthusgaser",
-                "selection": {"filter": "item", "values": ["CO2-ekv."]},
-            },
-            {
-                "code": "Sektor",
-                "selection": {"filter": "item", "values": ["0.2", "0.4", "8.0", "5.0"]},
-            },
-        ],
-        "response": {"format": "json"},
-    }
+    url: str = (
+        "https://api.scb.se/OV0104/v1/doris/sv/ssd/START/MI/MI0107/TotaltUtslappN"
+    )
+    query: dict = field(default_factory=passenger_transport_query)
+
+    @property
+    def path(self) -> list:
+        """List of scb ids to the table."""
+        return self.url.split("/ssd/")[1].split("/")
+
+
+# The default query stays readable as `RequestInput.query`, instances get a copy.
+RequestInput.query = PASSENGER_TRANSPORT_QUERY  # type: ignore[attr-defined]
 
 
 class FetchScbData:
     """Fetch data class from scb."""
 
-    def __init__(self) -> None:
-        """Initialization."""
-        self.session = requests.Session()
-        self.response = self.session.post(RequestInput.url, json=RequestInput.query)
-        request_output = json.loads(self.response.content.decode("utf-8-sig"))
-        self.data = self.transform_json_to_df(request_output)
+    def __init__(
+        self,
+        client: Optional[ScbClient] = None,
+        request_input: Optional[RequestInput] = None,
+    ) -> None:
+        """Initialization, the data is fetched on first access.
 
-    def transform_json_to_df(self, request_output: dict) -> pd.DataFrame:
+        Args:
+            client: scb client, defaults to a client with a local response cache
+            request_input: query, defaults to the passenger transport query
+        """
+        if client is None:
+            client = ScbClient(cache=ResponseCache())
+        self.client = client
+        self.request_input = request_input or RequestInput()
+
+    @cached_property
+    def data(self) -> pd.DataFrame:
+        """Request output as dataframe."""
+        request_output = self.client.post(
+            self.request_input.path, self.request_input.query
+        )
+        return self.transform_json_to_df(request_output)
+
+    @staticmethod
+    def transform_json_to_df(request_output: dict) -> pd.DataFrame:
         """Transform json format to dataframe.
 
         Args:
@@ -50,26 +102,140 @@ class FetchScbData:
         Returns:
             pd.Dataframe: request output as dataframe
         """
-        n_vals = len(request_output["data"])
-
-        data_dict = {
-            "emission measure": [
-                request_output["data"][i]["key"][0] for i in range(n_vals)
-            ],
-            "emission type": [
-                request_output["data"][i]["key"][1] for i in range(n_vals)
-            ],
-            "year": [float(request_output["data"][i]["key"][2]) for i in range(n_vals)],
-            "value": [
-                float(request_output["data"][i]["values"][0]) for i in range(n_vals)
-            ],
-        }
+        return decode_response(
+            request_output,
+            key_columns=["emission measure", "emission type", "year"],
+            value_columns=["value"],
+            key_dtypes={"year": float},
+        )
+
+
+async def fetch_many(
+    request_inputs: Sequence[RequestInput], client: "AsyncScbClient"
+) -> list:
+    """Fetch several queries concurrently.
+
+    Args:
+        request_inputs: queries
+        client: async scb client
+
+    Returns:
+        list: request output of each query as dataframe
+    """
+    outputs = await client.post_many(
+        (request_input.path, request_input.query) for request_input in request_inputs
+    )
+    return [FetchScbData.transform_json_to_df(output) for output in outputs]
+
+
+def load_data(
+    store: "TableStore",
+    client: Optional[ScbClient] = None,
+    max_age: Optional[float] = None,
+) -> pd.DataFrame:
+    """Read passenger transport data from the local store, fetching it if missing.
+
+    Args:
+        store: local table store
+        client: scb client used when fetching
+        max_age: maximum age in seconds of the stored data, None for no limit
+
+    Returns:
+        pd.DataFrame: request output as dataframe
+    """
+    return store.read_or_fetch(
+        "/".join(RequestInput().path),
+        lambda: FetchScbData(client).data,
+        max_age=max_age,
+    )
+
+
+def sync_data(
+    store: "TableStore",
+    client: Optional[ScbClient] = None,
+    revised: int = 2,
+    filters: Optional[dict] = None,
+) -> pd.DataFrame:
+    """Read passenger transport data after fetching new and revised years.
+
+    The years of the table are read from its metadata and only years missing
+    in the store, and the latest `revised` stored years when the `updated`
+    timestamp of the table changed, are fetched and merged into the store.
+
+    Args:
+        store: local table store
+        client: scb client, defaults to a client with a local response cache
+        revised: number of latest stored years to fetch again on updates
+        filters: allowed value or list of values keyed by column
+
+    Returns:
+        pd.DataFrame: request output as dataframe
+    """
+    if client is None:
+        client = ScbClient(cache=ResponseCache())
+    request_input = RequestInput()
+    path = request_input.path
+    table_id = "/".join(path)
+    updated = client.updated(path)
+    latest = store.latest(table_id)
+    synced = None if latest is None else latest["metadata"].get("sync")
+    if synced is not None and updated is not None and updated == synced["updated"]:
+        years = synced["periods"]
+    else:
+        info, _ = client.get_with_etag(path)
+        years = find_variable(info["variables"], "Tid")["values"]
+        if client.cache is not None:
+            client.cache.invalidate(path)
+
+    def fetch(periods: list) -> pd.DataFrame:
+        query = dict(
+            request_input.query,
+            query=request_input.query["query"]
+            + [{"code": "Tid", "selection": {"filter": "item", "values": periods}}],
+        )
+        return FetchScbData.transform_json_to_df(client.post(path, query))
+
+    return store.sync(
+        table_id,
+        fetch,
+        years,
+        updated,
+        keys=["emission measure", "emission type", "year"],
+        revised=revised,
+        filters=filters,
+    )
 
-        return pd.DataFrame.from_dict(data_dict)
+
+def sector_matrix(request_output: pd.DataFrame) -> pd.DataFrame:
+    """Pivot emissions to a year by sector table.
+
+    Args:
+        request_output: emissions of one emission measure, with emission
+            measure, emission type, year and value columns
+
+    Returns:
+        pd.DataFrame: emissions with years as index and sectors as columns
+
+    Raises:
+        ValueError: if the emissions have several emission measures
+    """
+    measures = request_output["emission measure"].unique()
+    if len(measures) > 1:
+        raise ValueError(f"Several emission measures {list(measures)}.")
+    return (
+        request_output.groupby(["year", "emission type"], observed=True)["value"]
+        .sum(min_count=1)
+        .unstack("emission type")
+        .sort_index()
+    )
 
 
 class Analysis:
-    """Container for plotting data corresponding to fetch spec by Request_input."""
+    """Container for plotting data corresponding to fetch spec by Request_input.
+
+    The data is pivoted once to a year by sector `matrix`, which shares and
+    figures are derived from.
+    """
 
     def __init__(self, request_output: pd.DataFrame) -> None:
         """Initialization.
@@ -78,57 +244,92 @@ class Analysis:
             request_output: Output from scb api response.
         """
         self.data = request_output
+        self.matrix = sector_matrix(request_output)
 
-    def plot_co2_transports(self) -> None:
-        """Plot CO2 for transports."""
-        labels = {
-            "0.2": "NATIONELL TOTAL (exklusive LULUCF, inklusive internationella transporter)",
-            "0.4": "NATIONELL TOTAL (inklusive LULUCF, inklusive internationella transporter)",
-            "8.0": "INRIKES TRANSPORTER, TOTALT",
-            "5.0": "UTRIKES TRANSPORTER, TOTALT",
+    def shares(self, sectors: Sequence[str], total: str = "0.2") -> pd.DataFrame:
+        """Emissions of sectors as share of a total, aligned by year.
+
+        Args:
+            sectors: sector codes
+            total: sector code of the total
+
+        Returns:
+            pd.DataFrame: year by sector shares, NaN where a value is missing
+        """
+        return self.matrix[list(sectors)].div(self.matrix[total], axis="index")
+
+    def figures(self) -> dict:
+        """Standard figures.
+
+        Returns:
+            dict: function drawing on an axes, keyed by figure name
+        """
+        return {
+            "co2_transports": partial(
+                passenger_transport_plots.plot_co2_transports, self.matrix
+            ),
+            "co2_national_international": partial(
+                passenger_transport_plots.plot_co2_national_international,
+                self.shares(list(passenger_transport_plots.TRANSPORT_SHARE_LABELS)),
+            ),
         }
 
-        def _plot_individual(emission_type: str) -> None:
-            """Plot based on emission type.
+    def sector_figures(
+        self, sector_groups: Mapping[str, Sequence[str]], total: Optional[str] = None
+    ) -> dict:
+        """Figures of groups of sectors.
 
-            Args:
-                emission_type (str): emission type code
-            """
-            ax.plot(
-                self.data[self.data["emission type"] == emission_type]["year"],
-                self.data[self.data["emission type"] == emission_type]["value"],
-                label=labels[emission_type],
+        Args:
+            sector_groups: sector codes of each figure, keyed by figure name
+            total: sector code of the total, plot shares of it if given
+
+        Returns:
+            dict: function drawing on an axes, keyed by figure name
+        """
+        return {
+            name: partial(
+                passenger_transport_plots.plot_sectors,
+                self.matrix[list(sectors)]
+                if total is None
+                else 100 * self.shares(sectors, total),
+                labels=passenger_transport_plots.CO2_TRANSPORT_LABELS,
+                ylabel="kiloTon CO2-ekvivalent" if total is None else "%",
             )
+            for name, sectors in sector_groups.items()
+        }
 
-        ax = plt.subplot(111)
-        _plot_individual("0.2")
-        _plot_individual("0.4")
-        _plot_individual("8.0")
-        _plot_individual("5.0")
+    def save_figures(
+        self,
+        directory: str,
+        figures: Optional[Mapping[str, Callable]] = None,
+        file_format: str = "png",
+    ) -> list:
+        """Render figures to files, without showing them.
 
-        ax.set_title("Utsläpp av växthusgaser i CO2-ekvivalent. Källa:SCB")
-        ax.set_xlabel("År")
-        ax.set_ylabel("kiloTon CO2-ekvivalent")
-        ax.legend(loc="upper center", bbox_to_anchor=(0.5, -0.05))
+        Args:
+            directory: output directory
+            figures: figures to render, defaults to `figures()`
+            file_format: file format and suffix, e.g. png, svg or pdf
+
+        Returns:
+            list: paths of the written files
+        """
+        return passenger_transport_plots.render_figures(
+            figures if figures is not None else self.figures(),
+            directory,
+            file_format,
+        )
+
+    def plot_co2_transports(self) -> None:
+        """Plot CO2 for transports."""
+        import matplotlib.pyplot as plt
+
+        self.figures()["co2_transports"](plt.subplot(111))
         plt.show()
-        pass
 
     def plot_co2_national_international(self) -> None:
         """Plot CO2 National vs international."""
-        years = self.data[self.data["emission type"] == "0.2"]["year"]
-        amount_domestic = (
-            self.data[self.data["emission type"] == "8.0"]["value"].to_numpy()
-            / self.data[self.data["emission type"] == "0.2"]["value"].to_numpy()
-        )
-        amount_international = (
-            self.data[self.data["emission type"] == "5.0"]["value"]
-            / self.data[self.data["emission type"] == "0.2"]["value"].to_numpy()
-        )
-        plt.plot(years, 100 * amount_domestic)
-        plt.plot(years, 100 * amount_international)
-        plt.xlabel("År")
-        plt.ylabel("%")
-        plt.title("Andel totalutsläpp av CO2-ekvivalenter")
-        plt.legend(["Nationella transporter", "Internationella transporter"])
+        import matplotlib.pyplot as plt
+
+        self.figures()["co2_national_international"](plt.subplot(111))
         plt.show()
-        pass
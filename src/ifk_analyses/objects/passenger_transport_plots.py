@@ -0,0 +1,119 @@
+"""Plots of greenhouse gas emissions from transports.
+
+The plot functions draw year by sector tables on a given matplotlib axes, so
+neither this module nor `passenger_transport` imports matplotlib until figures
+are rendered. `render_figures` saves figures to files without pyplot, so many
+figures can be rendered in batch without a display or global figure state.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from matplotlib.axes import Axes
+
+CO2_TRANSPORT_LABELS = {
+    "0.2": "NATIONELL TOTAL (exklusive LULUCF, inklusive internationella transporter)",
+    "0.4": "NATIONELL TOTAL (inklusive LULUCF, inklusive internationella transporter)",
+    "8.0": "INRIKES TRANSPORTER, TOTALT",
+    "5.0": "UTRIKES TRANSPORTER, TOTALT",
+}
+TRANSPORT_SHARE_LABELS = {
+    "8.0": "Nationella transporter",
+    "5.0": "Internationella transporter",
+}
+
+
+def plot_sectors(
+    values: pd.DataFrame,
+    ax: Axes,
+    labels: Optional[Mapping[str, str]] = None,
+    title: str = "",
+    ylabel: str = "",
+    legend: Optional[Mapping[str, Any]] = None,
+) -> None:
+    """Plot one line per sector.
+
+    Args:
+        values: year by sector table
+        ax: axes to draw on
+        labels: legend label of each sector, defaults to the sector code
+        title: axes title
+        ylabel: y axis label
+        legend: keyword arguments of the legend, e.g. its location
+    """
+    labels = labels or {}
+    for sector in values.columns:
+        ax.plot(values.index, values[sector], label=labels.get(sector, sector))
+    ax.set_title(title)
+    ax.set_xlabel("År")
+    ax.set_ylabel(ylabel)
+    ax.legend(**(legend or {}))
+
+
+def plot_co2_transports(matrix: pd.DataFrame, ax: Axes) -> None:
+    """Plot CO2 for transports.
+
+    Args:
+        matrix: year by sector emissions
+        ax: axes to draw on
+    """
+    plot_sectors(
+        matrix[list(CO2_TRANSPORT_LABELS)],
+        ax,
+        CO2_TRANSPORT_LABELS,
+        title="Utsläpp av växthusgaser i CO2-ekvivalent. Källa:SCB",
+        ylabel="kiloTon CO2-ekvivalent",
+        legend={"loc": "upper center", "bbox_to_anchor": (0.5, -0.05)},
+    )
+
+
+def plot_co2_national_international(shares: pd.DataFrame, ax: Axes) -> None:
+    """Plot CO2 National vs international.
+
+    Args:
+        shares: year by sector shares of the national total
+        ax: axes to draw on
+    """
+    plot_sectors(
+        100 * shares[list(TRANSPORT_SHARE_LABELS)],
+        ax,
+        TRANSPORT_SHARE_LABELS,
+        title="Andel totalutsläpp av CO2-ekvivalenter",
+        ylabel="%",
+    )
+
+
+def render_figures(
+    figures: Mapping[str, Callable[[Axes], None]],
+    directory: str,
+    file_format: str = "png",
+    figsize: tuple = (10, 6),
+    dpi: int = 100,
+) -> list:
+    """Render figures to files.
+
+    Args:
+        figures: function drawing on an axes, keyed by file name without suffix
+        directory: output directory, created if missing
+        file_format: file format and suffix, e.g. png, svg or pdf
+        figsize: figure size in inches
+        dpi: resolution in dots per inch
+
+    Returns:
+        list: paths of the written files, in the order of `figures`
+    """
+    from matplotlib.figure import Figure
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, draw in figures.items():
+        figure = Figure(figsize=figsize, dpi=dpi)
+        draw(figure.add_subplot())
+        path = os.path.join(directory, f"{name}.{file_format}")
+        figure.savefig(path, format=file_format, bbox_inches="tight")
+        paths.append(path)
+    return paths
@@ -1,6 +1,7 @@
 """Backend data class and some methods for vehicle."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from typing import Optional, Sequence
 
 import numpy as np
 
@@ -10,13 +11,13 @@ class Vehicle:
     """Class for vehicles."""
 
     name: str
-    weight: int
-    battery_capacity: int
-    consumption_per_km: int
-    co2_build_cost_per_kg: int
-    co2_battery_build_cost_per_kWh: int
-    co2_cost_per_consumption: int
-    vehicle_life_km: int
+    weight: float
+    battery_capacity: float
+    consumption_per_km: float
+    co2_build_cost_per_kg: float
+    co2_battery_build_cost_per_kWh: float
+    co2_cost_per_consumption: float
+    vehicle_life_km: float
 
 
 def co2analysis(car: Vehicle, driven_distance: np.ndarray, co2debt: int):
@@ -34,3 +35,119 @@ def co2analysis(car: Vehicle, driven_distance: np.ndarray, co2debt: int):
     )
 
     return driven_distance, C02_data
+
+
+VEHICLE_FIELDS = tuple(f.name for f in fields(Vehicle) if f.name != "name")
+VEHICLE_DTYPE = np.dtype([(name, np.float64) for name in VEHICLE_FIELDS])
+
+
+def vehicle_table(vehicles: Sequence[Vehicle]) -> np.ndarray:
+    """Vehicles as a structured array.
+
+    Args:
+        vehicles: vehicles, the position in the sequence is the vehicle index
+
+    Returns:
+        np.ndarray: structured array with the numeric fields of `Vehicle`
+    """
+    return np.array(
+        [tuple(getattr(v, name) for name in VEHICLE_FIELDS) for v in vehicles],
+        dtype=VEHICLE_DTYPE,
+    )
+
+
+def co2_costs(vehicles: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """CO2 cost of building and of driving each vehicle.
+
+    Args:
+        vehicles: structured array from `vehicle_table`
+
+    Returns:
+        tuple: build cost and cost per km of each vehicle
+    """
+    build_cost = (
+        vehicles["co2_build_cost_per_kg"] * vehicles["weight"]
+        + vehicles["co2_battery_build_cost_per_kWh"] * vehicles["battery_capacity"]
+    )
+    cost_per_km = vehicles["co2_cost_per_consumption"] * vehicles["consumption_per_km"]
+    return build_cost, cost_per_km
+
+
+@dataclass(frozen=True)
+class Scenarios:
+    """Scenarios of consecutive vehicle segments.
+
+    Segment k of scenario s uses vehicle `vehicle[s, k]` from its start distance
+    `start[s, k]` until the start of the next segment. Scenarios with fewer
+    segments are padded with vehicle -1 and start inf.
+    """
+
+    vehicle: np.ndarray
+    start: np.ndarray
+
+    @classmethod
+    def from_segments(cls, scenarios: Sequence[Sequence[tuple]]) -> "Scenarios":
+        """Build padded segment arrays.
+
+        Args:
+            scenarios: for each scenario, vehicle index and start distance of each
+                segment in driving order
+
+        Returns:
+            Scenarios: padded segment arrays
+        """
+        n_segments = max(len(segments) for segments in scenarios)
+        vehicle = np.full((len(scenarios), n_segments), -1, dtype=np.intp)
+        start = np.full((len(scenarios), n_segments), np.inf)
+        for i, segments in enumerate(scenarios):
+            for k, (index, distance) in enumerate(segments):
+                vehicle[i, k] = index
+                start[i, k] = distance
+        return cls(vehicle, start)
+
+
+def co2_scenarios(
+    vehicles: np.ndarray,
+    scenarios: Scenarios,
+    driven_distance: np.ndarray,
+    co2debt: float = 0,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """Cumulative CO2 of all scenarios.
+
+    Equivalent to chaining `co2analysis` over the segments of each scenario and
+    carrying the CO2 debt, but evaluated on a shared distance axis for all
+    scenarios at once. Each segment adds the build cost of its vehicle when it
+    starts and the consumption cost of the distance driven within it.
+
+    Args:
+        vehicles: structured array from `vehicle_table`
+        scenarios: segments of each scenario
+        driven_distance: distances to evaluate
+        co2debt: CO2 already emitted at the start of every scenario
+        out: preallocated scenario x distance array to write to
+
+    Returns:
+        np.ndarray: scenario x distance array with cumulative CO2
+    """
+    build_cost, cost_per_km = co2_costs(vehicles)
+    n_scenarios, n_segments = scenarios.vehicle.shape
+    if out is None:
+        out = np.empty((n_scenarios, len(driven_distance)))
+    out[...] = co2debt
+    end = np.concatenate(
+        [scenarios.start[:, 1:], np.full((n_scenarios, 1), np.inf)], axis=1
+    )
+    driven = np.empty_like(out)
+    for k in range(n_segments):
+        index = scenarios.vehicle[:, k]
+        used = index >= 0
+        start = scenarios.start[:, k, None]
+        np.subtract(np.minimum(driven_distance, end[:, k, None]), start, out=driven)
+        np.maximum(driven, 0, out=driven)
+        driven *= np.where(used, cost_per_km[index], 0)[:, None]
+        driven += np.where(used, build_cost[index], 0)[:, None] * (
+            driven_distance >= start
+        )
+        out += driven
+    return out
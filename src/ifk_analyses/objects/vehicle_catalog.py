@@ -0,0 +1,245 @@
+"""Array backed catalog of vehicles."""
+
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Iterator, Sequence
+
+import numpy as np
+
+from ifk_analyses._lazy import lazy_import
+from ifk_analyses.objects.personal_vehicle_lca import (
+    VEHICLE_DTYPE,
+    VEHICLE_FIELDS,
+    Vehicle,
+    vehicle_table,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+
+class VehicleCatalog:
+    """Vehicles stored as a structured array with a name to index map.
+
+    `table` and `column` are views that can be passed directly to the batched
+    computations in `personal_vehicle_lca`, `break_even` and `fleet`, with
+    vehicle indices from `index`.
+    """
+
+    def __init__(self, vehicles: Sequence[Vehicle] = ()) -> None:
+        """Initialization.
+
+        Args:
+            vehicles: vehicles, names must be unique
+        """
+        self.names: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.table = np.empty(0, dtype=VEHICLE_DTYPE)
+        self.extend(vehicles)
+
+    def __len__(self) -> int:
+        """Number of vehicles."""
+        return len(self.names)
+
+    def __contains__(self, name: object) -> bool:
+        """Check if a vehicle name is in the catalog."""
+        return name in self.positions
+
+    def __iter__(self) -> Iterator[Vehicle]:
+        """Iterate over vehicles in index order."""
+        return (self[name] for name in self.names)
+
+    def __getitem__(self, name: str) -> Vehicle:
+        """Vehicle by name.
+
+        Args:
+            name: vehicle name
+
+        Returns:
+            Vehicle: vehicle
+
+        Raises:
+            KeyError: if the name is not in the catalog
+        """
+        row = self.table[self.index(name)]
+        return Vehicle(name, *(row[field].item() for field in VEHICLE_FIELDS))
+
+    def index(self, name: str) -> int:
+        """Index of vehicle.
+
+        Args:
+            name: vehicle name
+
+        Returns:
+            int: row in `table`
+
+        Raises:
+            KeyError: if the name is not in the catalog
+        """
+        try:
+            return self.positions[name]
+        except KeyError:
+            raise KeyError(f"{name} not in vehicle catalog.") from None
+
+    def indices(self, names: Sequence[str]) -> np.ndarray:
+        """Indices of vehicles.
+
+        Args:
+            names: vehicle names
+
+        Returns:
+            np.ndarray: rows in `table`
+        """
+        return np.array([self.index(name) for name in names], dtype=np.intp)
+
+    def column(self, field: str) -> np.ndarray:
+        """Field of all vehicles, as a view of `table`.
+
+        Args:
+            field: field of `Vehicle`, except name
+
+        Returns:
+            np.ndarray: value of each vehicle
+        """
+        return self.table[field]
+
+    def extend(self, vehicles: Sequence[Vehicle]) -> None:
+        """Add vehicles.
+
+        Args:
+            vehicles: vehicles
+
+        Raises:
+            ValueError: if a name is already in the catalog
+        """
+        vehicles = list(vehicles)
+        for vehicle in vehicles:
+            if vehicle.name in self.positions:
+                raise ValueError(f"{vehicle.name} already in vehicle catalog.")
+            self.positions[vehicle.name] = len(self.names)
+            self.names.append(vehicle.name)
+        self.table = np.concatenate([self.table, vehicle_table(vehicles)])
+
+    def blend(self, name: str, usage: dict) -> Vehicle:
+        """Combine vehicles owned together and used for shares of the distance.
+
+        The blend has the summed weight and battery capacity, so its build cost
+        is the sum of the build costs, and the usage weighted CO2 per km. If
+        the vehicles differ in CO2 per consumption, the consumption of the
+        blend is in kg CO2 per km with a CO2 per consumption of 1. The blend is
+        added to the catalog.
+
+        Args:
+            name: name of blend
+            usage: share of the distance driven with each vehicle, keyed by name
+
+        Returns:
+            Vehicle: blend
+        """
+        rows = self.table[self.indices(list(usage))]
+        shares = np.array(list(usage.values()), dtype=np.float64)
+
+        weight = rows["weight"].sum()
+        battery_capacity = rows["battery_capacity"].sum()
+        per_consumption = rows["co2_cost_per_consumption"]
+        if np.all(per_consumption == per_consumption[0]):
+            co2_cost_per_consumption = per_consumption[0]
+            consumption_per_km = shares @ rows["consumption_per_km"]
+        else:
+            co2_cost_per_consumption = 1.0
+            consumption_per_km = shares @ (rows["consumption_per_km"] * per_consumption)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            co2_build_cost_per_kg = np.nan_to_num(
+                rows["co2_build_cost_per_kg"] @ rows["weight"] / weight
+            )
+            co2_battery_build_cost_per_kWh = np.nan_to_num(
+                rows["co2_battery_build_cost_per_kWh"]
+                @ rows["battery_capacity"]
+                / battery_capacity
+            )
+
+        vehicle = Vehicle(
+            name=name,
+            weight=weight.item(),
+            battery_capacity=battery_capacity.item(),
+            consumption_per_km=float(consumption_per_km),
+            co2_build_cost_per_kg=float(co2_build_cost_per_kg),
+            co2_battery_build_cost_per_kWh=float(co2_battery_build_cost_per_kWh),
+            co2_cost_per_consumption=float(co2_cost_per_consumption),
+            vehicle_life_km=rows["vehicle_life_km"][np.argmax(shares)].item(),
+        )
+        self.extend([vehicle])
+        return vehicle
+
+    def to_frame(self) -> pd.DataFrame:
+        """Catalog as DataFrame.
+
+        Returns:
+            pd.DataFrame: one row per vehicle with the fields of `Vehicle`
+        """
+        data_df = pd.DataFrame(self.table)
+        data_df.insert(0, "name", self.names)
+        return data_df
+
+    @classmethod
+    def from_frame(cls, data_df: pd.DataFrame) -> "VehicleCatalog":
+        """Catalog from DataFrame.
+
+        Args:
+            data_df: one row per vehicle with the fields of `Vehicle`
+
+        Returns:
+            VehicleCatalog: catalog
+
+        Raises:
+            ValueError: if names are not unique
+        """
+        catalog = cls()
+        catalog.names = [str(name) for name in data_df["name"]]
+        catalog.positions = {name: i for i, name in enumerate(catalog.names)}
+        if len(catalog.positions) < len(catalog.names):
+            raise ValueError("Vehicle names are not unique.")
+        catalog.table = np.empty(len(data_df), dtype=VEHICLE_DTYPE)
+        for field in VEHICLE_FIELDS:
+            catalog.table[field] = data_df[field].to_numpy(dtype=np.float64)
+        return catalog
+
+    def save(self, file_path: str) -> None:
+        """Save catalog as csv or Parquet, depending on the file suffix.
+
+        Args:
+            file_path: file path ending with `.csv` or `.parquet`
+
+        Raises:
+            ValueError: if the suffix is not supported
+        """
+        suffix = os.path.splitext(file_path)[1]
+        if suffix == ".csv":
+            self.to_frame().to_csv(file_path, index=False)
+        elif suffix == ".parquet":
+            self.to_frame().to_parquet(file_path, index=False)
+        else:
+            raise ValueError(f"Unknown vehicle catalog format {suffix}.")
+
+    @classmethod
+    def load(cls, file_path: str) -> "VehicleCatalog":
+        """Load catalog from csv or Parquet, depending on the file suffix.
+
+        Args:
+            file_path: file path ending with `.csv` or `.parquet`
+
+        Returns:
+            VehicleCatalog: catalog
+
+        Raises:
+            ValueError: if the suffix is not supported
+        """
+        suffix = os.path.splitext(file_path)[1]
+        if suffix == ".csv":
+            return cls.from_frame(pd.read_csv(file_path))
+        if suffix == ".parquet":
+            return cls.from_frame(pd.read_parquet(file_path))
+        raise ValueError(f"Unknown vehicle catalog format {suffix}.")
@@ -0,0 +1,200 @@
+"""Pipelines of stages with content hashed caching.
+
+A pipeline is a directed acyclic graph of stages. Each stage is a function of
+the outputs of its input stages and its parameters. Outputs are pickled to a
+cache directory under a key hashed from the stage, its parameters and the
+content hashes of its inputs, so a stage is only recomputed when something
+upstream actually changed. Stages whose inputs are ready run concurrently.
+"""
+
+import hashlib
+import json
+import os
+import pickle  # noqa: S403
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Sequence
+
+from ifk_analyses import instrumentation
+
+DEFAULT_PIPELINE_CACHE_DIR = "data/pipeline"
+
+
+@dataclass(frozen=True)
+class Stage:
+    """Stage of a pipeline.
+
+    Attributes:
+        name: unique stage name
+        func: called with the outputs of `inputs` as positional arguments and
+            `params` as keyword arguments
+        inputs: names of input stages
+        params: keyword arguments, part of the cache key, json serializable
+            unless `cache` is False
+        version: part of the cache key, change it when `func` changes
+        cache: reuse cached output, set to False for stages reading external
+            data such as scb fetches, their output hash still lets downstream
+            stages skip recomputation
+    """
+
+    name: str
+    func: Callable[..., Any]
+    inputs: tuple = ()
+    params: dict = field(default_factory=dict)
+    version: str = "1"
+    cache: bool = True
+
+
+class Pipeline:
+    """Runner of a graph of stages."""
+
+    def __init__(
+        self,
+        stages: Sequence[Stage],
+        cache_dir: str = DEFAULT_PIPELINE_CACHE_DIR,
+        max_workers: int = 4,
+        profile_dir: Optional[str] = None,
+        trace_memory: bool = False,
+    ) -> None:
+        """Initialization.
+
+        Args:
+            stages: stages of the pipeline
+            cache_dir: directory of cached stage outputs
+            max_workers: number of stages run concurrently
+            profile_dir: directory of cProfile stats of each computed stage,
+                `<stage name>.prof`, None to not profile. Stages are then run
+                one at a time, since only one profiler can be active at once
+            trace_memory: report the peak memory of each run as the
+                `memory.peak` instrumentation gauge
+
+        Raises:
+            ValueError: if names are not unique, an input is unknown or the
+                stages have a cycle
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) < len(stages):
+            raise ValueError("Stage names are not unique.")
+        for stage in stages:
+            unknown = set(stage.inputs) - set(self.stages)
+            if unknown:
+                raise ValueError(f"{stage.name} has unknown inputs {unknown}.")
+        self.order = self._topological_order()
+        self.cache_dir = cache_dir
+        self.max_workers = 1 if profile_dir is not None else max_workers
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.computed: list[str] = []
+
+    def _topological_order(self) -> list:
+        """Order stages so that inputs come before the stages using them."""
+        order: list[str] = []
+        state: dict[str, bool] = {}
+
+        def visit(name: str) -> None:
+            if state.get(name) is False:
+                raise ValueError(f"Stages have a cycle through {name}.")
+            if name in state:
+                return
+            state[name] = False
+            for input_name in self.stages[name].inputs:
+                visit(input_name)
+            state[name] = True
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def targets(self) -> list:
+        """Stages that are not input to any other stage.
+
+        Returns:
+            list: stage names
+        """
+        used = {name for stage in self.stages.values() for name in stage.inputs}
+        return [name for name in self.order if name not in used]
+
+    def _key(self, stage: Stage, input_hashes: list) -> str:
+        """Cache key of stage output."""
+        description = json.dumps(
+            {
+                "name": stage.name,
+                "func": f"{stage.func.__module__}.{stage.func.__qualname__}",
+                "version": stage.version,
+                "params": stage.params,
+                "inputs": input_hashes,
+            },
+            sort_keys=True,
+            default=repr,
+        )
+        return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+    def _run_stage(self, stage: Stage, inputs: list, force: bool) -> tuple:
+        """Load stage output from cache or compute it.
+
+        Returns:
+            tuple: output, content hash of output and whether it was computed
+        """
+        key = self._key(stage, [content_hash for _, content_hash in inputs])
+        path = os.path.join(self.cache_dir, f"{key}.pkl")
+        if stage.cache and not force and os.path.exists(path):
+            with open(path, "rb") as f:
+                blob = f.read()
+            output = pickle.loads(blob)  # noqa: S301
+            return output, hashlib.sha256(blob).hexdigest(), False
+
+        with instrumentation.span("pipeline.stage", stage=stage.name):
+            with instrumentation.profile(stage.name, self.profile_dir):
+                output = stage.func(*(value for value, _ in inputs), **stage.params)
+        blob = pickle.dumps(output)
+        if stage.cache:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+        return output, hashlib.sha256(blob).hexdigest(), True
+
+    def run(self, targets: Optional[Sequence[str]] = None, force: bool = False) -> dict:
+        """Run stages needed for the targets.
+
+        Args:
+            targets: stages to compute, defaults to `targets()`
+            force: recompute all stages, ignoring cached outputs
+
+        Returns:
+            dict: output of each target keyed by stage name
+        """
+        targets = list(targets) if targets is not None else self.targets()
+        needed: set[str] = set()
+        pending_names = list(targets)
+        while pending_names:
+            name = pending_names.pop()
+            if name not in needed:
+                needed.add(name)
+                pending_names.extend(self.stages[name].inputs)
+
+        results: dict[str, tuple] = {}
+        self.computed = []
+        remaining = [name for name in self.order if name in needed]
+        with instrumentation.profile("run", memory=self.trace_memory):
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                running: dict[Future, str] = {}
+                while remaining or running:
+                    for name in list(remaining):
+                        stage = self.stages[name]
+                        if all(i in results for i in stage.inputs):
+                            remaining.remove(name)
+                            inputs = [results[i][:2] for i in stage.inputs]
+                            future = executor.submit(
+                                self._run_stage, stage, inputs, force
+                            )
+                            running[future] = name
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        results[name] = future.result()
+                        if results[name][2]:
+                            self.computed.append(name)
+        return {name: results[name][0] for name in targets}
@@ -0,0 +1,176 @@
+"""Pipelines run from the command line."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable, Optional
+
+from ifk_analyses._lazy import lazy_import
+from ifk_analyses.cache import ResponseCache
+from ifk_analyses.objects.emissions_kommun import (
+    FetchData,
+    compare_years_and_sort_chg,
+    decode_emissions,
+)
+from ifk_analyses.objects.passenger_transport import FetchScbData, RequestInput
+from ifk_analyses.pipeline import Stage
+from ifk_analyses.scb_api import ScbClient
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+
+def scb_client() -> ScbClient:
+    """Client with a local response cache, shared by the stages of a run.
+
+    Returns:
+        ScbClient: client
+    """
+    return ScbClient(cache=ResponseCache())
+
+
+def fetch_emissions(emission_type: str, client: Optional[ScbClient] = None) -> dict:
+    """Fetch kommun emissions of one emission type.
+
+    Args:
+        emission_type: emission type to fetch
+        client: scb client, defaults to a client with a local response cache
+
+    Returns:
+        dict: table variables and scb response
+    """
+    f_data = FetchData(emission_type, client=client)
+    return {"variables": f_data.variables, "response": f_data.get()}
+
+
+def decode_fetched_emissions(fetched: dict) -> pd.DataFrame:
+    """Decode output of `fetch_emissions`.
+
+    Args:
+        fetched: table variables and scb response
+
+    Returns:
+        pd.DataFrame: emissions by region and year
+    """
+    return decode_emissions(fetched["response"], fetched["variables"])
+
+
+def fetch_passenger_transport(client: Optional[ScbClient] = None) -> dict:
+    """Fetch passenger transport emissions.
+
+    Args:
+        client: scb client, defaults to a client with a local response cache
+
+    Returns:
+        dict: scb response
+    """
+    request_input = RequestInput()
+    if client is None:
+        client = scb_client()
+    return client.post(request_input.path, request_input.query)
+
+
+def decode_passenger_transport(response: dict) -> pd.DataFrame:
+    """Decode output of `fetch_passenger_transport`.
+
+    Args:
+        response: scb response
+
+    Returns:
+        pd.DataFrame: emissions by sector and year
+    """
+    return FetchScbData.transform_json_to_df(response)
+
+
+def report(data_df: pd.DataFrame) -> str:
+    """Format table for printing.
+
+    Args:
+        data_df: table
+
+    Returns:
+        str: formatted table
+    """
+    return data_df.to_string(index=False)
+
+
+def emissions_kommun(prefix: str = "", client: Optional[ScbClient] = None) -> list:
+    """Compare kommun emissions between 2016 and 2021.
+
+    Args:
+        prefix: prefix of stage names
+        client: scb client of the fetch stage, defaults to a client created
+            when the stage runs
+
+    Returns:
+        list: stages
+    """
+    return [
+        Stage(
+            f"{prefix}fetch",
+            fetch_emissions,
+            params={
+                "emission_type": "växthusgaser, kiloton koldioxidekvivalenter",
+                "client": client,
+            },
+            cache=False,
+        ),
+        Stage(f"{prefix}decode", decode_fetched_emissions, (f"{prefix}fetch",)),
+        Stage(
+            f"{prefix}compare",
+            compare_years_and_sort_chg,
+            (f"{prefix}decode",),
+            params={"lower_year": 2016, "upper_year": 2021},
+        ),
+        Stage(f"{prefix}report", report, (f"{prefix}compare",)),
+    ]
+
+
+def passenger_transport(prefix: str = "", client: Optional[ScbClient] = None) -> list:
+    """Decode national transport emissions.
+
+    Args:
+        prefix: prefix of stage names
+        client: scb client of the fetch stage, defaults to a client created
+            when the stage runs
+
+    Returns:
+        list: stages
+    """
+    return [
+        Stage(
+            f"{prefix}fetch",
+            fetch_passenger_transport,
+            params={"client": client},
+            cache=False,
+        ),
+        Stage(f"{prefix}decode", decode_passenger_transport, (f"{prefix}fetch",)),
+        Stage(f"{prefix}report", report, (f"{prefix}decode",)),
+    ]
+
+
+def all_pipelines(client: Optional[ScbClient] = None) -> list:
+    """All pipelines, run in parallel.
+
+    The fetch stages share one client, and so one rate limit for scb.
+
+    Args:
+        client: scb client of the fetch stages, defaults to a client with a
+            local response cache
+
+    Returns:
+        list: stages
+    """
+    if client is None:
+        client = scb_client()
+    return emissions_kommun("emissions-kommun/", client) + passenger_transport(
+        "passenger-transport/", client
+    )
+
+
+PIPELINES: dict[str, Callable[[], list]] = {
+    "emissions-kommun": emissions_kommun,
+    "passenger-transport": passenger_transport,
+    "all": all_pipelines,
+}
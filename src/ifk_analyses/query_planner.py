@@ -0,0 +1,154 @@
+"""Split scb queries in chunks below the per request cell limit."""
+
+import math
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator, Sequence
+
+from ifk_analyses.scb_api import ScbClient
+
+SCB_MAX_CELLS = 150_000
+
+
+def resolve_selection(variables: list, **kwargs: list) -> dict:
+    """Map value texts to value codes, like `SCB.set_query`.
+
+    Args:
+        variables: variables from the table metadata
+        kwargs: value texts to select, keyed by variable text without spaces
+
+    Returns:
+        dict: selected value codes keyed by variable code
+    """
+    selection = {}
+    for name, texts in kwargs.items():
+        for var in variables:
+            if var["text"].replace(" ", "") == name:
+                selection[var["code"]] = [
+                    code
+                    for code, text in zip(var["values"], var["valueTexts"])
+                    if text in texts
+                ]
+    return selection
+
+
+def build_query(selection: dict) -> dict:
+    """Build scb query.
+
+    Args:
+        selection: selected value codes keyed by variable code
+
+    Returns:
+        dict: scb query
+    """
+    return {
+        "query": [
+            {"code": code, "selection": {"filter": "item", "values": values}}
+            for code, values in selection.items()
+        ],
+        "response": {"format": "json"},
+    }
+
+
+def estimate_cells(selection: dict) -> int:
+    """Number of cells in the response to a selection.
+
+    Args:
+        selection: selected value codes keyed by variable code
+
+    Returns:
+        int: number of cells
+    """
+    return math.prod(len(values) for values in selection.values())
+
+
+def plan_chunks(selection: dict, max_cells: int = SCB_MAX_CELLS) -> list:
+    """Split selection in chunks with at most `max_cells` cells each.
+
+    The selection is split along the dimension giving the fewest chunks. If no
+    single dimension is enough, the largest dimension is split in single values
+    and each part is planned again.
+
+    Args:
+        selection: selected value codes keyed by variable code
+        max_cells: maximum number of cells per request
+
+    Returns:
+        list: selections, in the order of the original selection
+    """
+    total = estimate_cells(selection)
+    if total <= max_cells:
+        return [selection]
+
+    best = None
+    for code, values in selection.items():
+        per_value = total // len(values)
+        if per_value <= max_cells:
+            size = max_cells // per_value
+            n_chunks = math.ceil(len(values) / size)
+            if best is None or n_chunks < best[0]:
+                best = (n_chunks, code, size)
+
+    if best is not None:
+        _, code, size = best
+        values = selection[code]
+        return [
+            dict(selection, **{code: values[i : i + size]})
+            for i in range(0, len(values), size)
+        ]
+
+    code = max(selection, key=lambda c: len(selection[c]))
+    return [
+        chunk
+        for value in selection[code]
+        for chunk in plan_chunks(dict(selection, **{code: [value]}), max_cells)
+    ]
+
+
+def iter_chunks(
+    client: ScbClient, path: Sequence[str], chunks: list, max_workers: int = 4
+) -> Iterator[dict]:
+    """Fetch chunks concurrently, yielding the responses in chunk order.
+
+    At most `max_workers` chunks are requested ahead of the consumer, so memory
+    use does not grow with the number of chunks. All requests share the rate
+    limiter of the client.
+
+    Args:
+        client: scb client
+        path: list of scb ids to the table
+        chunks: selections from `plan_chunks`
+        max_workers: number of concurrent requests
+
+    Yields:
+        dict: scb response of each chunk
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending: deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(client.post, path, build_query(chunk)))
+            if len(pending) >= max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def fetch_chunks(
+    client: ScbClient, path: Sequence[str], chunks: list, max_workers: int = 4
+) -> dict:
+    """Fetch chunks concurrently and merge the responses.
+
+    Args:
+        client: scb client
+        path: list of scb ids to the table
+        chunks: selections from `plan_chunks`
+        max_workers: number of concurrent requests
+
+    Returns:
+        dict: scb response with the data of all chunks, in chunk order
+    """
+    merged: dict = {}
+    for response in iter_chunks(client, path, chunks, max_workers):
+        merged = merged or dict(response, data=[])
+        merged["data"].extend(response["data"])
+    return merged
@@ -0,0 +1,322 @@
+"""Aggregation of kommun values to län and riket.
+
+SCB region codes encode the hierarchy: `00` is riket, two digit codes are län
+and four digit codes are kommuner, whose first two digits are the code of
+their län. The hierarchy is derived from the codes once, with the kommuner
+sorted by län, so rollups are segment sums over contiguous ranges and the
+kommuner of a län are a slice of the sorted indices.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional, Sequence
+
+import numpy as np
+
+from ifk_analyses._lazy import lazy_import
+from ifk_analyses.compare import YearComparison
+from ifk_analyses.decode import decode_response
+from ifk_analyses.query_planner import SCB_MAX_CELLS, fetch_chunks, plan_chunks
+from ifk_analyses.scb_api import ScbClient
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+RIKET_CODE = "00"
+RIKET, LAN, KOMMUN = 0, 1, 2
+LEVEL_NAMES = {RIKET: "riket", LAN: "län", KOMMUN: "kommun"}
+POPULATION_PATH = ["BE", "BE0101", "BE0101A", "BefolkningNy"]
+POPULATION_CONTENTS = "BE0101N1"
+
+
+def region_level(code: str) -> int:
+    """Level of region code.
+
+    Args:
+        code: scb region code
+
+    Returns:
+        int: `RIKET`, `LAN` or `KOMMUN`, -1 for other codes
+    """
+    if not code.isdigit():
+        return -1
+    if code == RIKET_CODE:
+        return RIKET
+    return {2: LAN, 4: KOMMUN}.get(len(code), -1)
+
+
+def fetch_population(
+    client: ScbClient,
+    regions: Sequence[str],
+    years: Sequence[str],
+    max_workers: int = 4,
+) -> pd.DataFrame:
+    """Fetch population at the end of each year.
+
+    Civilstånd, ålder and kön are eliminated, so scb returns totals.
+
+    Args:
+        client: scb client
+        regions: scb region codes
+        years: year codes
+        max_workers: number of concurrent requests
+
+    Returns:
+        pd.DataFrame: region code, year and population
+    """
+    selection = {
+        "Region": list(regions),
+        "ContentsCode": [POPULATION_CONTENTS],
+        "Tid": list(years),
+    }
+    response = fetch_chunks(
+        client, POPULATION_PATH, plan_chunks(selection, SCB_MAX_CELLS), max_workers
+    )
+    return decode_response(
+        response,
+        key_columns=["region code", "year"],
+        value_columns=["population"],
+        key_dtypes={"year": int},
+    )
+
+
+def _segment_sum(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Sum of non-missing values of each segment along the first axis.
+
+    Segments must be non-empty. Segments with only missing values are NaN.
+    """
+    present = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(present, starts, axis=0)
+    return np.where(counts > 0, sums, np.nan)
+
+
+class RegionHierarchy:
+    """Kommun to län to riket hierarchy of a sequence of region codes."""
+
+    def __init__(self, codes: Sequence[str]) -> None:
+        """Derive hierarchy and group indices from region codes.
+
+        Args:
+            codes: scb region codes, e.g. the values of the region variable
+        """
+        self.codes = np.asarray(codes, dtype=object)
+        self.positions = {code: i for i, code in enumerate(self.codes)}
+        self.levels = np.array([region_level(c) for c in self.codes], dtype=np.int8)
+
+        kommuner = np.flatnonzero(self.levels == KOMMUN)
+        prefixes = np.array([c[:2] for c in self.codes[kommuner]], dtype=object)
+        self.lan_codes, group = np.unique(prefixes.astype(str), return_inverse=True)
+        order = np.argsort(group, kind="stable")
+        #: region indices of kommuner, sorted by län
+        self.kommuner = kommuner[order]
+        #: index in `lan_codes` of the län of each kommun in `kommuner`
+        self.groups = group[order]
+        self.offsets = np.zeros(len(self.lan_codes) + 1, dtype=np.intp)
+        np.cumsum(
+            np.bincount(group, minlength=len(self.lan_codes)), out=self.offsets[1:]
+        )
+
+    def drill_down(self, lan_code: str) -> np.ndarray:
+        """Kommuner of a län.
+
+        Args:
+            lan_code: two digit län code
+
+        Returns:
+            np.ndarray: region indices of the kommuner, empty if none
+        """
+        group = np.searchsorted(self.lan_codes, lan_code)
+        if group == len(self.lan_codes) or self.lan_codes[group] != lan_code:
+            return self.kommuner[:0]
+        return self.kommuner[self.offsets[group] : self.offsets[group + 1]]
+
+    def lan_totals(self, values: np.ndarray) -> np.ndarray:
+        """Sum of the kommuner of each län.
+
+        Args:
+            values: value of each region along the first axis
+
+        Returns:
+            np.ndarray: value of each län in `lan_codes`, NaN if all kommuner are
+                missing
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(self.lan_codes) == 0:
+            return np.empty((0,) + values.shape[1:])
+        return _segment_sum(values[self.kommuner], self.offsets[:-1])
+
+    def riket_total(self, values: np.ndarray) -> np.ndarray:
+        """Sum of all kommuner.
+
+        Args:
+            values: value of each region along the first axis
+
+        Returns:
+            np.ndarray: value of riket, NaN if all kommuner are missing
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(self.kommuner) == 0:
+            return np.full(values.shape[1:], np.nan)
+        return _segment_sum(values[self.kommuner], np.zeros(1, dtype=np.intp))[0]
+
+    def kommun_shares(self, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Share of each kommun of its län and of riket.
+
+        Args:
+            values: value of each region along the first axis
+
+        Returns:
+            tuple: shares of län and of riket, ordered as `kommuner`
+        """
+        values = np.asarray(values, dtype=np.float64)
+        kommun_values = values[self.kommuner]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            of_lan = kommun_values / self.lan_totals(values)[self.groups]
+            of_riket = kommun_values / self.riket_total(values)
+        return of_lan, of_riket
+
+
+class RegionAggregation:
+    """Region x year values with rollups to län and riket."""
+
+    def __init__(
+        self,
+        data_df: pd.DataFrame,
+        value_column: str = "chg value",
+        region_column: str = "region code",
+        year_column: str = "year",
+    ) -> None:
+        """Pivot data to a region x year matrix and derive the hierarchy.
+
+        Args:
+            data_df: long format data with one row per region and year
+            value_column: column with values
+            region_column: column with scb region codes
+            year_column: column with years
+        """
+        table = YearComparison(data_df, value_column, region_column, year_column)
+        self.years = table.years
+        self.matrix = table.matrix
+        self.hierarchy = RegionHierarchy([str(code) for code in table.regions])
+        self.year_column = year_column
+
+    def _long(
+        self, codes: Sequence[str] | np.ndarray, level: Sequence[int], columns: dict
+    ) -> pd.DataFrame:
+        """Region x year arrays in long format, one row per region and year."""
+        n_years = len(self.years)
+        data_df = pd.DataFrame(
+            {
+                "region code": np.repeat(np.asarray(codes, dtype=object), n_years),
+                "level": np.repeat([LEVEL_NAMES[lv] for lv in level], n_years).astype(
+                    object
+                ),
+                self.year_column: np.tile(self.years, len(codes)),
+            }
+        )
+        for name, values in columns.items():
+            data_df[name] = np.asarray(values).reshape(-1)
+        return data_df
+
+    def totals(self, matrix: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Län and riket totals summed from the kommuner.
+
+        Args:
+            matrix: region x year values, defaults to `matrix`
+
+        Returns:
+            pd.DataFrame: region code, level, year and value of riket and each
+                län
+        """
+        matrix = self.matrix if matrix is None else matrix
+        hierarchy = self.hierarchy
+        codes = [RIKET_CODE] + list(hierarchy.lan_codes)
+        values = np.vstack(
+            [hierarchy.riket_total(matrix)[None, :], hierarchy.lan_totals(matrix)]
+        )
+        return self._long(
+            codes, [RIKET] + [LAN] * len(hierarchy.lan_codes), {"value": values}
+        )
+
+    def shares(self) -> pd.DataFrame:
+        """Share of each kommun of its län and of riket.
+
+        Returns:
+            pd.DataFrame: region code, level, year and the shares
+        """
+        hierarchy = self.hierarchy
+        of_lan, of_riket = hierarchy.kommun_shares(self.matrix)
+        return self._long(
+            hierarchy.codes[hierarchy.kommuner],
+            [KOMMUN] * len(hierarchy.kommuner),
+            {"share of län": of_lan, "share of riket": of_riket},
+        )
+
+    def population_matrix(
+        self,
+        population_df: pd.DataFrame,
+        value_column: str = "population",
+        region_column: str = "region code",
+    ) -> np.ndarray:
+        """Align population with the region x year matrix.
+
+        Args:
+            population_df: long format population by region and year
+            value_column: column with population
+            region_column: column with scb region codes
+
+        Returns:
+            np.ndarray: region x year population, NaN where missing
+        """
+        population = YearComparison(
+            population_df, value_column, region_column, self.year_column
+        )
+        rows = pd.Index([str(c) for c in population.regions]).get_indexer(
+            self.hierarchy.codes
+        )
+        cols = pd.Index(population.years).get_indexer(self.years)
+        aligned = np.full(self.matrix.shape, np.nan)
+        found = (rows >= 0)[:, None] & (cols >= 0)[None, :]
+        aligned[found] = population.matrix[np.ix_(rows, cols)][found]
+        return aligned
+
+    def per_capita(
+        self, population_df: pd.DataFrame, value_column: str = "population"
+    ) -> pd.DataFrame:
+        """Values per capita of each region and of the län and riket totals.
+
+        The totals are divided by the summed population of the same kommuner,
+        so kommuner missing in either table do not skew the ratio.
+
+        Args:
+            population_df: long format population by region code and year
+            value_column: column with population
+
+        Returns:
+            pd.DataFrame: region code, level, year, value, population and value
+                per capita
+        """
+        hierarchy = self.hierarchy
+        population = self.population_matrix(population_df, value_column)
+        missing = np.isnan(self.matrix) | np.isnan(population)
+        values = np.where(missing, np.nan, self.matrix)
+        population = np.where(missing, np.nan, population)
+        data_df = pd.concat(
+            [
+                self._long(
+                    hierarchy.codes[hierarchy.kommuner],
+                    [KOMMUN] * len(hierarchy.kommuner),
+                    {
+                        "value": values[hierarchy.kommuner],
+                        "population": population[hierarchy.kommuner],
+                    },
+                ),
+                self.totals(values).assign(population=self.totals(population)["value"]),
+            ],
+            ignore_index=True,
+        )
+        data_df["per capita"] = data_df["value"] / data_df["population"]
+        return data_df
@@ -0,0 +1,273 @@
+"""Rate limited client for the scb api."""
+
+import json
+import threading
+import time
+from typing import Any, Mapping, Optional, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ifk_analyses import instrumentation
+from ifk_analyses.cache import ResponseCache, cache_key
+
+SCB_API_URL = "https://api.scb.se/OV0104/v1/doris/sv/ssd/"
+SCB_MAX_CALLS = 30
+SCB_CALL_PERIOD = 10.0
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Thread safe token bucket rate limiter.
+
+    SCB allows at most 30 calls per 10 seconds and ip address, which is the
+    default size of the bucket.
+    """
+
+    def __init__(
+        self, capacity: int = SCB_MAX_CALLS, period: float = SCB_CALL_PERIOD
+    ) -> None:
+        """Initialization.
+
+        Args:
+            capacity: maximum number of tokens, i.e. allowed burst size
+            period: seconds to refill an empty bucket
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> float:
+        """Consume a token if one is available, without waiting.
+
+        Returns:
+            float: 0 if a token was consumed, else seconds until one is available
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.last) * self.rate
+            )
+            self.last = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> None:
+        """Block until a token is available and consume it."""
+        while wait := self.take():
+            with instrumentation.span("scb.rate_limit_wait"):
+                time.sleep(wait)
+
+
+def retry_delay(
+    status: int,
+    headers: Mapping[str, str],
+    attempt: int,
+    max_retries: int,
+    backoff: float,
+) -> Optional[float]:
+    """Delay before retrying a response, with exponential backoff.
+
+    A `Retry-After` header in seconds extends the delay.
+
+    Args:
+        status: http status of the response
+        headers: response headers
+        attempt: number of the attempt, starting at 0
+        max_retries: number of retries
+        backoff: base of the exponential backoff in seconds
+
+    Returns:
+        Optional[float]: seconds to wait, None if the response is not retried
+    """
+    if status not in RETRY_STATUS or attempt == max_retries:
+        return None
+    retry_after = headers.get("Retry-After", headers.get("retry-after", ""))
+    delay = backoff * 2**attempt
+    if retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return delay
+
+
+class ScbClient:
+    """Client for the scb api with rate limiting and retries."""
+
+    def __init__(
+        self,
+        base_url: str = SCB_API_URL,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        timeout: float = 30.0,
+        pool_size: int = 10,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
+        """Initialization.
+
+        Args:
+            base_url: url to the root of the scb table tree
+            rate_limiter: shared rate limiter, defaults to the scb quota
+            max_retries: number of retries on 429 and 5xx responses
+            backoff: base of the exponential backoff in seconds
+            timeout: request timeout in seconds
+            pool_size: number of pooled connections, should match the number of
+                threads using the client
+            cache: response cache, None to always send requests
+        """
+        self.base_url = base_url.rstrip("/") + "/"
+        self.rate_limiter = rate_limiter if rate_limiter is not None else TokenBucket()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path: Sequence[str]) -> str:
+        """Url to node in the table tree.
+
+        Args:
+            path: list of scb ids
+
+        Returns:
+            str: url to node
+        """
+        return self.base_url + "/".join(path)
+
+    def request(self, method: str, path: Sequence[str], **kwargs) -> requests.Response:
+        """Send request, retrying with backoff on 429 and 5xx responses.
+
+        Args:
+            method: http method
+            path: list of scb ids
+            kwargs: passed on to requests
+
+        Returns:
+            requests.Response: successful response
+
+        Raises:
+            requests.HTTPError: if the request failed after all retries
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            with instrumentation.span(
+                "scb.request", method=method, path="/".join(path)
+            ) as attrs:
+                response = self.session.request(
+                    method, self.url(path), timeout=self.timeout, **kwargs
+                )
+                attrs["status"] = response.status_code
+            instrumentation.count("scb.bytes", len(response.content))
+            delay = retry_delay(
+                response.status_code,
+                response.headers,
+                attempt,
+                self.max_retries,
+                self.backoff,
+            )
+            if delay is None:
+                break
+            instrumentation.count("scb.retries")
+            with instrumentation.span("scb.backoff"):
+                time.sleep(delay)
+
+        response.raise_for_status()
+        return response
+
+    def content(
+        self, method: str, path: Sequence[str], query: Optional[dict] = None
+    ) -> bytes:
+        """Get response body, through the cache if the client has one.
+
+        Args:
+            method: http method
+            path: list of scb ids
+            query: scb query, posted as json
+
+        Returns:
+            bytes: response body
+        """
+
+        def load() -> bytes:
+            kwargs = {} if query is None else {"json": query}
+            return self.request(method, path, **kwargs).content
+
+        if self.cache is None:
+            return load()
+        return self.cache.fetch(path, query, load)
+
+    def get(self, path: Sequence[str]) -> Any:
+        """Get metadata for node in the table tree.
+
+        Args:
+            path: list of scb ids
+
+        Returns:
+            Any: list of children for folders, dict with title and variables for
+                tables
+        """
+        return json.loads(self.content("GET", path))
+
+    def get_with_etag(
+        self, path: Sequence[str], etag: Optional[str] = None
+    ) -> tuple[Any, Optional[str]]:
+        """Conditionally get metadata for node in the table tree.
+
+        The request is always sent, unless the cache is offline, and fresh
+        responses are written to the cache.
+
+        Args:
+            path: list of scb ids
+            etag: ETag of a previous response for the node
+
+        Returns:
+            tuple: metadata, or None if not modified since `etag`, and ETag
+        """
+        if self.cache is not None and self.cache.offline:
+            return self.get(path), etag
+
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self.request("GET", path, headers=headers)
+        if response.status_code == 304:
+            return None, etag
+        if self.cache is not None:
+            self.cache.put(cache_key(path), path, response.content)
+        return json.loads(response.content), response.headers.get("ETag")
+
+    def updated(self, path: Sequence[str]) -> Optional[str]:
+        """Timestamp of the last update of a table, from its parent listing.
+
+        The listing is always requested, unless the cache is offline.
+
+        Args:
+            path: list of scb ids to the table
+
+        Returns:
+            Optional[str]: timestamp, None if the listing has none
+
+        Raises:
+            KeyError: if the table is not in the listing
+        """
+        listing, _ = self.get_with_etag(path[:-1])
+        for node in listing:
+            if node.get("id") == path[-1]:
+                return node.get("updated")
+        raise KeyError(f"{'/'.join(path)} not in scb listing.")
+
+    def post(self, path: Sequence[str], query: dict) -> Any:
+        """Post query to table.
+
+        Args:
+            path: list of scb ids
+            query: scb query
+
+        Returns:
+            Any: decoded response
+        """
+        return json.loads(self.content("POST", path, query))
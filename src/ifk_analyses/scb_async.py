@@ -0,0 +1,332 @@
+"""Async client for the scb api.
+
+Requests go through a pluggable transport, so many queries can run
+concurrently without blocking and the client can be tested against a local
+server. `HttpxTransport` uses httpx, install with the `async` extra, and
+`RequestsTransport` runs a pooled requests session in worker threads. Both keep
+connections alive and accept compressed responses. Responses are decoded
+directly from bytes.
+"""
+
+import asyncio
+import json
+from typing import Any, Iterable, Optional, Protocol, Sequence
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ifk_analyses import instrumentation
+from ifk_analyses.cache import ResponseCache
+from ifk_analyses.scb_api import SCB_API_URL, TokenBucket, retry_delay
+
+HEADERS = {"Accept-Encoding": "gzip, deflate", "Content-Type": "application/json"}
+
+
+class Transport(Protocol):
+    """Sends http requests."""
+
+    async def send(
+        self, method: str, url: str, body: Optional[bytes], headers: dict
+    ) -> tuple[int, dict, bytes]:
+        """Send request and return status, headers and decompressed body."""
+        ...
+
+    async def aclose(self) -> None:
+        """Close connections."""
+        ...
+
+
+class RequestsTransport:
+    """Pooled requests session run in worker threads."""
+
+    def __init__(self, pool_size: int = 10, timeout: float = 30.0) -> None:
+        """Initialization.
+
+        Args:
+            pool_size: number of pooled connections
+            timeout: request timeout in seconds
+        """
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _send(
+        self, method: str, url: str, body: Optional[bytes], headers: dict
+    ) -> tuple[int, dict, bytes]:
+        response = self.session.request(
+            method, url, data=body, headers=headers, timeout=self.timeout
+        )
+        return response.status_code, dict(response.headers), response.content
+
+    async def send(
+        self, method: str, url: str, body: Optional[bytes], headers: dict
+    ) -> tuple[int, dict, bytes]:
+        """Send request in a worker thread.
+
+        Args:
+            method: http method
+            url: url
+            body: request body
+            headers: request headers
+
+        Returns:
+            tuple: status, headers and body
+        """
+        return await asyncio.to_thread(self._send, method, url, body, headers)
+
+    async def aclose(self) -> None:
+        """Close connections."""
+        self.session.close()
+
+
+class HttpxTransport:
+    """Httpx async client."""
+
+    def __init__(
+        self, pool_size: int = 10, timeout: float = 30.0, http2: bool = False
+    ) -> None:
+        """Initialization.
+
+        Args:
+            pool_size: number of pooled connections
+            timeout: request timeout in seconds
+            http2: use http/2, requires the h2 package
+        """
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            timeout=timeout,
+            http2=http2,
+        )
+
+    async def send(
+        self, method: str, url: str, body: Optional[bytes], headers: dict
+    ) -> tuple[int, dict, bytes]:
+        """Send request.
+
+        Args:
+            method: http method
+            url: url
+            body: request body
+            headers: request headers
+
+        Returns:
+            tuple: status, headers and body
+        """
+        response = await self.client.request(method, url, content=body, headers=headers)
+        return response.status_code, dict(response.headers), response.content
+
+    async def aclose(self) -> None:
+        """Close connections."""
+        await self.client.aclose()
+
+
+def default_transport(pool_size: int = 10) -> Transport:
+    """Httpx transport if installed, else requests in worker threads.
+
+    Args:
+        pool_size: number of pooled connections
+
+    Returns:
+        Transport: transport
+    """
+    try:
+        return HttpxTransport(pool_size)
+    except ImportError:
+        return RequestsTransport(pool_size)
+
+
+class AsyncTokenBucket(TokenBucket):
+    """Token bucket rate limiter waiting without blocking the event loop."""
+
+    async def acquire(self) -> None:  # type: ignore[override]
+        """Wait until a token is available and consume it."""
+        while wait := self.take():
+            with instrumentation.span("scb.rate_limit_wait"):
+                await asyncio.sleep(wait)
+
+
+class AsyncScbClient:
+    """Async client for the scb api with rate limiting, retries and caching."""
+
+    def __init__(
+        self,
+        base_url: str = SCB_API_URL,
+        transport: Optional[Transport] = None,
+        rate_limiter: Optional[AsyncTokenBucket] = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_concurrency: int = 10,
+        cache: Optional[ResponseCache] = None,
+    ) -> None:
+        """Initialization.
+
+        Args:
+            base_url: url to the root of the scb table tree
+            transport: http transport, defaults to `default_transport`
+            rate_limiter: rate limiter, defaults to the scb quota
+            max_retries: number of retries on 429 and 5xx responses
+            backoff: base of the exponential backoff in seconds
+            max_concurrency: maximum number of requests in flight
+            cache: response cache, None to always send requests
+        """
+        self.base_url = base_url.rstrip("/") + "/"
+        self.transport = transport or default_transport(max_concurrency)
+        self.rate_limiter = rate_limiter or AsyncTokenBucket()
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.refreshes: set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "AsyncScbClient":
+        """Enter context."""
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        """Close transport."""
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Wait for background cache refreshes and close transport."""
+        await asyncio.gather(*self.refreshes, return_exceptions=True)
+        await self.transport.aclose()
+
+    def url(self, path: Sequence[str]) -> str:
+        """Url to node in the table tree.
+
+        Args:
+            path: list of scb ids
+
+        Returns:
+            str: url to node
+        """
+        return self.base_url + "/".join(path)
+
+    async def request(
+        self, method: str, path: Sequence[str], query: Optional[dict] = None
+    ) -> bytes:
+        """Send request, retrying with backoff on 429 and 5xx responses.
+
+        Args:
+            method: http method
+            path: list of scb ids
+            query: scb query, posted as json
+
+        Returns:
+            bytes: response body
+
+        Raises:
+            requests.HTTPError: if the request failed after all retries
+        """
+        body = None if query is None else json.dumps(query).encode("utf-8")
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            with instrumentation.span(
+                "scb.request", method=method, path="/".join(path)
+            ) as attrs:
+                status, headers, content = await self.transport.send(
+                    method, self.url(path), body, HEADERS
+                )
+                attrs["status"] = status
+            instrumentation.count("scb.bytes", len(content))
+            delay = retry_delay(
+                status, headers, attempt, self.max_retries, self.backoff
+            )
+            if delay is None:
+                break
+            instrumentation.count("scb.retries")
+            with instrumentation.span("scb.backoff"):
+                await asyncio.sleep(delay)
+
+        if status >= 400:
+            raise requests.HTTPError(f"{status} error for url {self.url(path)}")
+        return content
+
+    async def content(
+        self, method: str, path: Sequence[str], query: Optional[dict] = None
+    ) -> bytes:
+        """Get response body, through the cache if the client has one.
+
+        Args:
+            method: http method
+            path: list of scb ids
+            query: scb query, posted as json
+
+        Returns:
+            bytes: response body
+
+        Raises:
+            CacheMiss: if the cache is offline and the request is not cached
+        """
+        if self.cache is None:
+            return await self.request(method, path, query)
+        key, content, stale = await asyncio.to_thread(self.cache.lookup, path, query)
+        if content is not None:
+            if stale and self.cache.claim_refresh(key):
+                task = asyncio.create_task(self._refresh(key, method, path, query))
+                self.refreshes.add(task)
+                task.add_done_callback(self.refreshes.discard)
+            return content
+        content = await self.request(method, path, query)
+        await asyncio.to_thread(self.cache.put, key, path, content)
+        return content
+
+    async def _refresh(
+        self, key: str, method: str, path: Sequence[str], query: Optional[dict]
+    ) -> None:
+        """Refresh a stale cache entry claimed with `claim_refresh`."""
+        assert self.cache is not None
+        try:
+            content = await self.request(method, path, query)
+            await asyncio.to_thread(self.cache.put, key, path, content)
+        finally:
+            self.cache.release_refresh(key)
+
+    async def get(self, path: Sequence[str]) -> Any:
+        """Get metadata for node in the table tree.
+
+        Args:
+            path: list of scb ids
+
+        Returns:
+            Any: list of children for folders, dict with title and variables for
+                tables
+        """
+        return json.loads(await self.content("GET", path))
+
+    async def post(self, path: Sequence[str], query: dict) -> Any:
+        """Post query to table.
+
+        Args:
+            path: list of scb ids
+            query: scb query
+
+        Returns:
+            Any: decoded response
+        """
+        return json.loads(await self.content("POST", path, query))
+
+    async def post_many(self, queries: Iterable[tuple]) -> list:
+        """Post queries concurrently.
+
+        At most `max_concurrency` requests are in flight at a time.
+
+        Args:
+            queries: path and query of each request
+
+        Returns:
+            list: decoded responses, in the order of `queries`
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def post(path: Sequence[str], query: dict) -> Any:
+            async with semaphore:
+                return await self.post(path, query)
+
+        return await asyncio.gather(*(post(path, query) for path, query in queries))
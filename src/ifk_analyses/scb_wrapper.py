@@ -0,0 +1,37 @@
+"""Pyscbwrapper adapter for the scb client.
+
+Kept apart from `scb_api`, since importing pyscbwrapper also imports requests
+and creates a session.
+"""
+
+from typing import Any, Optional
+
+from pyscbwrapper import SCB
+
+from ifk_analyses.cache import ResponseCache
+from ifk_analyses.scb_api import ScbClient
+
+
+class CachedSCB(SCB):
+    """Pyscbwrapper SCB sending its requests through a ScbClient."""
+
+    def __init__(self, lang: str, *args: str, client: Optional[ScbClient] = None):
+        """Initialization.
+
+        Args:
+            lang: language, sv or en
+            args: scb ids to start from
+            client: scb client, defaults to a cached client for the language
+        """
+        super().__init__(lang, *args)
+        if client is None:
+            client = ScbClient(self.url, cache=ResponseCache())
+        self.client = client
+
+    def info(self) -> Any:
+        """Metadata of the current node."""
+        return self.client.get(self.ids)
+
+    def get_data(self) -> Any:
+        """Data from the current query."""
+        return self.client.post(self.ids, self.query)
@@ -0,0 +1,133 @@
+"""Checkpoint store for search tree crawls."""
+
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import IO, Optional, Union
+
+
+def atomic_write(path: str, text: Union[str, bytes]) -> None:
+    """Write text or bytes to file atomically.
+
+    The content is written to a temporary file in the same directory, which then
+    replaces the target. Readers see either the old or the new file, never a
+    partially written one.
+
+    Args:
+        path: file path
+        text: file content, text is encoded as utf-8
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    content = text.encode("utf-8") if isinstance(text, str) else text
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class CrawlCheckpoint:
+    """Append only checkpoint of visited nodes in the scb table tree.
+
+    The checkpoint is a json lines file. A run starts with a header line followed
+    by one line per visited node. Folders store their children listing and ETag,
+    tables their title and `updated` timestamp from the parent listing. When a
+    run completes the file is compacted to only contain that run.
+
+    Two sets of nodes are kept when loading:
+
+    - `visited`: nodes of an unfinished run, which are reused as is when resuming
+    - `previous`: nodes of the last completed run, used to skip unchanged tables
+      and to send conditional requests for folders
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialization.
+
+        Args:
+            path: checkpoint file path
+        """
+        self.path = path
+        self.run: Optional[str] = None
+        self.visited: dict[tuple, dict] = {}
+        self.previous: dict[tuple, dict] = {}
+        self.lock = threading.Lock()
+        self.file: Optional[IO[str]] = None
+        self.load()
+
+    def load(self) -> None:
+        """Load checkpoint from file."""
+        if not os.path.exists(self.path):
+            return
+
+        runs: list[tuple[dict, dict]] = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # last line of a crashed run may be partially written
+                    continue
+                if "run" in record:
+                    runs.append((record, {}))
+                elif runs:
+                    runs[-1][1][tuple(record["path"])] = record
+
+        for header, nodes in runs:
+            if header.get("complete"):
+                self.previous = nodes
+                self.visited = {}
+                self.run = None
+            else:
+                self.visited.update(nodes)
+                self.run = header["run"]
+
+    def __enter__(self) -> "CrawlCheckpoint":
+        """Open checkpoint for appending, starting a new run if not resuming."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.file = open(self.path, "a", encoding="utf-8")
+        if self.run is None:
+            self.run = datetime.today().isoformat()
+            self._write({"run": self.run, "complete": False})
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Close checkpoint."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _write(self, record: dict) -> None:
+        """Append record and flush it to disk."""
+        assert self.file is not None, "checkpoint not opened"
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+
+    def add(self, record: dict) -> None:
+        """Record visited node.
+
+        Args:
+            record: node record with at least the key `path`
+        """
+        self._write(record)
+        with self.lock:
+            self.visited[tuple(record["path"])] = record
+
+    def complete(self) -> None:
+        """Mark run as complete and compact the checkpoint."""
+        lines = [json.dumps({"run": self.run, "complete": True})]
+        lines += [json.dumps(r, ensure_ascii=False) for r in self.visited.values()]
+        self.__exit__()
+        atomic_write(self.path, "\n".join(lines) + "\n")
+        self.previous = self.visited
+        self.visited = {}
+        self.run = None
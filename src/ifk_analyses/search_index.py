@@ -0,0 +1,293 @@
+"""Inverted index for searching the scb search tree.
+
+The index is stored as a directory of numpy arrays, which are memory-mapped when
+loaded:
+
+- `terms.npy`: sorted vocabulary
+- `term_offsets.npy`: start of each term in the postings arrays
+- `postings.npy`: document ids, grouped by term
+- `weights.npy`: precomputed bm25 weight of each posting
+- `paths.npy`, `titles.npy`: utf-8 blobs with document paths and titles
+- `path_offsets.npy`, `title_offsets.npy`: start of each document in the blobs
+"""
+
+import os
+import re
+from typing import Iterable, Optional
+
+import numpy as np
+
+SWEDISH_FOLD = str.maketrans("åäöéü", "aaoeu")
+
+# Suffixes from the snowball swedish stemmer (step 1), after folding å, ä and ö.
+SWEDISH_SUFFIXES = sorted(
+    (
+        "heterna hetens anden andes andet arens arnas ernas heten heter ornas "
+        "ande ades aren arna arne aste erna erns orna ad ar as at en er es et "
+        "or a e s ens ern ets het ast"
+    ).split(),
+    key=len,
+    reverse=True,
+)
+MIN_STEM_LENGTH = 3
+PATH_WEIGHT = 2.0
+PREFIX_FACTOR = 0.5
+FUZZY_FACTOR = 0.3
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalize(text: str) -> str:
+    """Lowercase and fold swedish characters.
+
+    Args:
+        text: text to normalize
+
+    Returns:
+        str: normalized text
+    """
+    return text.casefold().translate(SWEDISH_FOLD)
+
+
+def stem(token: str) -> str:
+    """Remove the longest swedish inflection suffix from normalized token.
+
+    Args:
+        token: normalized token
+
+    Returns:
+        str: stemmed token
+    """
+    for suffix in SWEDISH_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: str) -> list:
+    """Split text in normalized and stemmed tokens.
+
+    Args:
+        text: text to tokenize
+
+    Returns:
+        list: tokens
+    """
+    return [stem(t) for t in re.findall(r"\w+", normalize(text))]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, cut off at `limit` + 1.
+
+    Args:
+        a: first string
+        b: second string
+        limit: largest distance of interest
+
+    Returns:
+        int: edit distance, or `limit` + 1 if larger than `limit`
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _pack(strings: Iterable[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Pack strings in an utf-8 blob with offsets."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class SearchIndex:
+    """Ranked full text search over table titles and paths."""
+
+    def __init__(self, directory: str) -> None:
+        """Load memory-mapped index.
+
+        Args:
+            directory: index directory
+        """
+        self.directory = directory
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(directory, name + ".npy"), mmap_mode="r")
+
+        self.terms = load("terms")
+        self.term_offsets = load("term_offsets")
+        self.postings = load("postings")
+        self.weights = load("weights")
+        self.paths = load("paths")
+        self.path_offsets = load("path_offsets")
+        self.titles = load("titles")
+        self.title_offsets = load("title_offsets")
+        self.n_docs = len(self.title_offsets) - 1
+
+    @staticmethod
+    def build(documents: list, directory: str) -> "SearchIndex":
+        """Build and persist index.
+
+        Titles are tokenized with swedish normalization and stemming, path ids
+        are indexed as normalized tokens with a higher weight.
+
+        Args:
+            documents: elements are tuple with search path and title
+            directory: index directory
+
+        Returns:
+            SearchIndex: the loaded index
+        """
+        term_freqs: dict[str, dict[int, float]] = {}
+        lengths = np.zeros(len(documents), dtype=np.float64)
+        for doc, (path, title) in enumerate(documents):
+            tokens = [(t, 1.0) for t in tokenize(title)]
+            tokens += [(normalize(node), PATH_WEIGHT) for node in path]
+            lengths[doc] = len(tokens)
+            for term, weight in tokens:
+                freqs = term_freqs.setdefault(term, {})
+                freqs[doc] = freqs.get(doc, 0.0) + weight
+
+        avg_length = lengths.mean() if len(documents) else 1.0
+        terms = sorted(term_freqs)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(term_freqs[t]) for t in terms], out=offsets[1:])
+        postings = np.empty(offsets[-1], dtype=np.uint32)
+        weights = np.empty(offsets[-1], dtype=np.float32)
+        for i, term in enumerate(terms):
+            docs = np.fromiter(term_freqs[term].keys(), dtype=np.uint32)
+            tf = np.fromiter(term_freqs[term].values(), dtype=np.float64)
+            idf = np.log(1 + (len(documents) - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[docs] / avg_length)
+            postings[offsets[i] : offsets[i + 1]] = docs
+            weights[offsets[i] : offsets[i + 1]] = (
+                idf * tf * (BM25_K1 + 1) / (tf + norm)
+            )
+
+        paths, path_offsets = _pack("/".join(path) for path, _ in documents)
+        titles, title_offsets = _pack(title for _, title in documents)
+        arrays: dict[str, np.ndarray] = {
+            "terms": np.array(terms, dtype=str),
+            "term_offsets": offsets,
+            "postings": postings,
+            "weights": weights,
+            "paths": paths,
+            "path_offsets": path_offsets,
+            "titles": titles,
+            "title_offsets": title_offsets,
+        }
+        os.makedirs(directory, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(directory, name + ".npy"), array)
+
+        return SearchIndex(directory)
+
+    def document(self, doc: int) -> tuple[list, str]:
+        """Get document.
+
+        Args:
+            doc: document id
+
+        Returns:
+            tuple: search path and title
+        """
+        path = bytes(self.paths[self.path_offsets[doc] : self.path_offsets[doc + 1]])
+        title = self.titles[self.title_offsets[doc] : self.title_offsets[doc + 1]]
+        return path.decode("utf-8").split("/"), bytes(title).decode("utf-8")
+
+    def _expand(self, token: str, prefix: bool) -> list:
+        """Find postings of vocabulary terms matching a query token.
+
+        Terms sharing a prefix are adjacent in the sorted vocabulary, so all
+        prefix matches form a single contiguous range of postings.
+
+        Args:
+            token: normalized query token
+            prefix: match terms starting with the token
+
+        Returns:
+            list: elements are tuple with start and end in postings and score
+                factor
+        """
+        offsets = self.term_offsets
+        start = int(np.searchsorted(self.terms, token))
+        exact = start < len(self.terms) and self.terms[start] == token
+        matches = [(offsets[start], offsets[start + 1], 1.0)] if exact else []
+        if prefix:
+            end = int(np.searchsorted(self.terms, token + "\uffff"))
+            if end > start + exact:
+                matches.append((offsets[start + exact], offsets[end], PREFIX_FACTOR))
+        return matches
+
+    def _expand_fuzzy(self, token: str) -> list:
+        """Find postings of vocabulary terms within a small edit distance.
+
+        Only terms with the same first character are considered.
+
+        Args:
+            token: normalized query token
+
+        Returns:
+            list: elements are tuple with start and end in postings and score
+                factor
+        """
+        limit = 1 if len(token) < 8 else 2
+        first = int(np.searchsorted(self.terms, token[0]))
+        last = int(np.searchsorted(self.terms, token[0] + "\uffff"))
+        return [
+            (self.term_offsets[i], self.term_offsets[i + 1], FUZZY_FACTOR)
+            for i in range(first, last)
+            if edit_distance(token, str(self.terms[i]), limit) <= limit
+        ]
+
+    def search(
+        self,
+        query: str,
+        limit: Optional[int] = 20,
+        prefix: bool = True,
+        fuzzy: bool = True,
+    ) -> list:
+        """Ranked search, all query tokens must match.
+
+        Args:
+            query: free text query
+            limit: maximum number of results, None for all
+            prefix: match terms starting with query tokens
+            fuzzy: match misspelled query tokens
+
+        Returns:
+            list: elements are tuple with search path and title, best match first
+        """
+        tokens = re.findall(r"\w+", normalize(query))
+        if not tokens or self.n_docs == 0:
+            return []
+
+        total = np.zeros(self.n_docs, dtype=np.float32)
+        matched = np.ones(self.n_docs, dtype=bool)
+        for token in tokens:
+            scores = np.zeros(self.n_docs, dtype=np.float32)
+            expanded = self._expand(stem(token), prefix)
+            if stem(token) != token:
+                expanded += self._expand(token, prefix)
+            if fuzzy and not expanded:
+                expanded = self._expand_fuzzy(stem(token))
+            for a, b, factor in expanded:
+                np.maximum.at(scores, self.postings[a:b], factor * self.weights[a:b])
+            total += scores
+            matched &= scores > 0
+
+        hits = np.flatnonzero(matched)
+        if limit is not None and len(hits) > limit:
+            hits = hits[np.argpartition(-total[hits], limit - 1)[:limit]]
+        hits = hits[np.argsort(-total[hits], kind="stable")]
+        return [self.document(int(doc)) for doc in hits]
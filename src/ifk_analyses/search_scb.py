@@ -1,11 +1,37 @@
 """Function to search in scb."""
 
-import copy
+import ast
 import logging
-import time
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
+from typing import Optional
 
-from pyscbwrapper import SCB
+import requests
+
+from ifk_analyses import instrumentation
+from ifk_analyses.cache import ResponseCache
+from ifk_analyses.compact_tree import CompactTree, write_compact_tree
+from ifk_analyses.metadata_catalog import MetadataCatalog
+from ifk_analyses.scb_api import ScbClient
+from ifk_analyses.search_checkpoint import CrawlCheckpoint, atomic_write
+from ifk_analyses.search_index import SearchIndex
+
+TREE_LINE = re.compile(r"^(\[[^\]]*\])[;,] (.*)$")
+
+
+class CrawlIncomplete(RuntimeError):
+    """Nodes of the search tree failed after all retries."""
+
+    def __init__(self, failed: list) -> None:
+        """Initialization.
+
+        Args:
+            failed: list of scb ids of each failed node
+        """
+        super().__init__(f"{len(failed)} nodes failed: {failed}")
+        self.failed = failed
 
 
 class ScbSearch:
@@ -14,59 +40,204 @@ class ScbSearch:
     def __init__(self):
         """Initialization."""
         self.search_tree_file_path = "data/search_tree.txt"
+        self.compact_tree_file_path = "data/search_tree.bin"
+        self.search_index_path = "data/search_index"
+        self.checkpoint_file_path = "data/search_tree.checkpoint.jsonl"
+        self.metadata_catalog_path = "data/metadata.sqlite"
         self.log_file_path = "log/update_search_tree.log"
-        self.sleep_time = 0.7
+        self.max_workers = 8
+        self._search_tree: Optional[list] = None
+        self._compact_tree: Optional[CompactTree] = None
+        self._search_index: Optional[SearchIndex] = None
 
-    def update_search_tree(self) -> list:
+    def update_search_tree(self, client: Optional[ScbClient] = None) -> list:
         """Generate scb search tree.
 
+        The tree is crawled concurrently by a pool of `max_workers` threads. All
+        requests share the rate limiter of the client, so the crawl stays within
+        the scb quota regardless of the number of workers.
+
+        Every visited node is recorded in a checkpoint. An interrupted crawl
+        resumes where it stopped, and tables whose `updated` timestamp is
+        unchanged since the last completed crawl are not fetched again. The search
+        tree file is replaced atomically, and the checkpoint marked complete,
+        only once every node was crawled. If nodes fail after all retries the
+        previous tree is kept and the next run resumes with the failed nodes.
+        The variables and values of every fetched table are stored in the
+        metadata catalog.
+
         Args:
-            entry_ids: a list of list with entry ids
+            client: scb client, defaults to the public scb api with the local
+                response cache
 
         Returns:
-            list: elements are tuple with search path and title containing substring
+            list: elements are tuple with search path and title for each table
+
+        Raises:
+            CrawlIncomplete: if nodes failed after all retries
         """
-        with open(self.search_tree_file_path, "w") as f:
-            f.write(f"updated {datetime.today()}\n")
-        scb = SCB("sv")
-        results: list[tuple] = []
-
-        def recursive_search(nodes: list) -> None:
-            """Recursively dig in search tree.
-
-            Method is based on the assumption that the categorization structure is identified
-            as list, while the objects are identified as dicts.
-
-            Args:
-                nodes: list of scb ids.
-            """
-            scb.ids = []
-            scb.go_down(*nodes)
-            info = scb.info()
-            logging.basicConfig(filename=self.log_file_path)
-
-            if isinstance(info, list):
-                for child in info:
-                    time.sleep(self.sleep_time)
-                    if "id" in child.keys():
-                        new_nodes = copy.deepcopy(nodes)
-                        new_nodes.append(child["id"])
-                        recursive_search(new_nodes)
-                    else:
-                        logging.warning(f"Error. id not in keys for {nodes}")
+        if client is None:
+            client = ScbClient(pool_size=self.max_workers, cache=ResponseCache())
+        os.makedirs(os.path.dirname(self.log_file_path) or ".", exist_ok=True)
+        logging.basicConfig(filename=self.log_file_path)
+
+        checkpoint = CrawlCheckpoint(self.checkpoint_file_path)
+        catalog = MetadataCatalog(self.metadata_catalog_path)
+        with checkpoint:
+            tables = self._crawl(client, checkpoint, catalog)
+
+        lines = [f"updated {datetime.today()}"]
+        lines += [f"{nodes}; {title}" for nodes, title in tables]
+        atomic_write(self.search_tree_file_path, "\n".join(lines) + "\n")
+        write_compact_tree(tables, self.compact_tree_file_path)
+        checkpoint.complete()
+        self._search_tree = None
+        self._compact_tree = None
+        self._search_index = None
+
+        return tables
+
+    def _visit(
+        self,
+        client: ScbClient,
+        checkpoint: CrawlCheckpoint,
+        catalog: MetadataCatalog,
+        nodes: list,
+        updated: Optional[str],
+    ) -> dict:
+        """Visit node, reusing the checkpoint where possible.
+
+        Args:
+            client: scb client
+            checkpoint: crawl checkpoint
+            catalog: metadata catalog, tables are stored when fetched
+            nodes: list of scb ids
+            updated: timestamp of the node from the parent listing, tables only
+
+        Returns:
+            dict: node record with `children` for folders or `title` for tables
+        """
+        key = tuple(nodes)
+        if key in checkpoint.visited:
+            return checkpoint.visited[key]
+
+        previous = checkpoint.previous.get(key, {})
+        if (
+            updated is not None
+            and previous.get("updated") == updated
+            and catalog.updated(nodes) == updated
+        ):
+            record = previous
+            instrumentation.count("crawl.reused")
+        else:
+            info, etag = client.get_with_etag(nodes, previous.get("etag"))
+            instrumentation.count(
+                "crawl.fetched" if info is not None else "crawl.reused"
+            )
+            if info is None:
+                record = previous
+            elif isinstance(info, list):
+                record = {"path": nodes, "etag": etag, "children": info}
             elif isinstance(info, dict) and "title" in info.keys():
-                title = info["title"]
-                with open(self.search_tree_file_path, "a") as file:
-                    file.write(f"{nodes}; {title}\n")
+                record = {"path": nodes, "updated": updated, "title": info["title"]}
+                catalog.put(nodes, info, updated)
             else:
-                logging.warning(f"{nodes} not list or dict.")
+                record = {"path": nodes}
+
+        checkpoint.add(record)
+        return record
+
+    def _crawl(
+        self, client: ScbClient, checkpoint: CrawlCheckpoint, catalog: MetadataCatalog
+    ) -> list:
+        """Crawl search tree.
+
+        Method is based on the assumption that the categorization structure is
+        identified as list, while the objects are identified as dicts. Each node
+        is tagged with the position of its children along the path, so the result
+        can be put back in depth first order.
+
+        Args:
+            client: scb client
+            checkpoint: crawl checkpoint
+            catalog: metadata catalog
+
+        Returns:
+            list: elements are tuple with search path and title, depth first order
+
+        Raises:
+            CrawlIncomplete: if nodes failed, after the rest of the tree is crawled
+        """
+        found: list[tuple[tuple, list, str]] = []
+        failed: list[list] = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            root = executor.submit(self._visit, client, checkpoint, catalog, [], None)
+            pending: dict[Future, tuple[tuple, list]] = {root: ((), [])}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    order, nodes = pending.pop(future)
+                    try:
+                        record = future.result()
+                    except requests.RequestException as e:
+                        logging.warning(f"Error. {nodes} failed with {e}")
+                        failed.append(nodes)
+                        continue
 
-        for entry in scb.info():
-            recursive_search([entry["id"]])
+                    if "children" in record:
+                        for i, child in enumerate(record["children"]):
+                            if "id" in child.keys():
+                                new_nodes = nodes + [child["id"]]
+                                new_future = executor.submit(
+                                    self._visit,
+                                    client,
+                                    checkpoint,
+                                    catalog,
+                                    new_nodes,
+                                    child.get("updated"),
+                                )
+                                pending[new_future] = (order + (i,), new_nodes)
+                            else:
+                                logging.warning(f"Error. id not in keys for {nodes}")
+                    elif "title" in record:
+                        found.append((order, nodes, record["title"]))
+                    else:
+                        logging.warning(f"{nodes} not list or dict.")
+
+        if failed:
+            raise CrawlIncomplete(failed)
+        found.sort(key=lambda x: x[0])
+        return [(nodes, title) for _, nodes, title in found]
+
+    def load_compact_tree(self) -> CompactTree:
+        """Load search tree in compact binary format.
 
-        return results
+        The binary file is converted from the search tree text file if missing or
+        older than the text file.
 
-    def search_substring(self, *arg: str):
+        Returns:
+            CompactTree: memory-mapped search tree
+        """
+        if self._compact_tree is None:
+            if _is_stale(self.compact_tree_file_path, self.search_tree_file_path):
+                convert_search_tree(
+                    self.search_tree_file_path, self.compact_tree_file_path
+                )
+            self._compact_tree = CompactTree(self.compact_tree_file_path)
+        return self._compact_tree
+
+    def read_search_tree(self) -> list:
+        """Read search tree, loaded once per instance.
+
+        Returns:
+            list: elements are tuple with search path and title for each table
+        """
+        if self._search_tree is None:
+            self._search_tree = self.load_compact_tree().tables()
+        return self._search_tree
+
+    def search_substring(self, *arg: str) -> list:
         """Search for substring in scb db.
 
         Args:
@@ -75,15 +246,94 @@ class ScbSearch:
         Returns:
             list: elements are tuple with search path and title containing substring
         """
-        with open(self.search_tree_file_path, "rt") as f:
-            for line in f:
-                if all(s.lower() in line.lower() for s in arg):
-                    print(line)
+        substrings = [s.lower() for s in arg]
+        return [
+            (nodes, title)
+            for nodes, title in self.read_search_tree()
+            if all(s in f"{nodes}; {title}".lower() for s in substrings)
+        ]
+
+    def search_index(self) -> SearchIndex:
+        """Load search index, building it if older than the search tree.
+
+        Returns:
+            SearchIndex: memory-mapped search index
+        """
+        if self._search_index is None:
+            stamp = os.path.join(self.search_index_path, "title_offsets.npy")
+            if _is_stale(stamp, self.search_tree_file_path):
+                self._search_index = SearchIndex.build(
+                    self.read_search_tree(), self.search_index_path
+                )
+            else:
+                self._search_index = SearchIndex(self.search_index_path)
+        return self._search_index
+
+    def search(self, query: str, limit: Optional[int] = 20, fuzzy: bool = True) -> list:
+        """Ranked search in table titles and paths.
+
+        Words are matched regardless of inflection and of å, ä and ö, as prefixes
+        and, if nothing else matches, with small spelling errors.
+
+        Args:
+            query: words to search for
+            limit: maximum number of results, None for all
+            fuzzy: allow spelling errors
+
+        Returns:
+            list: elements are tuple with search path and title, best match first
+        """
+        return self.search_index().search(query, limit=limit, fuzzy=fuzzy)
+
+
+def _is_stale(derived_path: str, source_path: str) -> bool:
+    """Check if file derived from source is missing or older than the source."""
+    return not os.path.exists(derived_path) or os.path.getmtime(
+        derived_path
+    ) < os.path.getmtime(source_path)
+
+
+def read_search_tree(file_path: str) -> list:
+    """Read search tree file.
+
+    Both `['AA', 'AA0003']; title` and `['AA', 'AA0003'], title` lines are
+    accepted. Titles spanning several lines are joined.
+
+    Args:
+        file_path: path to search tree file
+
+    Returns:
+        list: elements are tuple with search path and title for each table
+    """
+    tables: list[tuple[list, str]] = []
+    with open(file_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            match = TREE_LINE.match(line)
+            if match:
+                tables.append((ast.literal_eval(match[1]), match[2]))
+            elif tables and line:
+                tables[-1] = (tables[-1][0], tables[-1][1] + line)
+
+    return tables
+
+
+def convert_search_tree(text_path: str, binary_path: str) -> CompactTree:
+    """Convert search tree text file to compact binary format.
+
+    Args:
+        text_path: search tree text file
+        binary_path: binary file path
 
-        pass
+    Returns:
+        CompactTree: the converted tree
+    """
+    write_compact_tree(read_search_tree(text_path), binary_path)
+    return CompactTree(binary_path)
 
 
 if __name__ == "__main__":
     sSearch = ScbSearch()
     # sSearch.update_search_tree()
-    sSearch.search_substring("darndidu")
+    for nodes, title in sSearch.search("utsläpp kommun"):
+        print(nodes, title)
@@ -0,0 +1,328 @@
+"""Local columnar store of fetched scb tables.
+
+Every write of a table creates a new snapshot, a hive partitioned Parquet
+dataset under `<root>/<table>/snapshot=<timestamp>/`. A json manifest at the
+root lists the snapshots of each table, which gives the version history. Reads
+use the latest snapshot unless another one is given, and filters are pushed down
+to partition pruning and Parquet row group statistics.
+
+Requires pyarrow, install with the `arrow` extra.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ifk_analyses._lazy import lazy_import
+from ifk_analyses.search_checkpoint import atomic_write
+
+if TYPE_CHECKING:
+    import pandas as pd
+else:
+    pd = lazy_import("pandas")
+
+DEFAULT_STORE_DIR = "data/store"
+REVISED_PERIODS = 2
+
+
+def _filter_expression(filters: dict) -> Optional[ds.Expression]:
+    """Build dataset filter from column values.
+
+    Args:
+        filters: allowed value or list of values keyed by column
+
+    Returns:
+        Optional[ds.Expression]: filter, None for no filters
+    """
+    expression = None
+    for column, values in filters.items():
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        condition = ds.field(column).isin(list(values))
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def periods_to_fetch(
+    synced: Optional[dict],
+    periods: Sequence[str],
+    updated: Optional[str],
+    revised: int = REVISED_PERIODS,
+) -> list:
+    """Periods of a time series table to fetch in an incremental sync.
+
+    New periods are always fetched. SCB revises recent periods when it adds
+    new ones, so the latest `revised` stored periods are fetched again when
+    the `updated` timestamp of the table changed or is unknown.
+
+    Args:
+        synced: `updated` and `periods` of the last sync, None if never synced
+        periods: current periods of the table
+        updated: current `updated` timestamp of the table
+        revised: number of latest stored periods to fetch again on updates
+
+    Returns:
+        list: periods to fetch, in table order
+    """
+    if synced is None:
+        return list(periods)
+    known = synced["periods"]
+    fetch = set(periods) - set(known)
+    if updated is None or updated != synced["updated"]:
+        fetch.update(known[max(0, len(known) - revised) :])
+    return [period for period in periods if period in fetch]
+
+
+def _concat(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Concatenate tables, keeping categorical columns categorical."""
+    data = pd.concat([old, new], ignore_index=True)
+    for column in new.columns:
+        if isinstance(new[column].dtype, pd.CategoricalDtype) and column in old:
+            data[column] = pd.api.types.union_categoricals(
+                [old[column].astype("category"), new[column]]
+            )
+    return data
+
+
+class TableStore:
+    """Partitioned Parquet store with a manifest of table snapshots."""
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR) -> None:
+        """Initialization.
+
+        Args:
+            root: store directory
+        """
+        self.root = root
+        self.manifest_path = os.path.join(root, "manifest.json")
+        self.lock = threading.Lock()
+
+    def manifest(self) -> dict:
+        """Read manifest.
+
+        Returns:
+            dict: snapshots keyed by table id
+        """
+        if not os.path.exists(self.manifest_path):
+            return {"tables": {}}
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def snapshots(self, table_id: str) -> list:
+        """Version history of table.
+
+        Args:
+            table_id: table id
+
+        Returns:
+            list: snapshot entries, oldest first
+        """
+        return self.manifest()["tables"].get(table_id, [])
+
+    def latest(self, table_id: str) -> Optional[dict]:
+        """Latest snapshot of table.
+
+        Args:
+            table_id: table id
+
+        Returns:
+            Optional[dict]: snapshot entry, None if the table is not stored
+        """
+        snapshots = self.snapshots(table_id)
+        return snapshots[-1] if snapshots else None
+
+    def write(
+        self,
+        table_id: str,
+        data: pd.DataFrame,
+        partition_by: Sequence[str] = ("year",),
+        metadata: Optional[dict] = None,
+    ) -> dict:
+        """Write table as a new snapshot.
+
+        Args:
+            table_id: table id, e.g. the scb table path
+            data: table data
+            partition_by: columns to partition by, ignored if not in data
+            metadata: extra information stored in the manifest, e.g. the scb
+                `updated` timestamp
+
+        Returns:
+            dict: snapshot entry
+        """
+        snapshot = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        directory = os.path.join(
+            re.sub(r"[^\w\-]", "_", table_id), f"snapshot={snapshot}"
+        )
+        partition_cols = [c for c in partition_by if c in data.columns]
+        pq.write_to_dataset(
+            pa.Table.from_pandas(data, preserve_index=False),
+            os.path.join(self.root, directory),
+            partition_cols=partition_cols or None,
+        )
+
+        entry = {
+            "snapshot": snapshot,
+            "created": time.time(),
+            "path": directory,
+            "rows": len(data),
+            "partition_by": partition_cols,
+            "dtypes": {c: str(data[c].dtype) for c in partition_cols},
+            "metadata": metadata or {},
+        }
+        with self.lock:
+            manifest = self.manifest()
+            manifest["tables"].setdefault(table_id, []).append(entry)
+            atomic_write(
+                self.manifest_path, json.dumps(manifest, ensure_ascii=False, indent=1)
+            )
+        return entry
+
+    def upsert(
+        self,
+        table_id: str,
+        data: pd.DataFrame,
+        keys: Sequence[str],
+        partition_by: Sequence[str] = ("year",),
+        metadata: Optional[dict] = None,
+    ) -> dict:
+        """Merge rows into the latest snapshot and write it as a new snapshot.
+
+        Stored rows with the same keys as a new row are replaced, other stored
+        rows are kept.
+
+        Args:
+            table_id: table id
+            data: new or revised rows
+            keys: columns identifying a row, e.g. region and year
+            partition_by: columns to partition by, ignored if not in data
+            metadata: extra information stored in the manifest
+
+        Returns:
+            dict: snapshot entry
+        """
+        if self.latest(table_id) is not None:
+            stored = self.read(table_id)
+            replaced = pd.MultiIndex.from_frame(stored[list(keys)].astype(object)).isin(
+                pd.MultiIndex.from_frame(data[list(keys)].astype(object))
+            )
+            data = _concat(stored[~replaced], data)
+        return self.write(table_id, data, partition_by, metadata)
+
+    def read(
+        self,
+        table_id: str,
+        filters: Optional[dict] = None,
+        columns: Optional[list] = None,
+        snapshot: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Read table.
+
+        Args:
+            table_id: table id
+            filters: allowed value or list of values keyed by column, e.g.
+                `{"year": [2016, 2021]}`
+            columns: columns to read, None for all
+            snapshot: snapshot to read, None for the latest
+
+        Returns:
+            pd.DataFrame: table data
+
+        Raises:
+            KeyError: if the table or snapshot is not stored
+        """
+        snapshots = self.snapshots(table_id)
+        if snapshot is not None:
+            snapshots = [s for s in snapshots if s["snapshot"] == snapshot]
+        if not snapshots:
+            raise KeyError(f"{table_id} {snapshot or ''} not in store.")
+        entry = snapshots[-1]
+
+        dataset = ds.dataset(
+            os.path.join(self.root, entry["path"]),
+            format="parquet",
+            partitioning="hive",
+        )
+        table = dataset.to_table(
+            columns=columns, filter=_filter_expression(filters or {})
+        )
+        data = table.to_pandas()
+        dtypes = {c: t for c, t in entry["dtypes"].items() if c in data.columns}
+        return data.astype(dtypes).reset_index(drop=True)
+
+    def read_or_fetch(
+        self,
+        table_id: str,
+        fetch: Callable[[], pd.DataFrame],
+        max_age: Optional[float] = None,
+        filters: Optional[dict] = None,
+        metadata: Optional[dict] = None,
+    ) -> pd.DataFrame:
+        """Read table, fetching and storing it first if missing or too old.
+
+        Args:
+            table_id: table id
+            fetch: function fetching the table from scb
+            max_age: maximum age in seconds of the latest snapshot, None for no
+                limit
+            filters: allowed value or list of values keyed by column
+            metadata: extra information stored in the manifest when fetched
+
+        Returns:
+            pd.DataFrame: table data
+        """
+        latest = self.latest(table_id)
+        if latest is None or (
+            max_age is not None and time.time() - latest["created"] > max_age
+        ):
+            self.write(table_id, fetch(), metadata=metadata)
+        return self.read(table_id, filters=filters)
+
+    def sync(
+        self,
+        table_id: str,
+        fetch: Callable[[list], pd.DataFrame],
+        periods: Sequence[str],
+        updated: Optional[str],
+        keys: Sequence[str],
+        revised: int = REVISED_PERIODS,
+        filters: Optional[dict] = None,
+    ) -> pd.DataFrame:
+        """Read table after fetching only new and revised periods.
+
+        The `updated` timestamp and periods of each sync are stored in the
+        manifest. Fetched periods are merged into the stored table with
+        `upsert`. Tables stored without sync information are fetched in full.
+
+        Args:
+            table_id: table id
+            fetch: function fetching the given periods of the table from scb
+            periods: current periods of the table
+            updated: current `updated` timestamp of the table
+            keys: columns identifying a row
+            revised: number of latest stored periods to fetch again on updates
+            filters: allowed value or list of values keyed by column
+
+        Returns:
+            pd.DataFrame: table data
+        """
+        latest = self.latest(table_id)
+        synced = None if latest is None else latest["metadata"].get("sync")
+        fetch_periods = periods_to_fetch(synced, periods, updated, revised)
+        if fetch_periods:
+            metadata = {"sync": {"updated": updated, "periods": list(periods)}}
+            if synced is None:
+                self.write(table_id, fetch(fetch_periods), metadata=metadata)
+            else:
+                self.upsert(table_id, fetch(fetch_periods), keys, metadata=metadata)
+        return self.read(table_id, filters=filters)
@@ -0,0 +1,212 @@
+"""Shared fixtures."""
+
+import gzip
+import hashlib
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+import pytest
+
+from ifk_analyses.metadata_catalog import MetadataCatalog
+from ifk_analyses.objects.emissions_kommun import FetchData
+from ifk_analyses.scb_api import ScbClient, TokenBucket
+
+TREE = {
+    "": [
+        {"id": "AA", "type": "l", "text": "Ämnesövergripande statistik"},
+        {"id": "MI", "type": "l", "text": "Miljö"},
+    ],
+    "AA": [
+        {"id": "AA0003", "type": "l", "text": "Integration"},
+    ],
+    "AA/AA0003": [
+        {
+            "id": "MotFlyktAldKon",
+            "type": "t",
+            "text": "Andel förvärvsarbetande",
+            "updated": "2023-01-01T08:00:00",
+        },
+        {"type": "t", "text": "Broken entry"},
+    ],
+    "AA/AA0003/MotFlyktAldKon": {
+        "title": "Andel förvärvsarbetande kommunmottagna flyktingar efter ålder",
+        "variables": [],
+    },
+    "MI": [
+        {"id": "MI1301", "type": "l", "text": "Utsläpp"},
+        {
+            "id": "TotaltUtslappN",
+            "type": "t",
+            "text": "Totala utsläpp",
+            "updated": "2023-06-01T08:00:00",
+        },
+    ],
+    "MI/MI1301": [
+        {"id": "MI1301B", "type": "l", "text": "Utsläpp till luft"},
+    ],
+    "MI/MI1301/MI1301B": [
+        {
+            "id": "UtslappKommun",
+            "type": "t",
+            "text": "Utsläpp till luft",
+            "updated": "2023-06-01T08:00:00",
+        },
+    ],
+    "MI/MI1301/MI1301B/UtslappKommun": {
+        "title": "Utsläpp till luft efter region, ämne och år",
+        "variables": [
+            {
+                "code": "Region",
+                "text": "region",
+                "values": ["00", "0114"],
+                "valueTexts": ["Riket", "Upplands Väsby"],
+            },
+            {
+                "code": "Amne",
+                "text": "ämne",
+                "values": ["GHG", "CO2"],
+                "valueTexts": [
+                    "växthusgaser, kiloton koldioxidekvivalenter",
+                    "koldioxid, kiloton",
+                ],
+            },
+            {
+                "code": "ContentsCode",
+                "text": "tabellinnehåll",
+                "values": ["000001"],
+                "valueTexts": ["Utsläpp"],
+            },
+            {
+                "code": "Tid",
+                "text": "år",
+                "values": ["2016", "2021"],
+                "valueTexts": ["2016", "2021"],
+                "time": True,
+            },
+        ],
+    },
+    "MI/TotaltUtslappN": {
+        "title": "Totala utsläpp efter växthusgas, sektor och år",
+        "variables": [],
+    },
+}
+
+
+class FakeScb:
+    """Local fake of the scb api serving a small table tree."""
+
+    def __init__(self) -> None:
+        """Initialization."""
+        self.tree = json.loads(json.dumps(TREE))
+        self.data: dict = {}
+        self.failures: dict = {}
+        self.requests: list = []
+        self.connections: set = set()
+        self.compressed = 0
+        self.lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _empty(self, status: int) -> None:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _respond(self, method: str) -> None:
+                path = self.path.split("/ssd/", 1)[1].strip("/")
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with fake.lock:
+                    fake.requests.append((method, path, body))
+                    fake.connections.add(self.client_address)
+                    statuses = fake.failures.get(path, [])
+                    status = statuses.pop(0) if statuses else 200
+                if status != 200:
+                    self._empty(status)
+                    return
+                if method == "POST":
+                    payload = fake.data[path]
+                    if callable(payload):
+                        payload = payload(json.loads(body))
+                elif path in fake.tree:
+                    payload = fake.tree[path]
+                else:
+                    self._empty(404)
+                    return
+                content = b"\xef\xbb\xbf" + json.dumps(payload).encode("utf-8")
+                etag = '"' + hashlib.sha256(content).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self._empty(304)
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    content = gzip.compress(content)
+                    self.send_header("Content-Encoding", "gzip")
+                    with fake.lock:
+                        fake.compressed += 1
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def do_GET(self) -> None:  # noqa: N802
+                self._respond("GET")
+
+            def do_POST(self) -> None:  # noqa: N802
+                self._respond("POST")
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/ssd/"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, args=(0.01,), daemon=True
+        )
+        self.thread.start()
+
+    def close(self) -> None:
+        """Stop server."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def fake_scb():
+    """Fake scb api running on localhost."""
+    fake = FakeScb()
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def kommun_value() -> Callable[[str, str, str], float]:
+    """Value of each region, substance and year cell served to `f_data`.
+
+    Override the fixture, or parametrize it, to serve other values.
+    """
+    return lambda region, substance, year: len(region) + len(substance) + int(year)
+
+
+@pytest.fixture
+def f_data(fake_scb, tmp_path, kommun_value):
+    """FetchData against the fake scb api, answering any query."""
+
+    def respond(query: dict) -> dict:
+        values = [q["selection"]["values"] for q in query["query"]]
+        data = [
+            {"key": [r, s, y], "values": [str(kommun_value(r, s, y))]}
+            for r, s, y in itertools.product(*values)
+        ]
+        return {"columns": [], "data": data}
+
+    fake_scb.data["MI/MI1301/MI1301B/UtslappKommun"] = respond
+    return FetchData(
+        client=ScbClient(fake_scb.url, TokenBucket(1000, 1.0)),
+        catalog=MetadataCatalog(str(tmp_path / "metadata.sqlite")),
+    )
@@ -0,0 +1,39 @@
+"""Unit tests of streaming fetch and batch writing."""
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from pyarrow import ipc
+
+from ifk_analyses.arrow_io import write_batches
+
+
+def test_iter_batches(f_data):
+    """Test that batches together equal the full fetch."""
+    batches = list(f_data.iter_batches(max_cells=2))
+    assert len(batches) == 2
+    assert all(len(batch) == 2 for batch in batches)
+    full = f_data.dict_to_dataframe(f_data.get())
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), full)
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_write_batches(f_data, tmp_path, suffix):
+    """Test appending batches to parquet and arrow files."""
+    path = str(tmp_path / ("data" + suffix))
+    assert write_batches(f_data.iter_batches(max_cells=1), path) == 4
+
+    if suffix == ".parquet":
+        assert pq.ParquetFile(path).num_row_groups == 4
+        table = pq.read_table(path)
+    else:
+        table = ipc.open_file(path).read_all()
+    written = table.to_pandas()
+    assert list(written["chg value"]) == [2021.0, 2026.0, 2023.0, 2028.0]
+    assert list(written["region"]) == ["Riket"] * 2 + ["Upplands Väsby"] * 2
+
+
+def test_write_batches_unknown_format(tmp_path):
+    """Test that unknown suffixes are rejected."""
+    with pytest.raises(ValueError):
+        write_batches([], str(tmp_path / "data.csv"))
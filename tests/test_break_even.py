@@ -0,0 +1,53 @@
+"""Unit tests of break-even distances."""
+
+import numpy as np
+import pytest
+
+from ifk_analyses.objects.break_even import scenario_break_even, vehicle_break_even
+from ifk_analyses.objects.lca_sweep import switch_model
+from ifk_analyses.objects.personal_vehicle_lca import (
+    Scenarios,
+    Vehicle,
+    co2_scenarios,
+    vehicle_table,
+)
+
+CAR = Vehicle("Bensinbil", 1500, 0, 0.05, 8, 77, 3, 300000)
+EV = Vehicle("Elbil", 2200, 125, 0.25, 8, 77, 0.45, 300000)
+SMALL_EV = Vehicle("Liten elbil", 1500, 50, 0.15, 8, 77, 0.45, 300000)
+BIKE = Vehicle("Cykel", 10, 0, 0, 8, 77, 0.45, 300000)
+
+
+def test_vehicle_break_even():
+    """Test closed form against single segment scenarios."""
+    vehicles = vehicle_table([CAR, EV, SMALL_EV, BIKE])
+    distance = vehicle_break_even(vehicles)
+    # 1500 * 8 + 0.15 * d = 2200 * 8 + 125 * 77 + 0.1125 * d
+    assert distance[0, 1] == pytest.approx((5600 + 9625) / (0.15 - 0.1125))
+    np.testing.assert_array_equal(distance, distance.T)
+    assert np.isnan(np.diag(distance)).all()
+    assert np.isnan(distance[0, 3])
+
+    scenarios = Scenarios.from_segments([[(i, 0)] for i in range(4)])
+    np.testing.assert_allclose(scenario_break_even(vehicles, scenarios), distance)
+
+
+def test_scenario_break_even():
+    """Test switching scenarios against the sweep model and dense sampling."""
+    vehicles = vehicle_table([CAR, EV, SMALL_EV])
+    scenarios = Scenarios.from_segments(
+        [[(0, 0)], [(0, 0), (1, 100000)], [(0, 0), (2, 50000)]]
+    )
+    distance = scenario_break_even(vehicles, scenarios)
+
+    samples = {"kilometers_at_change": np.array([100000.0])}
+    expected = switch_model(samples, CAR, EV)["break_even"][0]
+    assert distance[0, 1] == pytest.approx(expected)
+
+    axis = np.linspace(0, 1e6, 1_000_001)
+    co2 = co2_scenarios(vehicles, scenarios, axis)
+    sign = np.sign(co2[0] - co2[2])[axis > 50000]
+    crossing = axis[axis > 50000][np.argmax(sign != sign[0])]
+    assert distance[0, 2] == pytest.approx(crossing, abs=1)
+    # Buying the electric car later is a jump past the small electric car.
+    assert distance[1, 2] == 100000
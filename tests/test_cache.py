@@ -0,0 +1,145 @@
+"""Unit tests of response cache."""
+
+import time
+
+import pytest
+
+from ifk_analyses.cache import CacheMiss, ResponseCache, cache_key
+from ifk_analyses.metadata_catalog import MetadataCatalog
+from ifk_analyses.objects.emissions_kommun import FetchData
+from ifk_analyses.objects.passenger_transport import FetchScbData
+from ifk_analyses.scb_api import ScbClient, TokenBucket
+
+KOMMUN_DATA = {
+    "columns": [],
+    "data": [
+        {"key": ["00", "GHG", "2016"], "values": ["2.0"]},
+        {"key": ["0114", "GHG", "2016"], "values": ["1.0"]},
+        {"key": ["00", "GHG", "2021"], "values": ["1.0"]},
+        {"key": ["0114", "GHG", "2021"], "values": ["1.5"]},
+    ],
+}
+TRANSPORT_DATA = {
+    "columns": [],
+    "data": [
+        {"key": ["CO2-ekv.", "0.2", "1990"], "values": ["71000"]},
+        {"key": ["CO2-ekv.", "8.0", "1990"], "values": ["19000"]},
+    ],
+}
+
+
+class Loader:
+    """Counting loader."""
+
+    def __init__(self, content: bytes = b"body") -> None:
+        """Initialization."""
+        self.content = content
+        self.calls = 0
+
+    def __call__(self) -> bytes:
+        """Load content."""
+        self.calls += 1
+        return self.content
+
+
+def test_cache_key_normalized():
+    """Test that equivalent queries share key."""
+    a = {"code": "A", "selection": {"values": ["1"]}}
+    b = {"code": "B", "selection": {"values": ["2"]}}
+    query = {"query": [a, b], "response": {"format": "json"}}
+    reordered = {"response": {"format": "json"}, "query": [b, a]}
+    assert cache_key(["START", "MI"], query) == cache_key(["MI"], reordered)
+    assert cache_key(["MI"], query) != cache_key(["MI"])
+
+
+def test_cache_hit_and_ttl(tmp_path):
+    """Test hits and expiry."""
+    cache = ResponseCache(str(tmp_path), ttl=0.05)
+    load = Loader()
+    assert cache.fetch(["MI"], None, load) == b"body"
+    assert cache.fetch(["MI"], None, load) == b"body"
+    assert load.calls == 1
+
+    time.sleep(0.06)
+    cache.fetch(["MI"], None, load)
+    assert load.calls == 2
+    assert ResponseCache(str(tmp_path)).fetch(["MI"], None, load) == b"body"
+    assert load.calls == 2
+
+
+def test_cache_invalidate(tmp_path):
+    """Test that all entries of a node are removed."""
+    cache = ResponseCache(str(tmp_path))
+    load = Loader()
+    cache.fetch(["MI"], None, load)
+    cache.fetch(["MI"], {"query": []}, load)
+    cache.fetch(["AA"], None, load)
+    assert cache.invalidate(["MI"]) == 2
+    cache.fetch(["MI"], None, load)
+    cache.fetch(["AA"], None, load)
+    assert load.calls == 4
+
+    cache.fetch(["START", "MI", "TotaltUtslappN"], None, load)
+    assert cache.invalidate(["MI", "TotaltUtslappN"]) == 1
+    cache.fetch(["MI", "TotaltUtslappN"], None, load)
+    assert cache.invalidate(["START", "MI", "TotaltUtslappN"]) == 1
+    assert load.calls == 6
+
+
+def test_cache_stale_while_revalidate(tmp_path):
+    """Test that stale entries are served and refreshed in the background."""
+    cache = ResponseCache(str(tmp_path), ttl=0.0, stale_while_revalidate=True)
+    cache.fetch(["MI"], None, Loader(b"old"))
+    assert cache.fetch(["MI"], None, Loader(b"new")) == b"old"
+    for _ in range(100):
+        if not cache.refreshing:
+            break
+        time.sleep(0.01)
+    assert cache.get(cache_key(["MI"]))[0] == b"new"
+
+
+def test_cache_offline(tmp_path):
+    """Test that offline mode serves stale entries and never loads."""
+    ResponseCache(str(tmp_path)).fetch(["MI"], None, Loader())
+    cache = ResponseCache(str(tmp_path), ttl=0.0, offline=True)
+    load = Loader()
+    assert cache.fetch(["MI"], None, load) == b"body"
+    with pytest.raises(CacheMiss):
+        cache.fetch(["BE"], None, load)
+    assert load.calls == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test size bounded eviction."""
+    cache = ResponseCache(str(tmp_path), max_bytes=8)
+    cache.fetch(["A"], None, Loader(b"aaaa"))
+    cache.fetch(["B"], None, Loader(b"bbbb"))
+    cache.fetch(["A"], None, Loader())
+    cache.fetch(["C"], None, Loader(b"cccc"))
+    assert cache.get(cache_key(["B"])) is None
+    assert cache.get(cache_key(["A"])) is not None
+    assert cache.get(cache_key(["C"])) is not None
+
+
+def test_fetchers_use_cache(fake_scb, tmp_path):
+    """Test that repeated fetches do no network requests."""
+    fake_scb.data["MI/MI1301/MI1301B/UtslappKommun"] = KOMMUN_DATA
+    fake_scb.data["START/MI/MI0107/TotaltUtslappN"] = TRANSPORT_DATA
+
+    def client() -> ScbClient:
+        return ScbClient(
+            fake_scb.url, TokenBucket(1000, 1.0), cache=ResponseCache(str(tmp_path))
+        )
+
+    catalog = MetadataCatalog(str(tmp_path / "metadata.sqlite"))
+    f_data = FetchData(client=client(), catalog=catalog)
+    first = f_data.dict_to_dataframe(f_data.get())
+    transport = FetchScbData(client()).data
+    n_requests = len(fake_scb.requests)
+    assert [r[0] for r in fake_scb.requests].count("GET") == 1
+
+    f_data = FetchData(client=client(), catalog=catalog)
+    assert f_data.dict_to_dataframe(f_data.get()).equals(first)
+    assert FetchScbData(client()).data.equals(transport)
+    assert len(fake_scb.requests) == n_requests
+    assert list(first["chg value"]) == [2.0, 1.0, 1.0, 1.5]
@@ -0,0 +1,64 @@
+"""Unit tests of compact search tree."""
+
+import pytest
+
+from ifk_analyses.compact_tree import CompactTree, write_compact_tree
+from ifk_analyses.search_scb import ScbSearch, convert_search_tree
+
+TABLES = [
+    (["AA", "AA0003", "AA0003B", "MotFlyktAldKon"], "Andel förvärvsarbetande"),
+    (["AA", "AA0003", "AA0003B", "MotFlyktUtbKon"], "Andel efter utbildning"),
+    (["MI", "MI1301", "UtslappKommun"], "Utsläpp till luft"),
+    (["MI", "TotaltUtslappN"], "Totala utsläpp"),
+]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    """Compact tree of a few tables."""
+    write_compact_tree(TABLES, str(tmp_path / "tree.bin"))
+    return CompactTree(str(tmp_path / "tree.bin"))
+
+
+def test_compact_tree_roundtrip(tree):
+    """Test that all tables are read back in order."""
+    assert tree.tables() == TABLES
+    assert len(tree) == 10
+
+
+def test_compact_tree_navigation(tree):
+    """Test path reconstruction, children and subtrees."""
+    mi = tree.find(["MI"])
+    assert tree.path(mi) == ["MI"]
+    assert not tree.is_table(mi)
+    assert [tree.name(c) for c in tree.children(mi)] == ["MI1301", "TotaltUtslappN"]
+    assert tree.tables(mi) == TABLES[2:]
+
+    table = tree.find(["AA", "AA0003", "AA0003B", "MotFlyktUtbKon"])
+    assert tree.is_table(table)
+    assert tree.title(table) == "Andel efter utbildning"
+    assert tree.path(table) == TABLES[1][0]
+    with pytest.raises(KeyError):
+        tree.find(["MI", "Saknas"])
+
+
+def test_compact_tree_invalid(tmp_path):
+    """Test that other files are rejected."""
+    (tmp_path / "tree.bin").write_bytes(b"not a tree")
+    with pytest.raises(ValueError):
+        CompactTree(str(tmp_path / "tree.bin"))
+
+
+def test_scb_search_loads_compact_tree(tmp_path):
+    """Test conversion from text and loading through ScbSearch."""
+    text_path = tmp_path / "search_tree.txt"
+    text_path.write_text("".join(f"{p}, {t}\n" for p, t in TABLES), encoding="utf-8")
+    assert convert_search_tree(str(text_path), str(tmp_path / "a.bin")).tables() == (
+        TABLES
+    )
+
+    search = ScbSearch()
+    search.search_tree_file_path = str(text_path)
+    search.compact_tree_file_path = str(tmp_path / "b.bin")
+    assert search.load_compact_tree().tables() == TABLES
+    assert search.search_substring("mi1301") == [TABLES[2]]
@@ -0,0 +1,63 @@
+"""Unit tests of year comparisons."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ifk_analyses.compare import YearComparison
+from ifk_analyses.objects.emissions_kommun import compare_years_and_sort_chg
+
+
+@pytest.fixture
+def data_df():
+    """Emissions with a region missing in 2021, in shuffled order."""
+    return pd.DataFrame(
+        {
+            "region": ["B", "A", "C", "A", "B", "C", "A", "B"],
+            "year": [2021, 2021, 2016, 2016, 2016, 2018, 2018, 2018],
+            "chg value": [4.0, 8.0, 5.0, 2.0, 1.0, 6.0, 4.0, 2.0],
+        }
+    )
+
+
+def test_matrix(data_df):
+    """Test pivot aligned by region."""
+    comparison = YearComparison(data_df)
+    assert list(comparison.years) == [2016, 2018, 2021]
+    row = comparison.regions.get_loc("C")
+    np.testing.assert_array_equal(comparison.matrix[row], [5.0, 6.0, np.nan])
+
+
+def test_compare_all_pairs(data_df):
+    """Test that all pairs are compared in one call."""
+    compared = YearComparison(data_df).compare()
+    assert len(compared) == 3 * 3
+    a = compared[(compared["region"] == "A") & (compared["lower year"] == 2016)]
+    assert list(a["upper year"]) == [2018, 2021]
+    assert list(a["delta"]) == [2.0, 6.0]
+    assert list(a["ratio"]) == [2.0, 4.0]
+    assert a["cagr"].iloc[1] == pytest.approx(4 ** (1 / 5) - 1)
+    # B is last in 2016 and 2018, and second of the two regions in 2021.
+    b = compared[(compared["region"] == "B") & (compared["upper year"] == 2021)]
+    assert list(b["rank change"]) == [1.0, 1.0]
+
+
+def test_compare_missing_year(data_df):
+    """Test that unknown years are rejected."""
+    with pytest.raises(KeyError):
+        YearComparison(data_df).compare([(2016, 2020)])
+
+
+def test_compare_years_and_sort_chg(data_df):
+    """Test that years are aligned by region and columns named by year."""
+    compiled = compare_years_and_sort_chg(data_df, 2016, 2021)
+    assert list(compiled.columns) == [
+        "region",
+        "year",
+        "chg 2021",
+        "chg 2016",
+        "diff 2016",
+    ]
+    assert list(compiled["region"]) == ["A", "B", "C"]
+    assert list(compiled["diff 2016"][:2]) == [4.0, 4.0]
+    assert np.isnan(compiled["chg 2021"].iloc[2])
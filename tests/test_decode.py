@@ -0,0 +1,46 @@
+"""Unit tests of response decoding."""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from ifk_analyses.decode import decode_response
+
+RESPONSE = {
+    "columns": [],
+    "data": [
+        {"key": ["00", "GHG", "2016"], "values": ["2.0", "1"]},
+        {"key": ["0114", "GHG", "2016"], "values": ["..", "2"]},
+        {"key": ["00", "GHG", "2021"], "values": ["-", "3"]},
+        {"key": ["0114", "GHG", "2021"], "values": ["1.5", "4"]},
+    ],
+}
+
+
+def test_decode_response():
+    """Test categorical keys, typed keys, labels and missing values."""
+    df = decode_response(
+        RESPONSE,
+        ["region", None, "year"],
+        ["value", None],
+        key_dtypes={"year": int},
+        key_labels={"region": {"00": "Riket", "0114": "Upplands Väsby"}},
+    )
+    assert list(df.columns) == ["region", "year", "value"]
+    assert isinstance(df["region"].dtype, pd.CategoricalDtype)
+    assert list(df["region"].cat.categories) == ["Riket", "Upplands Väsby"]
+    assert list(df["region"]) == ["Riket", "Upplands Väsby"] * 2
+    assert df["year"].dtype == np.int64
+    assert list(df["year"]) == [2016, 2016, 2021, 2021]
+    assert df["value"].dtype == np.float64
+    np.testing.assert_array_equal(df["value"], [2.0, np.nan, np.nan, 1.5])
+
+
+def test_decode_raw_bytes():
+    """Test decoding from raw response bytes, including empty responses."""
+    raw = b"\xef\xbb\xbf" + json.dumps(RESPONSE).encode("utf-8")
+    df = decode_response(raw, ["a", "b", "c"], ["x", "y"])
+    assert list(df["b"]) == ["GHG"] * 4
+    assert list(df["y"]) == [1.0, 2.0, 3.0, 4.0]
+    assert len(decode_response({"data": []}, ["a"], ["x"])) == 0
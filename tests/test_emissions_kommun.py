@@ -0,0 +1,107 @@
+"""Unit tests of kommun emissions."""
+
+import pytest
+
+from ifk_analyses.cache import ResponseCache
+from ifk_analyses.metadata_catalog import MetadataCatalog
+from ifk_analyses.objects.emissions_kommun import FetchData
+from ifk_analyses.scb_api import ScbClient, TokenBucket
+
+
+def test_get_substances(f_data, fake_scb):
+    """Test that all emission types are fetched in one request."""
+    n_requests = len(fake_scb.requests)
+    data_df = f_data.get_substances()
+    assert len(fake_scb.requests) == n_requests + 1
+    assert len(data_df) == 8
+    assert list(data_df["substance"].cat.categories) == f_data.substances
+    co2 = data_df[data_df["substance"] == "koldioxid, kiloton"]
+    assert list(co2["chg value"]) == [2021.0, 2026.0, 2023.0, 2028.0]
+
+
+def test_get_substances_subset(f_data):
+    """Test fetching a subset of emission types."""
+    data_df = f_data.get_substances(["koldioxid, kiloton"], max_workers=1)
+    assert set(data_df["substance"]) == {"koldioxid, kiloton"}
+    assert list(data_df["region"].cat.categories) == ["Riket", "Upplands Väsby"]
+    assert list(data_df["region code"].cat.categories) == f_data.region_id
+    assert list(data_df["region code"].cat.codes) == list(data_df["region"].cat.codes)
+
+
+def test_chunks_validated(f_data, fake_scb):
+    """Test that misspelled values fail before any request."""
+    fake_scb.requests.clear()
+    with pytest.raises(KeyError, match="koldioxid, kilo"):
+        f_data.get_substances(["koldioxid, kilo"])
+    with pytest.raises(ValueError, match="2099"):
+        f_data.chunks(years=["2016", "2099"])
+    f_data = FetchData("växthusgaser", f_data.scb.client, f_data.catalog)
+    with pytest.raises(KeyError, match="växthusgaser"):
+        f_data.get()
+    assert fake_scb.requests == []
+
+
+def test_init_from_catalog(f_data, fake_scb):
+    """Test that the table variables are read from the catalog."""
+    n_requests = len(fake_scb.requests)
+    f_data = FetchData(client=f_data.scb.client, catalog=f_data.catalog)
+    assert len(fake_scb.requests) == n_requests
+    assert f_data.regioner == ["Riket", "Upplands Väsby"]
+    assert f_data.years == ["2016", "2021"]
+
+
+def test_refresh_metadata(f_data, fake_scb):
+    """Test that stale table variables are refreshed when the table changed."""
+    f_data.refresh_metadata()
+    path = "MI/MI1301/MI1301B/UtslappKommun"
+    fake_scb.requests.clear()
+    f_data = FetchData(client=f_data.scb.client, catalog=f_data.catalog)
+    f_data = FetchData(
+        client=f_data.scb.client, catalog=f_data.catalog, metadata_max_age=0
+    )
+    assert [r[1] for r in fake_scb.requests] == ["MI/MI1301/MI1301B"]
+
+    tid = fake_scb.tree[path]["variables"][-1]
+    tid["values"] = tid["valueTexts"] = ["2016", "2021", "2022"]
+    fake_scb.tree["MI/MI1301/MI1301B"][0]["updated"] = "2024-06-01T08:00:00"
+    f_data = FetchData(client=f_data.scb.client, catalog=f_data.catalog)
+    assert f_data.years == ["2016", "2021"]
+    f_data = FetchData(
+        client=f_data.scb.client, catalog=f_data.catalog, metadata_max_age=0
+    )
+    assert f_data.years == ["2016", "2021", "2022"]
+    assert f_data.catalog.updated(f_data.query) == "2024-06-01T08:00:00"
+
+
+def test_refresh_metadata_records_timestamp(f_data, fake_scb, tmp_path):
+    """Test that the first refresh records the timestamp and keeps the cache."""
+    client = ScbClient(
+        fake_scb.url, TokenBucket(1000, 1.0), cache=ResponseCache(str(tmp_path))
+    )
+    f_data = FetchData(client=client, catalog=f_data.catalog)
+    f_data.get()
+    assert f_data.catalog.updated(f_data.query) is None
+    assert not f_data.refresh_metadata()
+    assert f_data.catalog.updated(f_data.query) == "2023-06-01T08:00:00"
+    fake_scb.requests.clear()
+    f_data.get()
+    assert fake_scb.requests == []
+
+
+def test_refresh_metadata_offline(f_data, fake_scb, tmp_path):
+    """Test that a stale catalog entry is kept offline."""
+    online = ScbClient(
+        fake_scb.url, TokenBucket(1000, 1.0), cache=ResponseCache(str(tmp_path))
+    )
+    catalog = MetadataCatalog(str(tmp_path / "offline.sqlite"))
+    expected = FetchData(client=online, catalog=catalog).get()
+    offline = ScbClient(
+        fake_scb.url,
+        TokenBucket(1000, 1.0),
+        cache=ResponseCache(str(tmp_path), offline=True),
+    )
+    fake_scb.requests.clear()
+    f_data = FetchData(client=offline, catalog=catalog, metadata_max_age=0)
+    assert f_data.get() == expected
+    assert fake_scb.requests == []
+    assert f_data.catalog.updated(f_data.query) is None
@@ -0,0 +1,63 @@
+"""Unit tests of the fleet simulation."""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ifk_analyses.objects.fleet import scrappage_rates, simulate_fleet, stock_from_frame
+from ifk_analyses.objects.personal_vehicle_lca import Vehicle, vehicle_table
+
+CAR = Vehicle("Bensinbil", 1500, 0, 0.05, 8, 77, 3, 300000)
+EV = Vehicle("Elbil", 2200, 125, 0.25, 8, 77, 0.45, 300000)
+
+
+def test_scrappage_rates():
+    """Test that the rates give the expected mean life."""
+    rates = scrappage_rates(60, mean_life=18)
+    survival = np.cumprod(np.append(1, 1 - rates[:-1]))
+    assert survival.sum() == pytest.approx(18.5, abs=0.1)
+    assert rates[0] < rates[18] < rates[40]
+
+
+def test_stock_from_frame():
+    """Test pivot with ages above the maximum and unknown types."""
+    data_df = pd.DataFrame(
+        {
+            "fuel": ["bensin", "el", "bensin", "diesel"],
+            "age": [0, 1, 30, 2],
+            "value": [10, 20, 5, 7],
+        }
+    )
+    stock = stock_from_frame(data_df, ["bensin", "el"], max_age=20)
+    assert stock.shape == (2, 21)
+    assert stock[0, 0] == 10 and stock[0, 20] == 5 and stock[1, 1] == 20
+    assert stock.sum() == 35
+
+
+def test_simulate_fleet():
+    """Test conservation of vehicles, replacement and emissions."""
+    vehicles = vehicle_table([CAR, EV])
+    stock = np.zeros((2, 31))
+    stock[0, :20] = 250_000
+    sales_share = np.tile([0.0, 1.0], (30, 1))
+    rates = scrappage_rates(30, mean_life=18)
+
+    start = time.perf_counter()
+    result = simulate_fleet(vehicles, stock, sales_share, 12_000, rates)
+    assert time.perf_counter() - start < 1
+
+    totals = result["stock"].sum(axis=(1, 2))
+    np.testing.assert_allclose(totals, 5e6)
+    assert result["stock"][-1, 1].sum() > result["stock"][-1, 0].sum()
+    assert result["new"][:, 0].sum() == 0
+    np.testing.assert_allclose(
+        result["driving"][0], [5e6 * 12_000 * 0.15, 0], rtol=1e-12
+    )
+    np.testing.assert_allclose(
+        result["manufacturing"][:, 1], result["new"][:, 1] * (2200 * 8 + 125 * 77)
+    )
+
+    grown = simulate_fleet(vehicles, stock, sales_share, 12_000, rates, growth=0.01)
+    assert grown["stock"][-1].sum() == pytest.approx(5e6 * 1.01**29)
@@ -0,0 +1,52 @@
+"""Tests of import time."""
+
+import json
+import subprocess  # noqa: S404
+import sys
+
+import pytest
+
+from ifk_analyses._lazy import is_loaded, lazy_import
+
+IMPORT_TIME_BUDGET = 1.0
+HEAVY_MODULES = ("matplotlib", "pandas", "pyscbwrapper")
+
+IMPORT_SCRIPT = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import ifk_analyses.main
+import ifk_analyses.objects.emissions_kommun
+import ifk_analyses.objects.passenger_transport
+elapsed = time.perf_counter() - start
+
+from ifk_analyses._lazy import is_loaded
+
+print(json.dumps({"elapsed": elapsed, "loaded": [
+    name for name in sys.argv[1:] if is_loaded(name)
+]}))
+"""
+
+
+def test_import_time():
+    """Test that importing the package defers heavy modules."""
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", IMPORT_SCRIPT, *HEAVY_MODULES],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    result = json.loads(output)
+    assert result["loaded"] == []
+    assert result["elapsed"] < IMPORT_TIME_BUDGET
+
+
+def test_lazy_import():
+    """Test that a lazy module is the same as an imported one."""
+    module = lazy_import("json")
+    assert module is json
+    assert is_loaded("json")
+    with pytest.raises(ModuleNotFoundError):
+        lazy_import("ifk_analyses.no_such_module")
@@ -0,0 +1,120 @@
+"""Unit tests of instrumentation."""
+
+import json
+import logging
+import os
+import time
+
+from ifk_analyses import instrumentation
+from ifk_analyses.cache import ResponseCache
+from ifk_analyses.decode import decode_response
+from ifk_analyses.pipeline import Pipeline, Stage
+from ifk_analyses.scb_api import ScbClient, TokenBucket
+
+
+def test_client_events(fake_scb, tmp_path):
+    """Test request, retry, byte and cache events."""
+    fake_scb.failures["MI"] = [503]
+    client = ScbClient(
+        fake_scb.url,
+        TokenBucket(1000, 1.0),
+        backoff=0.01,
+        cache=ResponseCache(str(tmp_path)),
+    )
+    with instrumentation.collect() as registry:
+        client.get(["MI"])
+        client.get(["MI"])
+
+    summary = registry.summary()
+    assert summary["spans"]["scb.request"]["count"] == 2
+    assert summary["spans"]["scb.backoff"]["count"] == 1
+    assert summary["counters"]["scb.retries"] == 1
+    assert summary["counters"]["scb.bytes"] > 0
+    assert summary["counters"]["cache.miss"] == 1
+    assert summary["counters"]["cache.hit"] == 1
+    statuses = [e["status"] for e in registry.events if e["name"] == "scb.request"]
+    assert statuses == [503, 200]
+
+
+def test_decode_events():
+    """Test decoded row counter."""
+    response = {"data": [{"key": ["00", "2021"], "values": ["1.5"]}] * 3}
+    with instrumentation.collect() as registry:
+        decode_response(response, ["region", "year"], ["value"])
+    assert registry.counters == {"decode.rows": 3}
+    assert registry.events[0]["rows"] == 3
+
+
+def test_no_sinks():
+    """Test that events without sinks are dropped."""
+    with instrumentation.span("unused") as attrs:
+        attrs["status"] = 200
+    instrumentation.count("unused")
+    with instrumentation.collect() as registry:
+        pass
+    assert registry.events == []
+
+
+def test_json_log_sink(caplog):
+    """Test json log sink."""
+    sink = instrumentation.add_sink(instrumentation.JsonLogSink())
+    try:
+        with caplog.at_level(logging.INFO, instrumentation.METRICS_LOGGER):
+            instrumentation.count("rows", 5, table="t")
+    finally:
+        instrumentation.remove_sink(sink)
+    event = json.loads(caplog.records[0].getMessage())
+    assert (event["type"], event["name"], event["value"]) == ("count", "rows", 5)
+    assert event["table"] == "t"
+
+
+def test_pipeline_profile(tmp_path):
+    """Test stage spans, cProfile stats and peak memory of a pipeline run."""
+
+    def allocate() -> int:
+        return len(bytearray(10**6))
+
+    pipeline = Pipeline(
+        [Stage("allocate", allocate)],
+        str(tmp_path / "cache"),
+        profile_dir=str(tmp_path / "profile"),
+        trace_memory=True,
+    )
+    with instrumentation.collect() as registry:
+        assert pipeline.run() == {"allocate": 10**6}
+    assert os.path.exists(tmp_path / "profile" / "allocate.prof")
+    assert registry.spans["pipeline.stage"]
+    assert registry.gauges["memory.peak"] >= 10**6
+
+
+def test_pipeline_profile_runs_stages_serially(tmp_path):
+    """Test that profiled stages do not overlap, as one profiler is allowed."""
+    active = []
+    overlaps = []
+
+    def stage() -> None:
+        active.append(1)
+        overlaps.append(len(active))
+        time.sleep(0.05)
+        active.pop()
+
+    pipeline = Pipeline(
+        [Stage("a", stage), Stage("b", stage)],
+        str(tmp_path / "cache"),
+        max_workers=2,
+        profile_dir=str(tmp_path / "profile"),
+    )
+    pipeline.run()
+    assert overlaps == [1, 1]
+    assert sorted(os.listdir(tmp_path / "profile")) == ["a.prof", "b.prof"]
+
+
+def test_pipeline_profile_prefixed_stages(tmp_path):
+    """Test profiling stages with names prefixed by their pipeline."""
+    pipeline = Pipeline(
+        [Stage("emissions-kommun/fetch", time.time, cache=False)],
+        str(tmp_path / "cache"),
+        profile_dir=str(tmp_path / "profile"),
+    )
+    pipeline.run()
+    assert os.listdir(tmp_path / "profile") == ["emissions-kommun__fetch.prof"]
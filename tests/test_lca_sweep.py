@@ -0,0 +1,83 @@
+"""Unit tests of vehicle LCA sweeps."""
+
+from functools import partial
+
+import numpy as np
+import pytest
+
+from ifk_analyses.objects.lca_sweep import (
+    grid,
+    latin_hypercube,
+    sobol_indices,
+    sweep,
+    switch_model,
+    tornado,
+)
+from ifk_analyses.objects.personal_vehicle_lca import (
+    Scenarios,
+    Vehicle,
+    co2_scenarios,
+    vehicle_table,
+)
+
+CAR = Vehicle("Bensinbil", 1500, 0, 0.05, 8, 77, 3, 300000)
+EV = Vehicle("Elbil", 2200, 125, 0.25, 8, 77, 0.45, 300000)
+BIKE = Vehicle("Cykel", 10, 0, 0, 8, 77, 0.45, 300000)
+
+
+def linear(samples: dict) -> dict:
+    """Additive model with known Sobol indices."""
+    return {"y": 2 * samples["a"] + samples["b"]}
+
+
+def test_samplers():
+    """Test grid size and latin hypercube strata."""
+    samples = grid(a=[1, 2, 3], b=[10, 20])
+    assert len(samples["a"]) == 6
+    assert set(zip(samples["a"], samples["b"])) == {
+        (a, b) for a in [1, 2, 3] for b in [10, 20]
+    }
+
+    samples = latin_hypercube({"a": (0, 10)}, 5, seed=0)
+    assert sorted(np.floor(samples["a"] / 2)) == [0, 1, 2, 3, 4]
+
+
+def test_switch_model():
+    """Test against the scenario engine and the break-even point."""
+    samples = {"kilometers_at_change": np.array([0.0, 100000.0])}
+    result = switch_model(samples, CAR, EV)
+    scenarios = Scenarios.from_segments([[(0, 0)], [(0, 0), (1, 100000)]])
+    co2 = co2_scenarios(vehicle_table([CAR, EV]), scenarios, np.array([300000.0]))
+    assert result["stay"][1] == pytest.approx(co2[0, 0])
+    assert result["switch"][1] == pytest.approx(co2[1, 0])
+
+    at_break_even = dict(samples, vehicle_life=result["break_even"])
+    equal = switch_model(at_break_even, CAR, EV)
+    np.testing.assert_allclose(equal["saving"], 0, atol=1e-6)
+
+    with pytest.raises(ValueError, match="bike"):
+        switch_model({"fraction_bike_rides": np.array([0.1])}, CAR, EV)
+
+
+def test_sweep_chunks_and_processes():
+    """Test that chunked and parallel sweeps equal a single evaluation."""
+    model = partial(switch_model, car=CAR, electric_car=EV, bike=BIKE)
+    samples = grid(
+        kgCO2_per_kWh=np.linspace(0, 1, 20), fraction_bike_rides=np.linspace(0, 1, 5)
+    )
+    expected = model(samples)
+    for processes in (1, 2):
+        result = sweep(model, samples, chunk_size=30, processes=processes)
+        np.testing.assert_allclose(result["saving"], expected["saving"])
+
+
+def test_sensitivity():
+    """Test tornado ordering and Sobol indices of an additive model."""
+    bounds = {"a": (0, 1), "b": (0, 1)}
+    table = tornado(linear, "y", {"a": 0.5, "b": 0.5}, bounds)
+    assert list(table["parameter"]) == ["a", "b"]
+    assert list(table["swing"]) == [2.0, 1.0]
+
+    indices = sobol_indices(linear, "y", bounds, n=20000, seed=0)
+    np.testing.assert_allclose(indices["S1"], [0.8, 0.2], atol=0.03)
+    np.testing.assert_allclose(indices["ST"], [0.8, 0.2], atol=0.03)
@@ -0,0 +1,72 @@
+"""Unit tests of the metadata catalog."""
+
+import sqlite3
+
+import pytest
+
+from ifk_analyses.metadata_catalog import MetadataCatalog
+
+PATH = ["MI", "MI1301", "MI1301B", "UtslappKommun"]
+
+
+@pytest.fixture
+def catalog(tmp_path, fake_scb):
+    """Catalog with the emissions table of the fake scb api."""
+    catalog = MetadataCatalog(str(tmp_path / "metadata.sqlite"))
+    catalog.put(PATH, fake_scb.tree["/".join(PATH)], "2023-06-01T08:00:00")
+    return catalog
+
+
+def test_round_trip(catalog, fake_scb):
+    """Test that stored metadata is returned in the scb format."""
+    assert PATH in catalog
+    assert ["START"] + PATH in catalog
+    assert ["MI"] not in catalog
+    assert catalog.info(PATH) == fake_scb.tree["/".join(PATH)]
+    assert catalog.updated(PATH) == "2023-06-01T08:00:00"
+    with pytest.raises(KeyError):
+        catalog.variables(["MI"])
+
+
+def test_checked(tmp_path, catalog):
+    """Test check times, also of catalogs written before they were recorded."""
+    checked = catalog.checked(PATH)
+    assert checked is not None
+    catalog.touch(PATH)
+    assert catalog.checked(PATH) >= checked
+    assert catalog.checked(["MI"]) is None
+
+    db = sqlite3.connect(str(tmp_path / "old.sqlite"))
+    db.execute("CREATE TABLE tables (path TEXT PRIMARY KEY, title TEXT, updated TEXT)")
+    db.execute("INSERT INTO tables VALUES ('MI', '', NULL)")
+    db.commit()
+    db.close()
+    assert MetadataCatalog(str(tmp_path / "old.sqlite")).checked(["MI"]) is None
+
+
+def test_lookups(catalog):
+    """Test resolving variables and values by name."""
+    assert catalog.variable(PATH, "År")["code"] == "Tid"
+    assert catalog.labels(PATH, "region") == {"00": "Riket", "0114": "Upplands Väsby"}
+    assert catalog.codes(PATH, "Amne", ["koldioxid, kiloton"]) == ["CO2"]
+    with pytest.raises(KeyError):
+        catalog.codes(PATH, "Amne", ["metan"])
+    with pytest.raises(KeyError):
+        catalog.variable(PATH, "kön")
+
+
+def test_validate(catalog):
+    """Test query validation."""
+    query = {
+        "query": [
+            {"code": "Region", "selection": {"filter": "item", "values": ["00"]}},
+            {"code": "Tid", "selection": {"filter": "top", "values": ["1"]}},
+        ]
+    }
+    catalog.validate(PATH, query)
+    query["query"][0]["selection"]["values"] = ["00", "9999"]
+    with pytest.raises(ValueError, match="9999"):
+        catalog.validate(PATH, query)
+    query["query"][0]["code"] = "Kon"
+    with pytest.raises(ValueError, match="Kon"):
+        catalog.validate(PATH, query)
@@ -0,0 +1,88 @@
+"""Tests of the passenger transport analysis."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ifk_analyses.objects.passenger_transport import Analysis, RequestInput
+from ifk_analyses.objects.passenger_transport_plots import plot_co2_transports
+
+
+def emissions() -> pd.DataFrame:
+    """Shuffled emissions where 5.0 is missing for 1991."""
+    rows = [
+        (year, sector, value * (year - 1989))
+        for year in (1990.0, 1991.0, 1992.0)
+        for sector, value in (
+            ("0.2", 100.0),
+            ("0.4", 90.0),
+            ("8.0", 20.0),
+            ("5.0", 10.0),
+        )
+        if (year, sector) != (1991.0, "5.0")
+    ]
+    data_df = pd.DataFrame(rows, columns=["year", "emission type", "value"])
+    data_df["emission measure"] = "CO2-ekv."
+    return data_df.sample(frac=1, random_state=0)
+
+
+def test_shares():
+    """Test that shares are aligned by year."""
+    analysis = Analysis(emissions())
+    assert list(analysis.matrix.index) == [1990.0, 1991.0, 1992.0]
+    shares = analysis.shares(["8.0", "5.0"])
+    np.testing.assert_allclose(shares["8.0"], 0.2)
+    np.testing.assert_allclose(shares["5.0"], [0.1, np.nan, 0.1])
+
+
+def test_several_measures():
+    """Test that emission measures are not summed."""
+    data_df = emissions()
+    data_df.iloc[0, data_df.columns.get_loc("emission measure")] = "CO2"
+    with pytest.raises(ValueError, match="emission measures"):
+        Analysis(data_df)
+
+
+def test_save_figures(tmp_path):
+    """Test rendering figures to files."""
+    pytest.importorskip("matplotlib")
+    analysis = Analysis(emissions())
+    figures = analysis.figures()
+    figures.update(analysis.sector_figures({"transports": ["8.0", "5.0"]}, "0.2"))
+    paths = analysis.save_figures(str(tmp_path), figures)
+    assert [os.path.basename(path) for path in paths] == [
+        "co2_transports.png",
+        "co2_national_international.png",
+        "transports.png",
+    ]
+    assert all(os.path.getsize(path) > 0 for path in paths)
+
+
+class RecordingAxes:
+    """Axes recording the calls of the plot functions."""
+
+    def __init__(self) -> None:
+        """Initialization."""
+        self.calls: list = []
+
+    def __getattr__(self, name: str):
+        """Record call of axes method."""
+        return lambda *args, **kwargs: self.calls.append((name, kwargs))
+
+
+def test_plot_legend_once():
+    """Test that the legend is built once, with the given options."""
+    ax = RecordingAxes()
+    plot_co2_transports(Analysis(emissions()).matrix, ax)
+    legends = [kwargs for name, kwargs in ax.calls if name == "legend"]
+    assert legends == [{"loc": "upper center", "bbox_to_anchor": (0.5, -0.05)}]
+
+
+def test_request_input_query():
+    """Test that the default query is readable from the class and copied."""
+    request_input = RequestInput()
+    assert request_input.query == RequestInput.query
+    request_input.query["query"].pop()
+    assert len(RequestInput().query["query"]) == 2
@@ -0,0 +1,39 @@
+"""Unit tests of the vehicle LCA."""
+
+import numpy as np
+
+from ifk_analyses.objects.personal_vehicle_lca import (
+    Scenarios,
+    Vehicle,
+    co2_scenarios,
+    co2analysis,
+    vehicle_table,
+)
+
+CAR = Vehicle("Bensinbil", 1500, 0, 0.05, 8, 77, 3, 300000)
+EV = Vehicle("Elbil", 2200, 125, 0.25, 8, 77, 0.45, 300000)
+
+
+def test_co2_scenarios_matches_chained_co2analysis():
+    """Test that segments are chained like repeated co2analysis calls."""
+    distance = np.linspace(0, 300000, 61)
+    scenarios = Scenarios.from_segments([[(0, 0)], [(0, 0), (1, 100000)]])
+    co2 = co2_scenarios(vehicle_table([CAR, EV]), scenarios, distance, co2debt=1)
+    assert co2.shape == (2, 61)
+    np.testing.assert_allclose(co2[0], co2analysis(CAR, distance, 1)[1])
+
+    before = distance < 100000
+    _, first = co2analysis(CAR, distance[before], 1)
+    _, second = co2analysis(
+        EV, distance[~before], co2analysis(CAR, np.array([0, 100000]), 1)[1][-1]
+    )
+    np.testing.assert_allclose(co2[1], np.concatenate([first, second]))
+
+
+def test_co2_scenarios_out():
+    """Test writing into a preallocated array."""
+    out = np.full((1, 3), np.nan)
+    scenarios = Scenarios.from_segments([[(1, 0)]])
+    result = co2_scenarios(vehicle_table([CAR, EV]), scenarios, np.zeros(3), out=out)
+    assert result is out
+    np.testing.assert_allclose(out, 2200 * 8 + 125 * 77)
@@ -0,0 +1,107 @@
+"""Unit tests of the pipeline runner."""
+
+import threading
+
+import pytest
+
+from ifk_analyses.pipeline import Pipeline, Stage
+from ifk_analyses.pipelines import (
+    all_pipelines,
+    emissions_kommun,
+    passenger_transport,
+)
+
+SOURCE = {"a": 1, "b": 2}
+
+
+def fetch(key: str) -> int:
+    """Read external source."""
+    return SOURCE[key]
+
+
+def scale(value: int, factor: int) -> int:
+    """Scale value."""
+    return value * factor
+
+
+def wait_for_other(value: int, barrier: threading.Barrier) -> int:
+    """Block until the other branch runs concurrently."""
+    barrier.wait(timeout=5)
+    return value
+
+
+def add(x: int, y: int) -> int:
+    """Combine branches."""
+    return x + y
+
+
+def stages() -> list:
+    """Two independent branches joined by a sum."""
+    return [
+        Stage("fetch a", fetch, params={"key": "a"}, cache=False),
+        Stage("fetch b", fetch, params={"key": "b"}, cache=False),
+        Stage("scale a", scale, ("fetch a",), {"factor": 10}),
+        Stage("scale b", scale, ("fetch b",), {"factor": 10}),
+        Stage("sum", add, ("scale a", "scale b")),
+    ]
+
+
+def test_run_cached(tmp_path):
+    """Test skipping stages with unchanged inputs."""
+    pipeline = Pipeline(stages(), str(tmp_path))
+    assert pipeline.targets() == ["sum"]
+    assert pipeline.run() == {"sum": 30}
+    assert sorted(pipeline.computed) == sorted(pipeline.order)
+
+    assert pipeline.run() == {"sum": 30}
+    assert sorted(pipeline.computed) == ["fetch a", "fetch b"]
+
+    SOURCE["b"] = 3
+    try:
+        assert pipeline.run() == {"sum": 40}
+        assert sorted(pipeline.computed) == ["fetch a", "fetch b", "scale b", "sum"]
+        assert pipeline.run(["scale a"]) == {"scale a": 10}
+        assert pipeline.run(force=True) == {"sum": 40}
+        assert len(pipeline.computed) == 5
+    finally:
+        SOURCE["b"] = 2
+
+
+def test_run_parallel(tmp_path):
+    """Test that independent stages run concurrently."""
+    barrier = threading.Barrier(2)
+    pipeline = Pipeline(
+        [
+            Stage("a", wait_for_other, params={"value": 1, "barrier": barrier}),
+            Stage("b", wait_for_other, params={"value": 2, "barrier": barrier}),
+        ],
+        str(tmp_path),
+        max_workers=2,
+    )
+    assert pipeline.run() == {"a": 1, "b": 2}
+
+
+def test_invalid_graph(tmp_path):
+    """Test that unknown inputs and cycles are rejected."""
+    with pytest.raises(ValueError):
+        Pipeline([Stage("x", add, ("y",))], str(tmp_path))
+    with pytest.raises(ValueError):
+        Pipeline([Stage("x", add, ("y",)), Stage("y", add, ("x",))], str(tmp_path))
+
+
+def test_all_pipelines_share_client(tmp_path, monkeypatch):
+    """Test that the fetch stages share one client and rate limiter."""
+    monkeypatch.chdir(tmp_path)
+    clients = [
+        stage.params["client"]
+        for stage in all_pipelines()
+        if stage.name.endswith("/fetch")
+    ]
+    assert len(clients) == 2
+    assert clients[0] is clients[1]
+    assert clients[0] is not None
+    assert [
+        stage.params["client"]
+        for stage in emissions_kommun() + passenger_transport()
+        if stage.name == "fetch"
+    ] == [None, None]
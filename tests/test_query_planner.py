@@ -0,0 +1,75 @@
+"""Unit tests of query planning."""
+
+import itertools
+
+from ifk_analyses.query_planner import (
+    build_query,
+    estimate_cells,
+    fetch_chunks,
+    plan_chunks,
+    resolve_selection,
+)
+from ifk_analyses.scb_api import ScbClient, TokenBucket
+
+SELECTION = {
+    "Region": [f"{i:04d}" for i in range(290)],
+    "Amne": ["GHG", "CO2"],
+    "Tid": [str(y) for y in range(1990, 2022)],
+}
+
+
+def cells(chunks: list) -> list:
+    """All cells of chunks, in order."""
+    return [cell for chunk in chunks for cell in itertools.product(*chunk.values())]
+
+
+def test_plan_chunks_single():
+    """Test that small queries are not split."""
+    assert plan_chunks(SELECTION) == [SELECTION]
+    assert estimate_cells(SELECTION) == 290 * 2 * 32
+
+
+def test_plan_chunks_cheapest_dimension():
+    """Test split along the dimension giving the fewest chunks."""
+    chunks = plan_chunks(SELECTION, max_cells=6000)
+    assert len(chunks) == 4
+    assert all(chunk["Amne"] == SELECTION["Amne"] for chunk in chunks)
+    assert all(estimate_cells(chunk) <= 6000 for chunk in chunks)
+    assert sorted(cells(chunks)) == sorted(itertools.product(*SELECTION.values()))
+
+
+def test_plan_chunks_recursive():
+    """Test split when no single dimension is enough."""
+    chunks = plan_chunks(SELECTION, max_cells=100)
+    assert all(estimate_cells(chunk) <= 100 for chunk in chunks)
+    assert sorted(cells(chunks)) == sorted(itertools.product(*SELECTION.values()))
+
+
+def test_fetch_chunks(fake_scb):
+    """Test that chunks are fetched and merged in order."""
+    path = "MI/MI1301/MI1301B/UtslappKommun"
+
+    def respond(query: dict) -> dict:
+        values = [q["selection"]["values"] for q in query["query"]]
+        data = [
+            {"key": list(key), "values": ["1.0"]} for key in itertools.product(*values)
+        ]
+        return {"columns": ["c"], "data": data}
+
+    fake_scb.data[path] = respond
+    client = ScbClient(fake_scb.url, TokenBucket(1000, 1.0))
+    variables = fake_scb.tree[path]["variables"]
+    selection = resolve_selection(
+        variables, region=["Riket", "Upplands Väsby"], ämne=["koldioxid, kiloton"]
+    )
+    assert selection == {"Region": ["00", "0114"], "Amne": ["CO2"]}
+    assert build_query(selection)["query"][1] == {
+        "code": "Amne",
+        "selection": {"filter": "item", "values": ["CO2"]},
+    }
+
+    chunks = plan_chunks(SELECTION, max_cells=6000)
+    merged = fetch_chunks(client, path.split("/"), chunks)
+    assert merged["columns"] == ["c"]
+    assert [tuple(row["key"]) for row in merged["data"]] == cells(chunks)
+    assert len(fake_scb.requests) == len(chunks)
@@ -0,0 +1,125 @@
+"""Unit tests of regional aggregation."""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from ifk_analyses.regions import (
+    KOMMUN,
+    LAN,
+    RIKET,
+    RegionAggregation,
+    RegionHierarchy,
+    fetch_population,
+    region_level,
+)
+from ifk_analyses.scb_api import ScbClient, TokenBucket
+
+CODES = ["00", "01", "0114", "0115", "03", "0305", "0180", "0330"]
+
+
+def emissions() -> pd.DataFrame:
+    """Kommun and län values of two years, with one missing value."""
+    rows = [
+        (code, year, float(int(code) + year - 2000))
+        for code, year in itertools.product(CODES, [2016, 2021])
+        if (code, year) != ("0180", 2021)
+    ]
+    return pd.DataFrame(rows, columns=["region code", "year", "chg value"])
+
+
+def test_region_level():
+    """Test levels of region codes."""
+    assert [region_level(c) for c in ["00", "01", "0114", "01L", "123"]] == [
+        RIKET,
+        LAN,
+        KOMMUN,
+        -1,
+        -1,
+    ]
+
+
+def test_hierarchy():
+    """Test kommuner sorted by län and drill down."""
+    hierarchy = RegionHierarchy(CODES)
+    assert list(hierarchy.lan_codes) == ["01", "03"]
+    assert list(hierarchy.codes[hierarchy.drill_down("01")]) == [
+        "0114",
+        "0115",
+        "0180",
+    ]
+    assert list(hierarchy.codes[hierarchy.drill_down("03")]) == ["0305", "0330"]
+    assert len(hierarchy.drill_down("25")) == 0
+
+
+def test_rollup():
+    """Test län and riket totals, ignoring missing values."""
+    hierarchy = RegionHierarchy(CODES)
+    values = np.array([0, 0, 1, 2, 0, 3, np.nan, 4], dtype=float)
+    assert list(hierarchy.lan_totals(values)) == [3.0, 7.0]
+    assert hierarchy.riket_total(values) == 10.0
+    values[[2, 3]] = np.nan
+    assert np.isnan(hierarchy.lan_totals(values)[0])
+
+    of_lan, of_riket = hierarchy.kommun_shares(np.array([0, 0, 1, 3, 0, 1, 0, 3.0]))
+    assert list(of_lan) == [0.25, 0.75, 0.0, 0.25, 0.75]
+    assert list(of_riket) == [0.125, 0.375, 0.0, 0.125, 0.375]
+
+
+def test_rollup_without_kommuner():
+    """Test that totals without kommuner are missing."""
+    hierarchy = RegionHierarchy(["00", "01"])
+    values = np.ones((2, 3))
+    assert hierarchy.lan_totals(values).shape == (0, 3)
+    assert np.isnan(hierarchy.riket_total(values)).all()
+    assert np.isnan(hierarchy.riket_total(values[:, 0]))
+    of_lan, of_riket = hierarchy.kommun_shares(values)
+    assert of_lan.shape == of_riket.shape == (0, 3)
+
+
+def test_aggregation():
+    """Test totals, shares and per capita values of a long table."""
+    aggregation = RegionAggregation(emissions())
+    totals = aggregation.totals().set_index(["region code", "year"])["value"]
+    assert totals[("01", 2016)] == 114 + 115 + 180 + 3 * 16
+    assert totals[("01", 2021)] == 114 + 115 + 2 * 21
+    assert totals[("00", 2021)] == totals[("01", 2021)] + totals[("03", 2021)]
+
+    shares = aggregation.shares()
+    assert set(shares["level"]) == {"kommun"}
+    sums = shares.groupby("year")["share of riket"].sum()
+    np.testing.assert_allclose(sums, 1.0)
+
+    population = pd.DataFrame(
+        {
+            "region code": ["0114", "0115", "0305", "0330"],
+            "year": [2021] * 4,
+            "population": [10.0, 10.0, 20.0, 20.0],
+        }
+    )
+    per_capita = aggregation.per_capita(population).set_index(["region code", "year"])
+    assert per_capita.loc[("0114", 2021), "per capita"] == (114 + 21) / 10
+    assert np.isnan(per_capita.loc[("0114", 2016), "per capita"])
+    assert per_capita.loc[("00", 2021), "population"] == 60.0
+    assert per_capita.loc[("03", 2021), "per capita"] == (305 + 330 + 2 * 21) / 40
+
+
+def test_fetch_population(fake_scb):
+    """Test population fetched with eliminated variables."""
+
+    def respond(query: dict) -> dict:
+        values = [q["selection"]["values"] for q in query["query"]]
+        assert [q["code"] for q in query["query"]] == ["Region", "ContentsCode", "Tid"]
+        data = [
+            {"key": [r, y], "values": [str(int(r) + int(y))]}
+            for r, _, y in itertools.product(*values)
+        ]
+        return {"columns": [], "data": data}
+
+    fake_scb.data["BE/BE0101/BE0101A/BefolkningNy"] = respond
+    client = ScbClient(fake_scb.url, TokenBucket(1000, 1.0))
+    population = fetch_population(client, ["0114", "0180"], ["2021"])
+    assert list(population.columns) == ["region code", "year", "population"]
+    assert list(population["population"]) == [2135.0, 2201.0]
+    assert list(population["year"]) == [2021, 2021]
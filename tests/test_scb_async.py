@@ -0,0 +1,117 @@
+"""Unit tests of the async scb client."""
+
+import asyncio
+import json
+
+import pytest
+import requests
+
+from ifk_analyses.cache import ResponseCache, cache_key
+from ifk_analyses.objects.passenger_transport import (
+    FetchScbData,
+    RequestInput,
+    fetch_many,
+)
+from ifk_analyses.scb_api import ScbClient, TokenBucket
+from ifk_analyses.scb_async import (
+    AsyncScbClient,
+    AsyncTokenBucket,
+    HttpxTransport,
+    RequestsTransport,
+)
+
+TRANSPORTS = [RequestsTransport]
+try:
+    import httpx  # noqa: F401
+
+    TRANSPORTS.append(HttpxTransport)
+except ImportError:
+    pass
+
+
+def respond(query: dict) -> dict:
+    """Echo the selected sectors as data."""
+    sectors = query["query"][1]["selection"]["values"]
+    return {
+        "columns": [],
+        "data": [{"key": ["CO2-ekv.", s, "2020"], "values": [s]} for s in sectors],
+    }
+
+
+def sector_input(sector: str) -> RequestInput:
+    """Passenger transport query for one sector."""
+    request_input = RequestInput()
+    request_input.query["query"][1]["selection"]["values"] = [sector]
+    return request_input
+
+
+@pytest.mark.parametrize("transport", TRANSPORTS)
+def test_post_many(fake_scb, transport):
+    """Test concurrent queries over pooled compressed connections."""
+    fake_scb.data["START/MI/MI0107/TotaltUtslappN"] = respond
+    sectors = ["0.2", "0.4", "8.0", "5.0"] * 5
+
+    async def run() -> list:
+        async with AsyncScbClient(
+            fake_scb.url,
+            transport(pool_size=4),
+            AsyncTokenBucket(1000, 1.0),
+            max_concurrency=4,
+        ) as client:
+            return await fetch_many([sector_input(s) for s in sectors], client)
+
+    frames = asyncio.run(run())
+    assert [float(f["value"].iloc[0]) for f in frames] == [float(s) for s in sectors]
+    assert fake_scb.compressed == len(sectors)
+    assert len(fake_scb.connections) <= 4
+
+
+def test_retry_cache_and_errors(fake_scb, tmp_path):
+    """Test retries on 503, caching and raising on 404."""
+    fake_scb.failures["MI"] = [503]
+
+    async def run() -> None:
+        client = AsyncScbClient(
+            fake_scb.url,
+            RequestsTransport(),
+            AsyncTokenBucket(1000, 1.0),
+            backoff=0.01,
+            cache=ResponseCache(str(tmp_path)),
+        )
+        assert len(await client.get(["MI"])) == 2
+        assert len(await client.get(["MI"])) == 2
+        with pytest.raises(requests.HTTPError):
+            await client.get(["missing"])
+        await client.aclose()
+
+    asyncio.run(run())
+    assert [path for _, path, _ in fake_scb.requests] == ["MI", "MI", "missing"]
+
+
+def test_fetch_scb_data_is_lazy(fake_scb):
+    """Test that construction does not send requests."""
+    fake_scb.data["START/MI/MI0107/TotaltUtslappN"] = respond
+    fetcher = FetchScbData(ScbClient(fake_scb.url, TokenBucket(1000, 1.0)))
+    assert fake_scb.requests == []
+    assert list(fetcher.data["emission type"]) == ["0.2", "0.4", "8.0", "5.0"]
+    assert fetcher.data is fetcher.data
+    assert len(fake_scb.requests) == 1
+
+
+def test_stale_while_revalidate(fake_scb, tmp_path):
+    """Test that stale entries are served and refreshed in the background."""
+    cache = ResponseCache(str(tmp_path), ttl=0.0, stale_while_revalidate=True)
+
+    async def run() -> None:
+        async with AsyncScbClient(
+            fake_scb.url, RequestsTransport(), AsyncTokenBucket(1000, 1.0), cache=cache
+        ) as client:
+            assert len(await client.get(["MI"])) == 2
+            fake_scb.tree["MI"] = fake_scb.tree["MI"][:1]
+            assert len(await client.get(["MI"])) == 2
+        assert cache.refreshing == set()
+
+    asyncio.run(run())
+    assert [path for _, path, _ in fake_scb.requests] == ["MI", "MI"]
+    content, _ = cache.get(cache_key(["MI"]))
+    assert len(json.loads(content)) == 1
@@ -0,0 +1,77 @@
+"""Unit tests of search index."""
+
+import pytest
+
+from ifk_analyses.search_index import SearchIndex, edit_distance, normalize, tokenize
+from ifk_analyses.search_scb import ScbSearch, read_search_tree
+
+DOCUMENTS = [
+    (["MI", "MI0107", "TotaltUtslappN"], "Totala utsläpp av växthusgaser efter sektor"),
+    (["MI", "MI1301", "UtslappKommun"], "Utsläpp till luft efter region och år"),
+    (["BE", "BE0101", "BefolkningNy"], "Folkmängden efter region och år"),
+    (
+        ["TK", "TK1001", "PersBilarDrivMedel"],
+        "Nyregistrerade personbilar efter drivmedel",
+    ),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    """Index over a few documents."""
+    SearchIndex.build(DOCUMENTS, str(tmp_path / "index"))
+    return SearchIndex(str(tmp_path / "index"))
+
+
+def test_normalization():
+    """Test swedish folding and stemming."""
+    assert normalize("Växthusgaser ÅÖ") == "vaxthusgaser ao"
+    assert tokenize("Utsläppen personbilar") == ["utslapp", "personbil"]
+    assert edit_distance("vaxthusgas", "vaxthusgsa", 2) == 2
+    assert edit_distance("abc", "xyzxyz", 1) == 2
+
+
+def test_search_ranked(index):
+    """Test that matches are ranked and all words must match."""
+    assert index.search("utsläpp") == [DOCUMENTS[1], DOCUMENTS[0]]
+    assert index.search("utslapp växthusgas") == [DOCUMENTS[0]]
+    assert index.search("utsläpp region") == [DOCUMENTS[1]]
+    assert index.search("kommun") == []
+
+
+def test_search_prefix_fuzzy_path(index):
+    """Test prefix, fuzzy and path matches."""
+    assert index.search("perso") == [DOCUMENTS[3]]
+    assert index.search("perso", fuzzy=False, prefix=False) == []
+    assert index.search("folkmangdn") == [DOCUMENTS[2]]
+    assert index.search("mi1301") == [DOCUMENTS[1]]
+    assert index.search("efter", limit=2) == index.search("efter")[:2]
+
+
+def test_read_search_tree(tmp_path):
+    """Test reading both line formats and multi line titles."""
+    path = tmp_path / "search_tree.txt"
+    path.write_text(
+        "updated 2024-01-01 00:00:00\n"
+        "['AA', 'AA0003'], Andel, procent\n"
+        "['JO', 'Kap8T03']; Index, juli 1914=100\n"
+        " efter produkt\n",
+        encoding="utf-8",
+    )
+    assert read_search_tree(str(path)) == [
+        (["AA", "AA0003"], "Andel, procent"),
+        (["JO", "Kap8T03"], "Index, juli 1914=100 efter produkt"),
+    ]
+
+
+def test_scb_search(tmp_path):
+    """Test that searches return matches."""
+    path = tmp_path / "search_tree.txt"
+    path.write_text("".join(f"{p}; {t}\n" for p, t in DOCUMENTS), encoding="utf-8")
+    search = ScbSearch()
+    search.search_tree_file_path = str(path)
+    search.compact_tree_file_path = str(tmp_path / "search_tree.bin")
+    search.search_index_path = str(tmp_path / "index")
+
+    assert search.search_substring("UTSLÄPP", "mi1301") == [DOCUMENTS[1]]
+    assert search.search("utsläpp till luft") == [DOCUMENTS[1]]
@@ -0,0 +1,163 @@
+"""Unit tests of scb search."""
+
+import os
+import time
+
+import pytest
+import requests
+
+from ifk_analyses.metadata_catalog import MetadataCatalog
+from ifk_analyses.scb_api import ScbClient, TokenBucket
+from ifk_analyses.search_scb import CrawlIncomplete, ScbSearch
+
+
+@pytest.fixture
+def client(fake_scb):
+    """Client against the fake scb api without waiting."""
+    return ScbClient(fake_scb.url, TokenBucket(1000, 1.0), backoff=0.01)
+
+
+@pytest.fixture
+def search(tmp_path):
+    """Search writing to a temporary directory."""
+    s = ScbSearch()
+    s.search_tree_file_path = str(tmp_path / "search_tree.txt")
+    s.compact_tree_file_path = str(tmp_path / "search_tree.bin")
+    s.checkpoint_file_path = str(tmp_path / "search_tree.checkpoint.jsonl")
+    s.metadata_catalog_path = str(tmp_path / "metadata.sqlite")
+    s.log_file_path = str(tmp_path / "log" / "update_search_tree.log")
+    return s
+
+
+def test_token_bucket_limits_rate():
+    """Test that an empty bucket waits for refill."""
+    bucket = TokenBucket(capacity=2, period=0.1)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_client_retries(fake_scb, client):
+    """Test retry on 429 and 5xx."""
+    fake_scb.failures["MI"] = [429, 503]
+    assert client.get(["MI"])[0]["id"] == "MI1301"
+    assert [r[1] for r in fake_scb.requests].count("MI") == 3
+
+
+def test_client_gives_up(fake_scb, client):
+    """Test that retries are bounded."""
+    client.max_retries = 1
+    fake_scb.failures["MI"] = [500, 500, 500]
+    with pytest.raises(requests.HTTPError):
+        client.get(["MI"])
+
+
+def test_update_search_tree(fake_scb, client, search):
+    """Test concurrent crawl keeps depth first order and output format."""
+    fake_scb.failures["MI/MI1301/MI1301B/UtslappKommun"] = [429]
+    tables = search.update_search_tree(client)
+
+    assert tables == [
+        (
+            ["AA", "AA0003", "MotFlyktAldKon"],
+            "Andel förvärvsarbetande kommunmottagna flyktingar efter ålder",
+        ),
+        (
+            ["MI", "MI1301", "MI1301B", "UtslappKommun"],
+            "Utsläpp till luft efter region, ämne och år",
+        ),
+        (["MI", "TotaltUtslappN"], "Totala utsläpp efter växthusgas, sektor och år"),
+    ]
+    with open(search.search_tree_file_path) as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith("updated ")
+    catalog = MetadataCatalog(search.metadata_catalog_path)
+    assert [path for path, _ in catalog.tables()] == [path for path, _ in tables]
+    assert catalog.variable(tables[1][0], "region")["values"] == ["00", "0114"]
+    assert lines[2] == (
+        "['MI', 'MI1301', 'MI1301B', 'UtslappKommun']; "
+        "Utsläpp till luft efter region, ämne och år"
+    )
+
+
+def test_update_search_tree_failed_folder(fake_scb, client, search):
+    """Test that a folder failing after all retries fails the crawl."""
+    client.max_retries = 1
+    fake_scb.failures["MI/MI1301"] = [503] * 2
+    with pytest.raises(CrawlIncomplete) as error:
+        search.update_search_tree(client)
+    assert error.value.failed == [["MI", "MI1301"]]
+    assert "MI/TotaltUtslappN" in {r[1] for r in fake_scb.requests}
+
+
+def test_update_search_tree_keeps_tree_on_failure(fake_scb, client, search):
+    """Test that a failed crawl keeps the tree and resumes with failed nodes."""
+    first = search.update_search_tree(client)
+    with open(search.search_tree_file_path) as f:
+        tree = f.read()
+    fake_scb.tree["MI"][1]["updated"] = "2024-06-01T08:00:00"
+    client.max_retries = 1
+    fake_scb.failures["MI/MI1301"] = [503] * 2
+
+    with pytest.raises(CrawlIncomplete):
+        search.update_search_tree(client)
+    with open(search.search_tree_file_path) as f:
+        assert f.read() == tree
+    with open(search.checkpoint_file_path) as f:
+        headers = [line for line in f if line.startswith('{"run"')]
+    assert '"complete": false' in headers[-1]
+
+    fake_scb.requests.clear()
+    assert search.update_search_tree(client) == first
+    assert "MI/MI1301" in {r[1] for r in fake_scb.requests}
+    assert "MI/TotaltUtslappN" not in {r[1] for r in fake_scb.requests}
+
+
+class CrashingClient(ScbClient):
+    """Client failing hard on one node."""
+
+    def get_with_etag(self, path, etag=None):
+        """Crash on the second table."""
+        if path == ["MI", "MI1301", "MI1301B", "UtslappKommun"]:
+            raise RuntimeError("crash")
+        return super().get_with_etag(path, etag)
+
+
+def test_update_search_tree_resumes(fake_scb, search):
+    """Test that a crashed crawl resumes without refetching visited nodes."""
+    crashing = CrashingClient(fake_scb.url, TokenBucket(1000, 1.0))
+    with pytest.raises(RuntimeError):
+        search.update_search_tree(crashing)
+    assert not os.path.exists(search.search_tree_file_path)
+
+    visited = {r[1] for r in fake_scb.requests}
+    fake_scb.requests.clear()
+    client = ScbClient(fake_scb.url, TokenBucket(1000, 1.0))
+    tables = search.update_search_tree(client)
+
+    assert len(tables) == 3
+    assert "MI/MI1301/MI1301B/UtslappKommun" in {r[1] for r in fake_scb.requests}
+    assert not visited & {r[1] for r in fake_scb.requests}
+
+
+def test_update_search_tree_incremental(fake_scb, client, search):
+    """Test that only changed tables are fetched after a completed crawl."""
+    first = search.update_search_tree(client)
+    fake_scb.requests.clear()
+    fake_scb.tree["MI/MI1301/MI1301B"][0]["updated"] = "2024-06-01T08:00:00"
+    fake_scb.tree["MI/MI1301/MI1301B/UtslappKommun"]["title"] = "Ny titel"
+
+    second = search.update_search_tree(client)
+
+    assert {r[1] for r in fake_scb.requests} == {
+        "",
+        "AA",
+        "AA/AA0003",
+        "MI",
+        "MI/MI1301",
+        "MI/MI1301/MI1301B",
+        "MI/MI1301/MI1301B/UtslappKommun",
+    }
+    assert second[0] == first[0]
+    assert second[1] == (["MI", "MI1301", "MI1301B", "UtslappKommun"], "Ny titel")
@@ -0,0 +1,193 @@
+"""Unit tests of the local table store."""
+
+import json
+
+import pandas as pd
+import pytest
+
+from ifk_analyses.cache import ResponseCache
+from ifk_analyses.metadata_catalog import MetadataCatalog
+from ifk_analyses.objects.emissions_kommun import FetchData
+from ifk_analyses.objects.passenger_transport import sync_data
+from ifk_analyses.scb_api import ScbClient, TokenBucket
+from ifk_analyses.store import TableStore, periods_to_fetch
+
+
+@pytest.fixture
+def data_df():
+    """Small emission table."""
+    return pd.DataFrame(
+        {
+            "region": pd.Categorical(
+                ["Riket", "Riket", "Upplands Väsby", "Upplands Väsby"]
+            ),
+            "year": [2016, 2021, 2016, 2021],
+            "chg value": [1.0, 2.0, 3.0, 4.0],
+        }
+    )
+
+
+def test_write_read(tmp_path, data_df):
+    """Test round trip, filters and version history."""
+    store = TableStore(str(tmp_path))
+    first = store.write("MI/UtslappKommun", data_df)
+    assert (tmp_path / first["path"] / "year=2016").is_dir()
+
+    read = store.read("MI/UtslappKommun").sort_values(["year", "region"])
+    expected = data_df.sort_values(["year", "region"])
+    assert list(read["year"]) == list(expected["year"])
+    assert read["year"].dtype == data_df["year"].dtype
+    assert list(read["chg value"]) == list(expected["chg value"])
+
+    filtered = store.read(
+        "MI/UtslappKommun", filters={"year": 2021, "region": ["Riket"]}
+    )
+    assert list(filtered["chg value"]) == [2.0]
+
+    store.write("MI/UtslappKommun", data_df.assign(**{"chg value": 0.0}))
+    assert [s["snapshot"] for s in store.snapshots("MI/UtslappKommun")][0] == (
+        first["snapshot"]
+    )
+    assert store.read("MI/UtslappKommun")["chg value"].sum() == 0.0
+    old = store.read("MI/UtslappKommun", snapshot=first["snapshot"])
+    assert old["chg value"].sum() == 10.0
+
+    with pytest.raises(KeyError):
+        store.read("MI/Missing")
+
+
+def test_fetch_data_load(fake_scb, tmp_path):
+    """Test that FetchData only fetches when the table is not stored."""
+    fake_scb.data["MI/MI1301/MI1301B/UtslappKommun"] = {
+        "columns": [],
+        "data": [
+            {"key": ["00", "GHG", "2016"], "values": ["1.5"]},
+            {"key": ["00", "GHG", "2021"], "values": ["2.5"]},
+        ],
+    }
+    f_data = FetchData(
+        client=ScbClient(fake_scb.url, TokenBucket(1000, 1.0)),
+        catalog=MetadataCatalog(str(tmp_path / "metadata.sqlite")),
+    )
+    store = TableStore(str(tmp_path))
+
+    data_df = f_data.load(store, filters={"year": [2021]})
+    assert list(data_df["chg value"]) == [2.5]
+    n_posts = sum(method == "POST" for method, _, _ in fake_scb.requests)
+    assert n_posts == 1
+
+    f_data.load(store)
+    assert sum(method == "POST" for method, _, _ in fake_scb.requests) == n_posts
+    assert len(store.snapshots(f_data.table_id)) == 1
+
+
+def test_periods_to_fetch():
+    """Test new periods, and revised periods after an update."""
+    synced = {"updated": "2023-06-01", "periods": ["2019", "2020", "2021"]}
+    periods = ["2019", "2020", "2021", "2022"]
+    assert periods_to_fetch(None, periods, "2023-06-01") == periods
+    assert periods_to_fetch(synced, periods[:3], "2023-06-01") == []
+    assert periods_to_fetch(synced, periods, "2023-06-01") == ["2022"]
+    assert periods_to_fetch(synced, periods, "2024-06-01") == ["2020", "2021", "2022"]
+    assert periods_to_fetch(synced, periods, None, revised=1) == ["2021", "2022"]
+    assert periods_to_fetch(synced, periods, None, revised=0) == ["2022"]
+    assert periods_to_fetch(synced, periods, None, revised=5) == periods
+
+
+def test_upsert(tmp_path, data_df):
+    """Test that rows with the same keys are replaced and others kept."""
+    store = TableStore(str(tmp_path))
+    store.upsert("MI/UtslappKommun", data_df, keys=["region", "year"])
+    revised = pd.DataFrame(
+        {
+            "region": pd.Categorical(["Riket", "Lidingö"]),
+            "year": [2021, 2021],
+            "chg value": [5.0, 6.0],
+        }
+    )
+    store.upsert("MI/UtslappKommun", revised, keys=["region", "year"])
+
+    read = store.read("MI/UtslappKommun").sort_values(["year", "chg value"])
+    assert list(read["chg value"]) == [1.0, 3.0, 4.0, 5.0, 6.0]
+    assert isinstance(read["region"].dtype, pd.CategoricalDtype)
+    assert len(store.snapshots("MI/UtslappKommun")) == 2
+
+
+class RevisedValue:
+    """Cell value, shifted by `offset` like a revision at scb."""
+
+    def __init__(self) -> None:
+        """Initialization."""
+        self.offset = 0
+
+    def __call__(self, region: str, substance: str, year: str) -> float:
+        """Value of cell."""
+        return int(year) + self.offset
+
+
+@pytest.fixture
+def kommun_value():
+    """Revisable values served to `f_data`."""
+    return RevisedValue()
+
+
+def test_fetch_data_sync(fake_scb, f_data, kommun_value, tmp_path):
+    """Test that only new and revised years are fetched after an update."""
+    f_data.scb.client.cache = ResponseCache(str(tmp_path / "cache"))
+    store = TableStore(str(tmp_path / "store"))
+
+    def posted_years() -> list:
+        return [
+            json.loads(body)["query"][-1]["selection"]["values"]
+            for method, _, body in fake_scb.requests
+            if method == "POST"
+        ]
+
+    data_df = f_data.sync(store, revised=1)
+    assert sorted(data_df["chg value"]) == [2016.0, 2016.0, 2021.0, 2021.0]
+    assert posted_years() == [["2016", "2021"]]
+
+    f_data.sync(store, revised=1)
+    assert posted_years() == [["2016", "2021"]]
+
+    tid = fake_scb.tree["MI/MI1301/MI1301B/UtslappKommun"]["variables"][-1]
+    tid["values"] = tid["valueTexts"] = ["2016", "2021", "2022"]
+    fake_scb.tree["MI/MI1301/MI1301B"][0]["updated"] = "2024-06-01T08:00:00"
+    kommun_value.offset = 1000
+
+    data_df = f_data.sync(store, revised=1)
+    assert posted_years()[1:] == [["2021", "2022"]]
+    assert f_data.years == ["2016", "2021", "2022"]
+    values = data_df.groupby("year")["chg value"].first()
+    assert list(values) == [2016.0, 3021.0, 3022.0]
+    assert list(data_df["region code"].value_counts()) == [3, 3]
+
+
+def test_passenger_transport_sync(fake_scb, tmp_path):
+    """Test that passenger transport data is fetched by year."""
+    path = "START/MI/MI0107/TotaltUtslappN"
+    fake_scb.tree["START/MI/MI0107"] = [
+        {"id": "TotaltUtslappN", "type": "t", "updated": "2023-06-01T08:00:00"}
+    ]
+    fake_scb.tree[path] = {
+        "variables": [{"code": "Tid", "text": "år", "values": ["2020", "2021"]}]
+    }
+
+    def respond(query: dict) -> dict:
+        years = query["query"][-1]["selection"]["values"]
+        data = [{"key": ["CO2-ekv.", "0.2", y], "values": ["1.5"]} for y in years]
+        return {"columns": [], "data": data}
+
+    fake_scb.data[path] = respond
+    client = ScbClient(fake_scb.url, TokenBucket(1000, 1.0))
+    store = TableStore(str(tmp_path))
+    assert list(sync_data(store, client)["year"]) == [2020.0, 2021.0]
+
+    fake_scb.tree[path]["variables"][0]["values"].append("2022")
+    data_df = sync_data(store, client)
+    assert sorted(data_df["year"]) == [2020.0, 2021.0]
+    fake_scb.tree["START/MI/MI0107"][0]["updated"] = "2024-06-01T08:00:00"
+    data_df = sync_data(store, client, revised=0)
+    assert sorted(data_df["year"]) == [2020.0, 2021.0, 2022.0]
+    posted = [body for method, _, body in fake_scb.requests if method == "POST"]
+    assert len(posted) == 2
@@ -1,8 +1,11 @@
-"""Temporary unit test."""
+"""Unit tests of the command line interface."""
 
 from ifk_analyses.main import main
 
 
-def test_unit_temp():
-    """Unit test of temp function."""
-    assert main() is None
+def test_cli_list(capsys):
+    """Test help and listing pipelines."""
+    assert main([]) is None
+    assert "usage: ifk-analyses" in capsys.readouterr().out
+    main(["list"])
+    assert "emissions-kommun" in capsys.readouterr().out.split()
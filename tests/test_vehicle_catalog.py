@@ -0,0 +1,58 @@
+"""Unit tests of the vehicle catalog."""
+
+import numpy as np
+import pytest
+
+from ifk_analyses.objects.personal_vehicle_lca import Vehicle, co2_costs
+from ifk_analyses.objects.vehicle_catalog import VehicleCatalog
+
+CAR = Vehicle("Bensinbil", 1500, 0, 0.05, 8, 77, 3, 300000)
+EV = Vehicle("Elbil", 2200, 125, 0.25, 8, 77, 0.45, 300000)
+BIKE = Vehicle("Cykel", 10, 0, 0, 8, 77, 0.45, 300000)
+
+
+@pytest.fixture
+def catalog():
+    """Catalog with a car, an electric car and a bike."""
+    return VehicleCatalog([CAR, EV, BIKE])
+
+
+def test_lookup(catalog):
+    """Test lookup by name and column views."""
+    assert catalog.index("Cykel") == 2
+    assert catalog["Elbil"] == EV
+    assert list(catalog.indices(["Cykel", "Bensinbil"])) == [2, 0]
+    assert list(catalog.column("weight")) == [1500, 2200, 10]
+    assert np.shares_memory(catalog.column("weight"), catalog.table)
+    with pytest.raises(KeyError):
+        catalog.index("Elcykel")
+    with pytest.raises(ValueError):
+        catalog.extend([CAR])
+
+
+def test_blend(catalog):
+    """Test that blends sum build costs and weight CO2 per km by usage."""
+    blend = catalog.blend("Elbil och cykel", {"Elbil": 0.9, "Cykel": 0.1})
+    assert catalog.index("Elbil och cykel") == 3
+    assert blend.weight == 2210
+    assert blend.consumption_per_km == pytest.approx(0.225)
+    build, per_km = co2_costs(catalog.table)
+    assert build[3] == pytest.approx(build[1] + build[2])
+    assert per_km[3] == pytest.approx(0.9 * per_km[1] + 0.1 * per_km[2])
+
+    catalog.blend("Bensinbil och cykel", {"Bensinbil": 0.5, "Cykel": 0.5})
+    build, per_km = co2_costs(catalog.table)
+    assert per_km[4] == pytest.approx(0.5 * per_km[0] + 0.5 * per_km[2])
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_save_load(catalog, tmp_path, suffix):
+    """Test round trip through csv and Parquet."""
+    path = str(tmp_path / ("vehicles" + suffix))
+    catalog.save(path)
+    loaded = VehicleCatalog.load(path)
+    assert loaded.names == catalog.names
+    np.testing.assert_array_equal(loaded.table, catalog.table)
+    assert loaded["Elbil"] == EV
+    with pytest.raises(ValueError):
+        catalog.save(str(tmp_path / "vehicles.json"))